@@ -1,22 +1,243 @@
+from __future__ import print_function
+
+import os
+import re
 import sys
 import time
+import gc
+import math
+import struct
+import array
+import random
 import operator
-from itertools import repeat, chain, izip, count
+import functools
+import multiprocessing
+from itertools import repeat, chain, count
 from collections import defaultdict
 import threading
 
+# Compatibility. The candidates are written against the Python 2 names; under
+# Python 3 these refer to the equivalent lazy builtins.
+
+PY2 = sys.version_info[0] == 2
+
+if PY2:
+    from itertools import izip
+    import Queue as queue
+    import cPickle as pickle
+    string_types = basestring
+else:
+    import queue
+    import pickle
+    xrange = range
+    izip = zip
+    string_types = str
+
+def open_text(path):
+    "Opens a file for writing text the way the csv module expects."
+    if PY2:
+        return open(path, "wb")
+    return open(path, "w", newline="")
+
 NUM_OPS = 100000
+MAX_OPS = 10 ** 9
 REPETITIONS = 10
+
+# Timers. Each factory returns a (function, scale) pair, where multiplying a
+# difference between two readings of the function by scale gives seconds, or
+# None if the timer isn't available on this platform.
+
+CLOCK_MONOTONIC = 1
+CLOCK_PROCESS_CPUTIME_ID = 2
+CLOCK_THREAD_CPUTIME_ID = 3
+CLOCK_MONOTONIC_RAW = 4
+
+def clock_gettime_timer(clock_id):
+    "A timer that calls the POSIX clock_gettime() with a Linux clock ID."
+    if hasattr(time, "clock_gettime_ns"):
+        return functools.partial(time.clock_gettime_ns, clock_id), 1e-9
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+    import ctypes.util
+    class timespec(ctypes.Structure):
+        _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("rt") or 
+            ctypes.util.find_library("c"))
+        clock_gettime = libc.clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+    ts = timespec()
+    ts_ref = ctypes.byref(ts)
+    if clock_gettime(clock_id, ts_ref) != 0:
+        return None
+    def read():
+        clock_gettime(clock_id, ts_ref)
+        return ts.tv_sec * 1000000000 + ts.tv_nsec
+    return read, 1e-9
+
+def default_timer():
+    if sys.platform == "win32":
+        return getattr(time, "clock", time.perf_counter), 1.0
+    return time.time, 1.0
+    
+def monotonic_timer():
+    if hasattr(time, "perf_counter_ns"):
+        return time.perf_counter_ns, 1e-9
+    return clock_gettime_timer(CLOCK_MONOTONIC)
+
+def process_timer():
+    if hasattr(time, "process_time_ns"):
+        return time.process_time_ns, 1e-9
+    return clock_gettime_timer(CLOCK_PROCESS_CPUTIME_ID)
+
+def thread_timer():
+    if hasattr(time, "thread_time_ns"):
+        return time.thread_time_ns, 1e-9
+    return clock_gettime_timer(CLOCK_THREAD_CPUTIME_ID)
+    
+def monotonic_raw_timer():
+    return clock_gettime_timer(getattr(time, "CLOCK_MONOTONIC_RAW", 
+        CLOCK_MONOTONIC_RAW))
+
+timers = [
+    ("default", "time.clock on Windows, time.time elsewhere", default_timer),
+    ("monotonic", "monotonic clock in nanoseconds", monotonic_timer),
+    ("process", "CPU time of the process", process_timer),
+    ("thread", "CPU time of the calling thread", thread_timer),
+    ("monotonic_raw", "clock_gettime(CLOCK_MONOTONIC_RAW)", 
+        monotonic_raw_timer)
+]
+
+def available_timers():
+    "Returns a list of (name, description, function, scale) tuples."
+    available = []
+    for name, desc, factory in timers:
+        timer = factory()
+        if timer is not None:
+            available.append((name, desc) + timer)
+    return available
+
+def measure_timer(func, scale, samples=1000):
+    """Estimates the resolution and call overhead of a timer, both in seconds.
+    The resolution is the smallest non-zero difference between successive
+    readings, so it can't be less than the overhead."""
+    resolution = None
+    for i in xrange(samples):
+        t0 = t1 = func()
+        while t1 == t0:
+            t1 = func()
+        if resolution is None or t1 - t0 < resolution:
+            resolution = t1 - t0
+    resolution *= scale
+    
+    # Call the timer in blocks large enough for the elapsed time to be well 
+    # above the resolution.
+    calls = 1000
+    while True:
+        t0 = func()
+        for i in xrange(calls):
+            func()
+        elapsed = (func() - t0) * scale
+        if elapsed >= resolution * 1000 or calls >= 10 ** 7:
+            break
+        calls *= 10
+    overhead = min(elapsed / (calls + 1), resolution)
+    return resolution, overhead
        
+# OS noise. Each sample records how often the process was descheduled, faulted
+# or moved to another CPU while it ran, so that disturbed samples can be run 
+# again.
+
+MAX_RETRIES = 3
+
+# Counters that disqualify a sample if they change while it runs. Minor faults
+# are recorded but not in this list, since candidates that allocate take them
+# on every sample.
+NOISE_REJECT = ["voluntary_switches", "involuntary_switches", "major_faults", 
+    "migrations"]
+
+def read_counters(path, names):
+    """Reads the integer 'key: value' lines of a file such as /proc/self/status
+    whose keys are in 'names', a dict mapping them to counter names."""
+    counters = {}
+    try:
+        f = open(path)
+    except IOError:
+        return counters
+    try:
+        for line in f:
+            key, sep, value = line.partition(":")
+            key = key.strip()
+            if key in names:
+                counters[names[key]] = int(value)
+    finally:
+        f.close()
+    return counters
+
+def read_noise():
+    """Returns the cumulative noise counters of this process, or as many of
+    them as the platform provides."""
+    counters = {}
+    try:
+        import resource
+    except ImportError:
+        pass
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        counters["voluntary_switches"] = usage.ru_nvcsw
+        counters["involuntary_switches"] = usage.ru_nivcsw
+        counters["minor_faults"] = usage.ru_minflt
+        counters["major_faults"] = usage.ru_majflt
+    # Under Linux, take the context switches of the measuring thread alone 
+    # rather than of the whole process.
+    counters.update(read_counters("/proc/self/status", {
+        "voluntary_ctxt_switches": "voluntary_switches",
+        "nonvoluntary_ctxt_switches": "involuntary_switches"
+    }))
+    counters.update(read_counters("/proc/self/sched", {
+        "se.nr_migrations": "migrations"
+    }))
+    return counters
+
 class Candidate(object):
     name = None
     categories = []
     tags = []
     overheads = []
     
+    # The number of ops performed by each iteration of the loop in run(). Op
+    # counts are always a multiple of this.
+    step = 1
+    
+    # If set, the op count is calibrated so that a sample takes about this 
+    # many seconds even when no target time is given for the run.
+    target_time = None
+    
+    # Set for candidates whose cost is incurred once per sample rather than
+    # once per op, so that it can be subtracted from candidates that use a 
+    # different op count.
+    per_sample = False
+    
+    # Noise counters that the candidate increments by design, such as the 
+    # context switches of candidates that hand off between threads. They 
+    # don't make a sample noisy.
+    expected_noise = []
+    
+    # Set for candidates that start processes, which pool workers can't.
+    starts_processes = False
+    
     def __init__(self, num_ops=NUM_OPS):
         self.num_ops = num_ops
         self.times = []
+        # The samples before any drift correction, which replaces times.
+        self.raw_times = self.times
+        self.stamps = []
+        self.warmup = 0
+        self.noise = []
+        self.rejected = 0
         overheads = []
         for item in self.overheads:
             try:
@@ -26,6 +247,10 @@ class Candidate(object):
             overheads.append((tag, multiplier))
         self.overheads = overheads
             
+    def arguments(self):
+        "Keyword arguments that recreate this candidate in another process."
+        return { "num_ops": self.num_ops }
+            
     def prepare(self):
         pass
         
@@ -38,24 +263,276 @@ class Candidate(object):
     def time(self):
         timer = self.timer_func
         num_ops = self.num_ops
+        before = read_noise()
         t0 = timer()
         self.run(num_ops)
-        t = timer() - t0
+        t1 = timer()
+        after = read_noise()
+        t = (t1 - t0) * self.timer_scale - self.timer_overhead
         self.times.append(t)
+        self.stamps.append(time.time())
+        self.noise.append(dict((key, after[key] - before[key]) 
+            for key in after if key in before))
         return t
         
+    def steady_times(self):
+        "The samples taken after the candidate warmed up."
+        return self.times[self.warmup:]
+        
+    def noisy(self, index=-1):
+        "Whether the OS disturbed a sample, by default the last one taken."
+        noise = self.noise[index]
+        return any(noise.get(key) for key in NOISE_REJECT 
+            if key not in self.expected_noise)
+        
+    def reject(self):
+        "Discards the last sample."
+        self.times.pop()
+        self.stamps.pop()
+        self.noise.pop()
+        self.rejected += 1
+        
+    def calibrate(self, target):
+        """Chooses num_ops so that a single sample takes roughly 'target' 
+        seconds."""
+        if self.per_sample:
+            return
+        num_ops = self.step
+        while True:
+            self.num_ops = num_ops
+            self.prepare()
+            t = self.time()
+            self.cleanup()
+            if t >= target / 10 or num_ops >= MAX_OPS:
+                break
+            num_ops *= 10
+        del self.times[:]
+        del self.stamps[:]
+        del self.noise[:]
+        if t > 0:
+            num_ops = min(int(num_ops * target / t), MAX_OPS)
+        self.num_ops = max(num_ops - num_ops % self.step, self.step)
+        
+    @classmethod
+    def available(cls):
+        "Whether this interpreter can run the candidate."
+        return True
+        
     @classmethod
-    def setup(cls):
-        if sys.platform == "win32":
-            cls.timer_func = time.clock
+    def setup(cls, timer="default"):
+        for name, desc, func, scale in available_timers():
+            if name == timer:
+                break
+        else:
+            raise ValueError("Timer %r is not available" % timer)
+        cls.timer_name = timer
+        cls.timer_func = staticmethod(func)
+        cls.timer_scale = scale
+        cls.timer_overhead = 0.0
+        cls.timer_resolution, cls.timer_overhead = measure_timer(func, scale)
+                
+# Unrolled candidates. Rather than spelling out their loops, these declare the
+# statement being measured and have run() generated for a given unroll factor.
+
+UNROLL = 32
+
+unrolled_functions = {}
+
+def compile_unrolled(cls, unroll):
+    """Generates and compiles the run() method of an unrolled candidate class.
+    The generated code sees the globals of the module defining the class."""
+    key = (cls, unroll)
+    if key not in unrolled_functions:
+        lines = ["def run(self, num_ops):"]
+        lines += ["    " + line for line in cls.setup_code.splitlines()]
+        lines.append("    for i in %s(0, num_ops, %d):" % (xrange.__name__, 
+            unroll))
+        lines += ["        " + line for line in cls.loop_setup.splitlines()]
+        lines += ["        " + line for line in cls.body(unroll)]
+        source = "\n".join(lines) + "\n"
+        code = compile(source, "<%s x%d>" % (cls.__name__, unroll), "exec")
+        namespace = {}
+        if cls.__module__ == __name__:
+            exec(code, globals(), namespace)
         else:
-            cls.timer_func = time.time
+            exec(code, vars(sys.modules[cls.__module__]), namespace)
+        unrolled_functions[key] = namespace["run"]
+    return unrolled_functions[key]
+
+class Unrolled(Candidate):
+    """A candidate whose loop body repeats 'statement' 'unroll' times. The
+    statement can be a list of statements, which are cycled through. 
+    'setup_code' is run once before the loop and 'loop_setup' at the top of
+    every iteration of it. It isn't named setup, which would hide 
+    Candidate.setup()."""
+    statement = "pass"
+    setup_code = ""
+    loop_setup = ""
+
+    # Overheads incurred once per iteration of the loop, such as the cost of
+    # loop_setup. They are scaled by 1 / unroll.
+    loop_overheads = []
+
+    # The unroll factor, if this candidate has its own default, and the
+    # largest factor it supports.
+    unroll = None
+    max_unroll = None
+
+    def __init__(self, num_ops=NUM_OPS, unroll=None):
+        unroll = unroll or self.unroll or UNROLL
+        if self.max_unroll:
+            unroll = min(unroll, self.max_unroll)
+        self.unroll = self.step = unroll
+        Candidate.__init__(self, num_ops)
+        overheads = [("unrolled%d" % unroll, 1.0)]
+        for item in self.loop_overheads:
+            try:
+                tag, multiplier = item
+            except ValueError:
+                tag, multiplier = item, 1.0
+            overheads.append((tag, multiplier / unroll))
+        self.overheads = overheads + self.overheads
+        self.run = compile_unrolled(type(self), unroll).__get__(self)
+
+    def arguments(self):
+        return dict(Candidate.arguments(self), unroll=self.unroll)
+
+    @classmethod
+    def body(cls, unroll):
+        "Returns the lines making up one iteration of the loop."
+        statements = getattr(cls, "statement", "pass")
+        if isinstance(statements, string_types):
+            statements = [statements]
+        return [statements[i % len(statements)] for i in xrange(unroll)]
+
+unrolled_baselines = {}
+
+def unrolled_baseline(unroll):
+    """Returns the empty-loop candidate class providing the "unrolledN"
+    overhead for unroll factor N, creating it if necessary."""
+    if unroll not in unrolled_baselines:
+        cls = type("BenchUnrolled%d" % unroll, (Candidate,), {
+            "__module__": __name__,
+            "tags": ["unrolled%d" % unroll],
+            "step": unroll,
+            "setup_code": "",
+            "loop_setup": "",
+            "body": classmethod(lambda cls, unroll: ["pass"])
+            })
+        cls.run = compile_unrolled(cls, unroll)
+        unrolled_baselines[unroll] = cls
+        globals()[cls.__name__] = cls
+    return unrolled_baselines[unroll]
+
+# Sized candidates. These work on data of a given size and are measured at 
+# each of a geometric range of sizes, so that their cost can be fitted to a 
+# function of the size. The overhead model gives each class a single cost, so
+# each size is measured as a class of its own, generated on demand.
+
+SIZES = [10 ** i for i in xrange(8)]
+
+# A fixed op count that suits one size would make samples far too long or 
+# too short at others, so sized candidates are always calibrated.
+SIZED_TARGET_TIME = 0.005
+
+sized_classes = {}
+
+class Sized(Candidate):
+    """A candidate that works on data of 'size' items, usually built by 
+    prepare() and freed by cleanup(). Those with the same 'group' are 
+    alternatives whose costs are compared. 'sizes' are the sizes it is 
+    measured at unless others are given."""
+    size = None
+    sizes = SIZES
+    group = None
+    target_time = SIZED_TARGET_TIME
+    
+    # The class this one measures at a single size.
+    family = None
+    
+    # Whether the report fits its costs to a function of size, and whether
+    # sizes given for a run replace 'sizes'.
+    fit = True
+    resizable = True
+    
+    # The labels of the models in COMPLEXITIES the costs may be fitted to.
+    complexities = ["1", "log n", "n", "n log n"]
+    
+    # What a unit of size is. If set, a linear fit is shown as a cost per
+    # call and a cost per item.
+    item = None
+    
+    # The smallest size it can be measured at. Smaller sizes given for a run
+    # are left out.
+    min_size = 0
+    
+    @classmethod
+    def label(cls, size):
+        "Describes a size, for the names of the classes measuring it."
+        return "n=%s" % pretty(size)
+
+def sized_class(cls, size):
+    """Returns the class measuring a sized candidate class at one size, 
+    creating it if necessary. The unroll factor of an unrolled class is 
+    limited so that an iteration of its loop works on no more than UNROLL 
+    items."""
+    key = (cls, size)
+    if key not in sized_classes:
+        attributes = {
+            "__module__": cls.__module__,
+            "name": "%s (%s)" % (cls.name, cls.label(size)),
+            "size": size,
+            "family": cls
+        }
+        if issubclass(cls, Unrolled):
+            attributes["max_unroll"] = max(min(cls.max_unroll or UNROLL, 
+                UNROLL // size), 1)
+        sized_classes[key] = type("%s_%d" % (cls.__name__, size), (cls,), 
+            attributes)
+    return sized_classes[key]
+
+# Candidates defined in other modules, by class name. The candidates of this
+# module are found by their names starting with "Bench" instead.
+registry = {}
+
+def register(cls):
+    """Class decorator that makes a candidate class defined outside this module
+    available for selection. A suite module does this for each of its 
+    candidates when it is imported."""
+    existing = registry.get(cls.__name__) or globals().get(cls.__name__)
+    if existing is not None and existing is not cls:
+        raise ValueError("A candidate class named %s already exists" % 
+            cls.__name__)
+    registry[cls.__name__] = cls
+    return cls
+
+def candidate_class(class_name):
+    """Looks up a candidate class by name. Classes that are generated, the 
+    baselines and the classes measuring a sized class at one size, are 
+    generated on demand if they don't exist yet in this process."""
+    if class_name in registry:
+        return registry[class_name]
+    if class_name in globals():
+        return globals()[class_name]
+    for cls in sized_classes.values():
+        if cls.__name__ == class_name:
+            return cls
+    match = re.match(r"BenchUnrolled(\d+)$", class_name)
+    if match:
+        return unrolled_baseline(int(match.group(1)))
+    match = re.match(r"(\w+)_(\d+)$", class_name)
+    if match:
+        family = candidate_class(match.group(1))
+        if issubclass(family, Sized):
+            return sized_class(family, int(match.group(2)))
+    raise KeyError(class_name)
                 
 # Overheads.
 
 class BenchPass(Candidate):
     "A pass statement."
     tags = ["pass"]
+    per_sample = True
     
     def run(self, num_ops):
         pass
@@ -67,34 +544,14 @@ class BenchStraight(Candidate):
         for i in xrange(num_ops):
             pass
        
-class BenchUnrolled32(Candidate):
-    tags = ["unrolled32"]
-    
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            pass
-
-class BenchUnrolled100(Candidate):
-    tags = ["unrolled100"]
-    
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 100):
-            pass
-        
-class BenchUnrolled1000(Candidate):
-    tags = ["unrolled1000"]
-    
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 1000):
-            pass
+BenchUnrolled32 = unrolled_baseline(32)
+BenchUnrolled100 = unrolled_baseline(100)
+BenchUnrolled1000 = unrolled_baseline(1000)
         
 # Base classes for candidates with particular overheads.  
 
 class Straight(Candidate):
     overheads = ["straight"]
-
-class Unrolled32(Candidate):
-    overheads = ["unrolled32"]
         
 # Control.
 
@@ -109,207 +566,130 @@ class BenchControl(Straight):
         
 # Arithmetic and bitwise logical operators.
 
-class BenchAddSubtract(Unrolled32):
+class BenchAddSubtract(Unrolled):
     "In-place integer addition and subtraction from a local variable."    
     name = "Integer + and -"
     categories = ["basic"]
+    setup_code = "n = 0"
+    statement = ["n += 1", "n -= 1"]
 
-    def run(self, num_ops):
-        n = 0
-        for n in xrange(0, num_ops, 32):
-            n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1;
-            n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1;
-            n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1;
-            n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1; n += 1; n -= 1;
-        
-class BenchMultiply(Unrolled32):
+class BenchMultiply(Unrolled):
     "In-place integer multiplication of a local variable."
     name = "Integer *"
     categories = ["basic"]
+    setup_code = "n = 0"
+    statement = "n *= 1"
     
-    def run(self, num_ops):
-        n = 0
-        for n in xrange(0, num_ops, 32):
-            n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1;
-            n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1;
-            n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1;
-            n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1; n *= 1;
-
-class BenchDivide(Unrolled32):
-    "In-place integer division of a local variable."
-    name = "Integer /"
+class BenchDivide(Unrolled):
+    "In-place integer floor division of a local variable."
+    name = "Integer //"
     categories = ["basic"]
-    
-    def run(self, num_ops):
-        n = 0
-        for i in xrange(0, num_ops, 32):
-            n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1;
-            n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1;
-            n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1;
-            n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1; n /= 1;
-        
-class BenchShifts(Unrolled32):
+    setup_code = "n = 0"
+    statement = "n //= 1"
+
+class BenchShifts(Unrolled):
     "In-place left and right (arithmetic) shifts on a local variable."
     name = "Integer << and >>"
     categories = ["basic"]
+    setup_code = "n = 0"
+    statement = ["n <<= 1", "n >>= 1"]
     
-    def run(self, num_ops):
-        n = 0
-        for i in xrange(0, num_ops, 32):
-            n <<= 1; n >>= 1; n <<= 1; n >>= 1; n <<= 1; n >>= 1;
-            n <<= 1; n >>= 1; n <<= 1; n >>= 1; n <<= 1; n >>= 1;
-            n <<= 1; n >>= 1; n <<= 1; n >>= 1; n <<= 1; n >>= 1;
-            n <<= 1; n >>= 1; n <<= 1; n >>= 1; n <<= 1; n >>= 1;
-            n <<= 1; n >>= 1; n <<= 1; n >>= 1; n <<= 1; n >>= 1;
-            n <<= 1; n >>= 1;
-        
-class BenchBitwiseLogical(Unrolled32):
+class BenchBitwiseLogical(Unrolled):
     "In-place binary bitwise logical operations on a local variable."
     name = "Bitwise &, |, ^"
     categories = ["basic"]
+    setup_code = "n = 0"
+    statement = ["n &= 1", "n |= 1", "n ^= 1"]
     
-    def run(self, num_ops):
-        n = 0
-        for i in xrange(0, num_ops, 32):
-            n &= 1; n |= 1; n ^= 1; n &= 1; n |= 1; n ^= 1;
-            n &= 1; n |= 1; n ^= 1; n &= 1; n |= 1; n ^= 1;
-            n &= 1; n |= 1; n ^= 1; n &= 1; n |= 1; n ^= 1;
-            n &= 1; n |= 1; n ^= 1; n &= 1; n |= 1; n ^= 1;
-            n &= 1; n |= 1; n ^= 1; n &= 1; n |= 1; n ^= 1;
-            n &= 1; n |= 1;
-
-class BenchPower(Unrolled32):
+class BenchPower(Unrolled):
     "Use of the power operator with non-negative integer arguments on a local variable."
     name = "Integer **"
     categories = ["basic"]
-    
-    def run(self, num_ops):
-        n = 0
-        for i in xrange(0, num_ops, 32):
-            n **= 0;  n **= 1;  n **= 2;  n **= 3;  n **= 4;  n **= 5; 
-            n **= 6;  n **= 7;  n **= 8;  n **= 9;  n **= 10; n **= 11;
-            n **= 12; n **= 13; n **= 14; n **= 15; n **= 0;  n **= 1; 
-            n **= 2;  n **= 3;  n **= 4;  n **= 5;  n **= 6;  n **= 7; 
-            n **= 8;  n **= 9;  n **= 10; n **= 11; n **= 12; n **= 13;
-            n **= 14; n **= 15;
+    setup_code = "n = 0"
+    statement = ["n **= %d" % k for k in xrange(16)]
        
 # Variable access.
 
 G = 123
 
-class LoadBench(Candidate):
+class LoadBench(Unrolled):
+    """Reads are measured by passing the variable as every argument of a call
+    to an empty function, so the loaded values don't need to be popped."""
     categories = ["basic"]
-    overheads = ["unrolled100", ("empty_closure_call", 1e-2)]
+    loop_overheads = ["empty_closure_call"]
+    unroll = 100
+    max_unroll = 255
+    argument = None
     
     def prepare(self):
-        def f(a0,  a1,  a2,  a3,  a4,  a5,  a6,  a7, 
-              a8,  a9,  a10, a11, a12, a13, a14, a15,
-              a16, a17, a18, a19, a20, a21, a22, a23,
-              a24, a25, a26, a27, a28, a29, a30, a31,
-              a32, a33, a34, a35, a36, a37, a38, a39,
-              a40, a41, a42, a43, a44, a45, a46, a47,
-              a48, a49, a50, a51, a52, a53, a54, a55,
-              a56, a57, a58, a59, a60, a61, a62, a63,
-              a64, a65, a66, a67, a68, a69, a70, a71,
-              a72, a73, a74, a75, a76, a77, a78, a79,
-              a80, a81, a82, a83, a84, a85, a86, a87,
-              a88, a89, a90, a91, a92, a93, a94, a95,
-              a96, a97, a98, a99):
-            pass        
-        self.f = f
+        params = ", ".join("a%d" % i for i in xrange(self.unroll))
+        namespace = {}
+        exec("def f(%s):\n    pass\n" % params, namespace)
+        self.f = namespace["f"]
 
+    @classmethod
+    def body(cls, unroll):
+        return ["f(%s)" % ", ".join([cls.argument] * unroll)]
 
 class BenchLoadLocal(LoadBench):
     "Local variable reads."
     name = "Local variable read"
     categories = ["basic"]
-    overheads = ["unrolled100", ("empty_closure_call", 1e-2)]
     
-    def run(self, num_ops):
-        # The result of this is still high by about a factor of two, so another
-        # approach is needed. I can't think of a way to measure and subtract
-        # the overhead of POP_TOPs, or to do the pops for free.
-                
-        k = 123
-        f = self.f
-        for i in xrange(0, num_ops, 100):
-            f(k, k, k, k, k, k, k, k, k, k, k, k, k, k, k, k,
-              k, k, k, k, k, k, k, k, k, k, k, k, k, k, k, k,
-              k, k, k, k, k, k, k, k, k, k, k, k, k, k, k, k,
-              k, k, k, k, k, k, k, k, k, k, k, k, k, k, k, k,
-              k, k, k, k, k, k, k, k, k, k, k, k, k, k, k, k,
-              k, k, k, k, k, k, k, k, k, k, k, k, k, k, k, k,
-              k, k, k, k)
+    # The result of this is still high by about a factor of two, so another
+    # approach is needed. I can't think of a way to measure and subtract
+    # the overhead of POP_TOPs, or to do the pops for free.
+    setup_code = "k = 123\nf = self.f"
+    argument = "k"
             
 class BenchLoadGlobal(LoadBench):
     "Global variable read."
     name = "Global variable read"
     categories = ["basic"]
+    setup_code = "f = self.f"
+    argument = "G"
     
-    def run(self, num_ops):
-        f = self.f
-        for i in xrange(0, num_ops, 100):
-            f(G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-              G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-              G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-              G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-              G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-              G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-              G, G, G, G)
-
-class BenchStoreLocal(Unrolled32):
+class StoreBench(Unrolled):
+    "Stores are measured by unpacking a tuple of constants into the variable."
+    target = None
+
+    @classmethod
+    def body(cls, unroll):
+        return ["(%s,) = (%s,)" % (", ".join([cls.target] * unroll),
+            ", ".join(["0"] * unroll))]
+
+class BenchStoreLocal(StoreBench):
     "Storage of a constant into a local variable."
     name = "Local variable write"
     categories = ["basic"]
+    target = "n"
     
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            (n, n, n, n, n, n, n, n, n, n, n, n, n, n, n, n,
-             n, n, n, n, n, n, n, n, n, n, n, n, n, n, n, n) = \
-            (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-            
-class BenchStoreGlobal(Unrolled32):
+class BenchStoreGlobal(StoreBench):
     "Storage of a constant into a global variable."
     name = "Global variable write"
     categories = ["basic"]
+    setup_code = "global G"
+    target = "G"
     
-    def run(self, num_ops):
-        global G
-        for i in xrange(0, num_ops, 32):
-            (G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G,
-             G, G, G, G, G, G, G, G, G, G, G, G, G, G, G, G) = \
-            (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-
-class BenchLoadBuiltin(Unrolled32):
+class BenchLoadBuiltin(Unrolled):
     "Read of a variable in the builtin namespace."
     name = "Built-in variable read"
     categories = ["basic"]
+    # Names that are built in under both Python 2 and Python 3.
+    statement = [
+        "abs",        "all",         "any",       "bool",
+        "callable",   "chr",         "classmethod", "compile",
+        "complex",    "copyright",   "credits",   "delattr",
+        "dict",       "dir",         "divmod",    "enumerate",
+        "eval",       "exit",        "filter",    "float",
+        "format",     "frozenset",   "getattr",   "globals",
+        "hasattr",    "hash",        "hex",       "id",
+        "int",        "isinstance",  "issubclass", "iter"
+    ]
     
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            abs;        all;         any;       apply;    
-            basestring; bool;        buffer;    callable; 
-            chr;        classmethod; cmp;       coerce;   
-            compile;    complex;     copyright; credits;  
-            delattr;    dict;        dir;       divmod;   
-            enumerate;  eval;        execfile;  exit;     
-            file;       filter;      float;     frozenset;
-            getattr;    globals;     hasattr;   hash;               
-
-class AbcReader(Unrolled32):
-    def run(self, num_ops):
-       o = self.o
-       for i in xrange(0, num_ops, 32):
-           o.a; o.b; o.c; o.a;
-           o.b; o.c; o.a; o.b;
-           o.c; o.a; o.b; o.c;
-           o.a; o.b; o.c; o.a;
-           o.b; o.c; o.a; o.b;
-           o.c; o.a; o.b; o.c;
-           o.a; o.b; o.c; o.a;
-           o.b; o.c; o.a; o.b;    
+class AbcReader(Unrolled):
+    setup_code = "o = self.o"
+    statement = ["o.a", "o.b", "o.c"]
         
 class BenchAttrReadInstance(AbcReader):
     "Read of an attribute from an object instance dictionary."
@@ -369,17 +749,10 @@ def nop_varargs(*args): pass
 def nop_kwargs(**kwargs): pass
 def nop3(a, b, c): pass
 
-class CallNoArgsBase(Unrolled32):
+class CallNoArgsBase(Unrolled):
     categories = ["function"]
-    
-    def run(self, num_ops):
-        f = self.func
-        for i in xrange(0, num_ops, 32):
-            f(); f(); f(); f(); f(); f(); f(); f();
-            f(); f(); f(); f(); f(); f(); f(); f();
-            f(); f(); f(); f(); f(); f(); f(); f();
-            f(); f(); f(); f(); f(); f(); f(); f();
-                      
+    setup_code = "f = self.func"
+    statement = "f()"
     
 class BenchCallEmptyFunction(CallNoArgsBase):
     "Call to an empty function."
@@ -423,318 +796,141 @@ class BenchCallEmptyKwargs(CallNoArgsBase):
     def prepare(self):
         self.func = nop_kwargs
         
-class BenchCall3Positional(Unrolled32):
+class BenchCall3Positional(Unrolled):
     "Call to an empty function with three formal parameters using positional " \
     "arguments."
     name = "Call to an empty 3-parameter function"
     categories = ["function"]
+    setup_code = "f = nop3"
+    statement = "f(1, 2, 3)"
     
-    def run(self, num_ops):
-        f = nop3
-        for i in xrange(0, num_ops, 32):
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-             f(1, 2, 3); f(1, 2, 3); f(1, 2, 3); f(1, 2, 3);
-            
-class BenchCall3VarargExpand(Unrolled32):
+class BenchCall3VarargExpand(Unrolled):
     "Call to an empty function with three formal parameters using vararg " \
     "expansion."
     name = "Call to an empty 3-parameter function using vararg (*) expansion"
     categories = ["function"]
+    setup_code = "f = nop3\na = (1, 2, 3)"
+    statement = "f(*a)"
     
-    def run(self, num_ops):
-        f = nop3
-        a = (1, 2, 3)
-        for i in xrange(0, num_ops, 32):
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-             f(*a); f(*a); f(*a); f(*a);
-            
-class BenchCall3KwargExpand(Unrolled32):
+class BenchCall3KwargExpand(Unrolled):
     "Call to an empty function with three formal parameters using kwarg (**) " \
     "expansion."
     name = "Call to an empty 3-parameter function using kwarg (**) expansion"
     categories = ["function"]
+    setup_code = "f = nop3\na = self.a"
+    statement = "f(**a)"
     
     def prepare(self):
         self.a = { "a": 1, "b": 2, "c": 3 }
     
-    def run(self, num_ops):
-        f = nop3
-        a = self.a
-        for i in xrange(0, num_ops, 32):
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-             f(**a); f(**a); f(**a); f(**a);
-            
-class BenchCall3BothExpands(Unrolled32):
+class BenchCall3BothExpands(Unrolled):
     "Call to an empty function with three formal parameters using both " \
     "vararg (*) and kwarg (**) expansion."
     name = "Call to an empty 3-parameter function using both vararg (*) and " \
     "kwarg (**) expansion"
     categories = ["function"]
+    setup_code = "f = nop3\na = (1,)\nb = self.b"
+    statement = "f(*a, **b)"
     
     def prepare(self):
         self.b = { "b": 2, "c": 3 }
     
-    def run(self, num_ops):
-        f = nop3
-        a = (1,)
-        b = self.b
-        for i in xrange(0, num_ops, 32):
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);
-             f(*a, **b); f(*a, **b); f(*a, **b); f(*a, **b);             
-
 # Built-in type construction.
 
-class BenchCreateEmptyTuple(Unrolled32):
+class BenchCreateEmptyTuple(Unrolled):
     "Building empty tuples. Actually just loads constants."
     name = "Creation of empty tuple"
     categories = ["object_creation", "list"]
+    statement = "()"
     
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            (); (); (); (); (); (); (); (); (); (); (); (); (); (); (); ();
-            (); (); (); (); (); (); (); (); (); (); (); (); (); (); (); ();
-        
-class BenchCreateTuple4(Unrolled32):
+class BenchCreateTuple4(Unrolled):
     "Creation of 4-tuples from local variables."
     name = "Creation of a 4-tuple"
     categories = ["object_creation"]
+    setup_code = "k = 123"
+    statement = "(k, k, k, k)"
     
-    def run(self, num_ops):
-        k = 123
-        for i in xrange(0, num_ops, 32):
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);
-            (k, k, k, k); (k, k, k, k); (k, k, k, k); (k, k, k, k);            
-        
-class BenchCreateEmptyList(Unrolled32):
+class BenchCreateEmptyList(Unrolled):
     "Creation of empty lists."
     name = "Creation of an empty list"
     categories = ["object_creation", "list"]
+    statement = "[]"
     
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            []; []; []; []; []; []; []; []; []; []; []; []; []; []; []; [];
-            []; []; []; []; []; []; []; []; []; []; []; []; []; []; []; [];
-        
-class BenchCreateList4(Unrolled32):
+class BenchCreateList4(Unrolled):
     "Creation of 4 item lists from local variables."
     name = "Creation of a 4 item list using [ k, k, k, k ]"
     categories = ["object_creation"]
+    setup_code = "k = 123"
+    statement = "[ k, k, k, k ]"
     
-    def run(self, num_ops):
-        k = 123
-        for i in xrange(0, num_ops, 32):
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-           [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ]; [ k, k, k, k ];
-                       
-        
-class BenchCreateEmptyDict(Unrolled32):
+class BenchCreateEmptyDict(Unrolled):
     "Creation of an empty dictionary."
     name = "Creation of empty dict"
     categories = ["object_creation"]
     tags = ["create_empty_dict"]
+    statement = "{}"
     
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {};
-            {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {}; {};
-        
-class BenchBuildDict4(Unrolled32):
+class BenchBuildDict4(Unrolled):
     "Creation of 4-entry dict from constants."
     name = "Creation of a 4-entry dict using {...}"
     categories = ["object_creation"]
+    statement = ['{ "%s": 0, "%s": 1, "%s": 2, "%s": 3 }' % tuple(
+        [chr(ord("a") + (4 * i + j) % 26) for j in xrange(4)])
+        for i in xrange(13)]
     
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            { "a": 0, "b": 1, "c": 2, "d": 3 };
-            { "e": 0, "f": 1, "g": 2, "h": 3 };
-            { "i": 0, "j": 1, "k": 2, "l": 3 };
-            { "m": 0, "n": 1, "o": 2, "p": 3 };
-            { "q": 0, "r": 1, "s": 2, "t": 3 };
-            { "u": 0, "v": 1, "w": 2, "x": 3 };
-            { "y": 0, "z": 1, "a": 2, "b": 3 };
-            { "c": 0, "d": 1, "e": 2, "f": 3 };
-            { "g": 0, "h": 1, "i": 2, "j": 3 };
-            { "k": 0, "l": 1, "m": 2, "n": 3 };
-            { "o": 0, "p": 1, "q": 2, "r": 3 };
-            { "s": 0, "t": 1, "u": 2, "v": 3 };
-            { "w": 0, "x": 1, "y": 2, "z": 3 };
-            { "a": 0, "b": 1, "c": 2, "d": 3 };
-            { "e": 0, "f": 1, "g": 2, "h": 3 };
-            { "i": 0, "j": 1, "k": 2, "l": 3 };
-            { "m": 0, "n": 1, "o": 2, "p": 3 };
-            { "q": 0, "r": 1, "s": 2, "t": 3 };
-            { "u": 0, "v": 1, "w": 2, "x": 3 };
-            { "y": 0, "z": 1, "a": 2, "b": 3 };
-            { "c": 0, "d": 1, "e": 2, "f": 3 };
-            { "g": 0, "h": 1, "i": 2, "j": 3 };
-            { "k": 0, "l": 1, "m": 2, "n": 3 };
-            { "o": 0, "p": 1, "q": 2, "r": 3 };
-            { "s": 0, "t": 1, "u": 2, "v": 3 };
-            { "w": 0, "x": 1, "y": 2, "z": 3 };
-            { "a": 0, "b": 1, "c": 2, "d": 3 };
-            { "e": 0, "f": 1, "g": 2, "h": 3 };
-            { "i": 0, "j": 1, "k": 2, "l": 3 };
-            { "m": 0, "n": 1, "o": 2, "p": 3 };
-            { "q": 0, "r": 1, "s": 2, "t": 3 };
-            { "u": 0, "v": 1, "w": 2, "x": 3 };            
-
-class BenchCreateDict4WithConstructor(Unrolled32):
+class BenchCreateDict4WithConstructor(Unrolled):
     "Creation of 4 entry dict using dict()."
     name = "Creation of a 4-entry dict from tuples using dict()"
     categories = ["object_creation"]
     DATA = (("a", 0), ("b", 1), ("c", 2), ("d", 3))
-    
-    def run(self, num_ops):
-        d = self.DATA
-        f = dict
-        for i in xrange(0, num_ops, 32):
-            f(d); f(d); f(d); f(d); f(d); f(d); f(d); f(d);
-            f(d); f(d); f(d); f(d); f(d); f(d); f(d); f(d);
-            f(d); f(d); f(d); f(d); f(d); f(d); f(d); f(d);
-            f(d); f(d); f(d); f(d); f(d); f(d); f(d); f(d);            
+    setup_code = "d = self.DATA\nf = dict"
+    statement = "f(d)"
         
 # Object creation.
     
-class BenchObjectCreation(Unrolled32):
+class BenchObjectCreation(Unrolled):
     "Instantiation of a completely empty class (no __init__)."
     name = "Instantiation of a class with no __init__"
     categories = ["object_creation"]
+    setup_code = "class C(object):\n    pass"
+    statement = "C()"
     
-    def run(self, num_ops):
-        class C(object):
-            pass
-        for i in xrange(0, num_ops, 32):
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-
-         
-class BenchObjectCreationWithSlots(Unrolled32):
+class BenchObjectCreationWithSlots(Unrolled):
     "Instantiation of a class with empty __slots__ and without __init__."
     name = "Instantiation of a class without an __init__ and with __slots__"
     categories = ["object_creation"]
+    setup_code = "class C(object):\n    __slots__ = ()"
+    statement = "C()"
     
-    def run(self, num_ops):
-        class C(object):
-            __slots__ = ()
-        for i in xrange(0, num_ops, 32):
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            
-class BenchObjectCreationWithInit(Unrolled32):
+class BenchObjectCreationWithInit(Unrolled):
     "Instantiation of a class with an empty __init__."
     name = "Instantiation of a class with an empty __init__"
     categories = ["object_creation"]
+    setup_code = "class C(object):\n    def __init__(self):\n        pass"
+    statement = "C()"
     
-    def run(self, num_ops):
-        class C(object):
-            def __init__(self):
-                pass
-        for i in xrange(0, num_ops, 32):
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            C(); C(); C(); C(); C(); C(); C(); C();
-            
-class BenchObjectNew(Unrolled32):
+class BenchObjectNew(Unrolled):
     "Instantiation of a class by calling __new__."
     name = "Instantiation of a class by calling __new__"
     categories = ["object_creation"]
-    
-    def run(self, num_ops):
-        class C(object):
-            pass
-        
-        for i in xrange(0, num_ops, 32):
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);
-            C.__new__(C); C.__new__(C); C.__new__(C); C.__new__(C);            
+    setup_code = "class C(object):\n    pass"
+    statement = "C.__new__(C)"
        
 # List comprehensions and generators.
 
-class BenchListComp4(Unrolled32):
+class BenchListComp4(Unrolled):
     "Creation of 4 item lists from an xrange iterable using a comprehension."
     name = "Creation of a 4 item list using a [ n for n in xrange(...) ]"
     categories = ["object_creation"]
+    setup_code = "s = xrange(4)"
+    statement = "[ n for n in s ]"
     
-    def run(self, num_ops):
-        s = xrange(4)
-        for i in xrange(0, num_ops, 32):
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ]; [ n for n in s ];
-            [ n for n in s ]; [ n for n in s ];
-        
-class BenchGenExpr4(Unrolled32):
+class BenchGenExpr4(Unrolled):
     "Creation of a 4 item iterator using a generator expression."
     name = "Creation of a 4 item generator using ( n for n in xrange(...) )"
     categories = ["object_creation"]
-    
-    def run(self, num_ops):
-       s = xrange(4)
-       for i in xrange(0, num_ops, 32):
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s ); ( n for n in s );
-           ( n for n in s ); ( n for n in s );
+    setup_code = "s = xrange(4)"
+    statement = "( n for n in s )"
         
 class BenchCreateListAppend4(Candidate):
     "Creation of 4 item lists using list.append()."
@@ -789,6 +985,7 @@ class BenchIterationList(Candidate):
     name = "Iteration over a list: time per item"
     categories = ["iteration"]
     overheads = ["unrolled1000"]
+    step = 1000
     
     def prepare(self):
         self.data = [ i for i in xrange(1000) ]
@@ -800,45 +997,10 @@ class BenchIterationList(Candidate):
             for item in data:
                 pass
             
-class IterationOverheadBench(Unrolled32):
+class IterationOverheadBench(Unrolled):
     categories = ["iteration"]
-    
-    def run(self, num_ops):
-        it = self.iterable
-        for i in xrange(0, num_ops, 32):
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            for x in it: pass
-            
+    setup_code = "it = self.iterable"
+    statement = "for x in it: pass"
         
 class BenchIterationOverheadList(IterationOverheadBench):
     "Iteration over an empty list."
@@ -869,7 +1031,7 @@ class BenchIterationRepeat(Candidate):
     overheads = ["pass"]
     
     def run(self, num_ops):
-        for item in repeat(None, NUM_OPS):
+        for item in repeat(None, num_ops):
             pass
         
 class BenchIterationChainedRepeat(Candidate):
@@ -877,6 +1039,7 @@ class BenchIterationChainedRepeat(Candidate):
     name = "Iteration over a chain(repeat(None)): time per item"
     categories = ["iteration"]
     overheads = ["pass"]
+    step = 1000
 
     def prepare(self):
         ranges = [ repeat(None, 1000) for i in xrange(0, self.num_ops, 1000) ]
@@ -888,54 +1051,23 @@ class BenchIterationChainedRepeat(Candidate):
         
 # Zip functions.
 
-class Zip2BenchBase(Unrolled32):
+class Zip2BenchBase(Unrolled):
+    setup_code = "f = self.zipfunc\na = self.list_a\nb = self.list_b"
+    statement = "for p in f(a, b): pass"
+    # Python 3's zip() is lazy, so there the zip() candidates build the list
+    # explicitly, as Python 2's zip() does.
+    list_statement = statement if PY2 else "for p in list(f(a, b)): pass"
+
     def prepare(self):
         self.list_a = [ i for i in xrange(self.LIST_SIZE) ]
         self.list_b = [ i for i in xrange(self.LIST_SIZE) ]
-    
-    def run(self, num_ops):
-        f = self.zipfunc
-        a = self.list_a
-        b = self.list_b
-        for i in xrange(0, num_ops, 32):
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
-            for p in f(a, b): pass
                    
 class BenchZip8(Zip2BenchBase):
     "Creation of and iteration over a 'zip' zip of two 8-item lists."
     name = "zip() and iterate over two 8-item lists"
     categories = ["zip"]
     zipfunc = zip
+    statement = Zip2BenchBase.list_statement
     LIST_SIZE = 8
     
 class BenchIzip8(Zip2BenchBase):
@@ -950,6 +1082,7 @@ class BenchZip100(Zip2BenchBase):
     name = "zip() and iterate over two 100-item lists"
     categories = ["zip"]
     zipfunc = zip
+    statement = Zip2BenchBase.list_statement
     LIST_SIZE = 100
 
 class BenchIzip100(Zip2BenchBase):
@@ -961,271 +1094,149 @@ class BenchIzip100(Zip2BenchBase):
 
 # Dictionary tests.
 
-class DictBench(Unrolled32):
+DICT4 = dict([ ("item %d" % i, i) for i in xrange(4) ])
+DICT32 = dict([ ("item %d" % i, i) for i in xrange(32) ])
+
+class DictBench(Unrolled):
     categories = ["dict"]
     
-    DICT4 = dict([ ("item %d" % i, i) for i in xrange(4) ])
-    DICT32 = dict([ ("item %d" % i, i) for i in xrange(32) ])
+    DICT4 = DICT4
+    DICT32 = DICT32
       
 class BenchDict4Lookup(DictBench):
     "Lookups in a 4-entry dictionary."
     name = 'd["key"] on a 4 entry dict'
-    
-    def run(self, num_ops):   
-        d = self.DICT4
-        for i in xrange(0, num_ops, 32):
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];
-            d["item 0"]; d["item 1"]; d["item 2"]; d["item 3"];            
+    setup_code = "d = self.DICT4"
+    statement = ['d["item %d"]' % i for i in xrange(4)]
             
 class BenchDict32Lookup(DictBench):
     "Lookups in a 32-entry dictionary."
     name = 'd["key"] on a 32 entry dict'
-    
-    def run(self, num_ops):
-        d = self.DICT32
-        for i in xrange(0, num_ops, 32):
-            d["item 0"];  d["item 1"];  d["item 2"];  d["item 3"]; 
-            d["item 4"];  d["item 5"];  d["item 6"];  d["item 7"]; 
-            d["item 8"];  d["item 9"];  d["item 10"]; d["item 11"];
-            d["item 12"]; d["item 13"]; d["item 14"]; d["item 15"];
-            d["item 16"]; d["item 17"]; d["item 18"]; d["item 19"];
-            d["item 20"]; d["item 21"]; d["item 22"]; d["item 23"];
-            d["item 24"]; d["item 25"]; d["item 26"]; d["item 27"];
-            d["item 28"]; d["item 29"]; d["item 30"]; d["item 31"];            
+    setup_code = "d = self.DICT32"
+    statement = ['d["item %d"]' % i for i in xrange(32)]
         
 class BenchDict4In(DictBench):
     '"in" operator tests on a 4-entry dictionary.'
     name = '"in" test on a 4 entry dict'
-
-    def run(self, num_ops):
-        d = self.DICT4
-        for i in xrange(0, num_ops, 32):
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
-            "item 0" in d; "item 1" in d; "item 2" in d; "item 3" in d;
+    setup_code = "d = self.DICT4"
+    statement = ['"item %d" in d' % i for i in xrange(4)]
             
 class BenchDict32In(DictBench):
     '"in" operator tests on a 32-entry dictionary.'
     name = '"in" test on a 32 entry dict'
-    
-    def run(self, num_ops):
-        d = self.DICT32
-        for i in xrange(0, num_ops, 32):
-             "item 0" in d;  "item 1" in d;  "item 2" in d;  "item 3" in d; 
-             "item 4" in d;  "item 5" in d;  "item 6" in d;  "item 7" in d; 
-             "item 8" in d;  "item 9" in d;  "item 10" in d; "item 11" in d;
-             "item 12" in d; "item 13" in d; "item 14" in d; "item 15" in d;
-             "item 16" in d; "item 17" in d; "item 18" in d; "item 19" in d;
-             "item 20" in d; "item 21" in d; "item 22" in d; "item 23" in d;
-             "item 24" in d; "item 25" in d; "item 26" in d; "item 27" in d;
-             "item 28" in d; "item 29" in d; "item 30" in d; "item 31" in d;             
+    setup_code = "d = self.DICT32"
+    statement = ['"item %d" in d' % i for i in xrange(32)]
         
 class BenchDict4Get(DictBench):
     "get() calls on a 4-entry dictionary."
     name = "get() on a 4 entry dict"
-    
-    def run(self, num_ops):
-        d = self.DICT4
-        for i in xrange(0, num_ops, 32):
-            d.get("item 0"); d.get("item 1"); d.get("item 2");
-            d.get("item 3"); d.get("item 0"); d.get("item 1");
-            d.get("item 2"); d.get("item 3"); d.get("item 0");
-            d.get("item 1"); d.get("item 2"); d.get("item 3");
-            d.get("item 0"); d.get("item 1"); d.get("item 2");
-            d.get("item 3"); d.get("item 0"); d.get("item 1");
-            d.get("item 2"); d.get("item 3"); d.get("item 0");
-            d.get("item 1"); d.get("item 2"); d.get("item 3");
-            d.get("item 0"); d.get("item 1"); d.get("item 2");
-            d.get("item 3"); d.get("item 0"); d.get("item 1");
-            d.get("item 2"); d.get("item 3");
-            
+    setup_code = "d = self.DICT4"
+    statement = ['d.get("item %d")' % i for i in xrange(4)]
             
 class BenchDict32Get(DictBench):
     "get() calls on a 32-entry dictionary."
     name = "get() on a 32 entry dict"
-    
-    def run(self, num_ops):
-        d = self.DICT32
-        for i in xrange(0, num_ops, 32):
-            d.get("item 0");  d.get("item 1");  d.get("item 2"); 
-            d.get("item 3");  d.get("item 4");  d.get("item 5"); 
-            d.get("item 6");  d.get("item 7");  d.get("item 8"); 
-            d.get("item 9");  d.get("item 10"); d.get("item 11");
-            d.get("item 12"); d.get("item 13"); d.get("item 14");
-            d.get("item 15"); d.get("item 16"); d.get("item 17");
-            d.get("item 18"); d.get("item 19"); d.get("item 20");
-            d.get("item 21"); d.get("item 22"); d.get("item 23");
-            d.get("item 24"); d.get("item 25"); d.get("item 26");
-            d.get("item 27"); d.get("item 28"); d.get("item 29");
-            d.get("item 30"); d.get("item 31");            
+    setup_code = "d = self.DICT32"
+    statement = ['d.get("item %d")' % i for i in xrange(32)]
             
 class BenchDict4Assign(DictBench):
     "Item assignment to a 4-entry dictionary."
     name = "d[key] = val on a 4 entry dict"
-    overheads = ["unrolled32", ("create_empty_dict", 1.0 / 32.0)]
-       
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            d = {}
-            d["item 0"] = 0;  d["item 1"] = 1;  d["item 2"] = 2; 
-            d["item 3"] = 3;  d["item 0"] = 4;  d["item 1"] = 5; 
-            d["item 2"] = 6;  d["item 3"] = 7;  d["item 0"] = 8; 
-            d["item 1"] = 9;  d["item 2"] = 10; d["item 3"] = 11;
-            d["item 0"] = 12; d["item 1"] = 13; d["item 2"] = 14;
-            d["item 3"] = 15; d["item 0"] = 16; d["item 1"] = 17;
-            d["item 2"] = 18; d["item 3"] = 19; d["item 0"] = 20;
-            d["item 1"] = 21; d["item 2"] = 22; d["item 3"] = 23;
-            d["item 0"] = 24; d["item 1"] = 25; d["item 2"] = 26;
-            d["item 3"] = 27; d["item 0"] = 28; d["item 1"] = 29;
-            d["item 2"] = 30; d["item 3"] = 31;            
+    loop_setup = "d = {}"
+    loop_overheads = ["create_empty_dict"]
+    statement = ['d["item %d"] = %d' % (i % 4, i) for i in xrange(32)]
             
 class BenchDict32Assign(DictBench):
     "Item assignment to a 32-entry dictionary."
     name = "d[key] = val on a 32 entry dict"
-    overheads = ["unrolled32", ("create_empty_dict", 1.0 / 32.0)]
-   
-    def run(self, num_ops):
-        for i in xrange(0, num_ops, 32):
-            d = {}
-            d["item 0"] = 0;   d["item 1"] = 1;   d["item 2"] = 2;  
-            d["item 3"] = 3;   d["item 4"] = 4;   d["item 5"] = 5;  
-            d["item 6"] = 6;   d["item 7"] = 7;   d["item 8"] = 8;  
-            d["item 9"] = 9;   d["item 10"] = 10; d["item 11"] = 11;
-            d["item 12"] = 12; d["item 13"] = 13; d["item 14"] = 14;
-            d["item 15"] = 15; d["item 16"] = 16; d["item 17"] = 17;
-            d["item 18"] = 18; d["item 19"] = 19; d["item 20"] = 20;
-            d["item 21"] = 21; d["item 22"] = 22; d["item 23"] = 23;
-            d["item 24"] = 24; d["item 25"] = 25; d["item 26"] = 26;
-            d["item 27"] = 27; d["item 28"] = 28; d["item 29"] = 29;
-            d["item 30"] = 30; d["item 31"] = 31; 
-            
-class BenchDict4Copy(DictBench):
+    loop_setup = "d = {}"
+    loop_overheads = ["create_empty_dict"]
+    statement = ['d["item %d"] = %d' % (i, i) for i in xrange(32)]
+
+class BenchDict4Copy(Straight):
     "dict.copy() on a 4-entry dict."
     name = "dict.copy() a 4 entry dict"
+    categories = ["dict"]
     tags = ["dict4_copy"]
-    overheads = ["straight"]
-    
+   
     def run(self, num_ops):
-        d = self.DICT4
+        d = DICT4
         f = dict.copy
         for i in xrange(num_ops):
             f(d)
             
-class BenchDict32Copy(DictBench):
+class BenchDict32Copy(Straight):
     "dict.copy() on a 32-entry dict."
     name = "dict.copy() a 32 entry dict"
+    categories = ["dict"]
     tags = ["dict32_copy"]
-    overheads = ["straight"]
     
     def run(self, num_ops):
-        d = self.DICT32
+        d = DICT32
         f = dict.copy
         for i in xrange(num_ops):
             f(d)
             
-class BenchDict4Update(DictBench):
+class BenchDict4Update(Candidate):
     "dict.update() an empty dict with a 4-entry dict."
     name = "update() an empty dict with a 4-entry dict."
+    categories = ["dict"]
     overheads = ["straight", "create_empty_dict"]
     
     def run(self, num_ops):
-        s = self.DICT4
+        s = DICT4
         f = dict.update
         for i in xrange(num_ops):
             f({}, s)
             
-class BenchDict32Update(DictBench):
+class BenchDict32Update(Candidate):
     "dict.update() an empty dict with a 32-entry dict."
     name = "update() an empty dict with a 32-entry dict."
+    categories = ["dict"]
     overheads = ["straight", "create_empty_dict"]
     
     def run(self, num_ops):
-        s = self.DICT32
+        s = DICT32
         f = dict.update
         for i in xrange(num_ops):
             f({}, s)
             
-class BenchDict4UpdateKwargs(DictBench):
+class BenchDict4UpdateKwargs(Candidate):
     "dict.update() an empty dict passing 4 keyword args."
     name = "update() an empty dict passing 4 keyword args"
+    categories = ["dict"]
     overheads = ["straight", "create_empty_dict"]
     
     def run(self, num_ops):
-        s = self.DICT4
         f = dict.update
         for i in xrange(num_ops):
             f({}, a=1, b=2, c=3, d=4)
 
-
 class BenchDict32Pop(DictBench):
     "dict.pop() on a 32 entry dictionary."
     name = "pop() on a 32 entry dict"
     categories = ["dict"]
-    overheads = ["unrolled32", ("dict32_copy", 1.0 / 32.0)]
-    
-    def run(self, num_ops):
-        src = self.DICT32
-        for i in xrange(0, num_ops, 32):
-            d = src.copy()
-            d.pop("item 0");  d.pop("item 1");  d.pop("item 2"); 
-            d.pop("item 3");  d.pop("item 4");  d.pop("item 5"); 
-            d.pop("item 6");  d.pop("item 7");  d.pop("item 8"); 
-            d.pop("item 9");  d.pop("item 10"); d.pop("item 11");
-            d.pop("item 12"); d.pop("item 13"); d.pop("item 14");
-            d.pop("item 15"); d.pop("item 16"); d.pop("item 17");
-            d.pop("item 18"); d.pop("item 19"); d.pop("item 20");
-            d.pop("item 21"); d.pop("item 22"); d.pop("item 23");
-            d.pop("item 24"); d.pop("item 25"); d.pop("item 26");
-            d.pop("item 27"); d.pop("item 28"); d.pop("item 29");
-            d.pop("item 30"); d.pop("item 31");            
+    setup_code = "src = self.DICT32"
+    loop_setup = "d = src.copy()"
+    loop_overheads = ["dict32_copy"]
+    statement = ['d.pop("item %d")' % i for i in xrange(32)]
+    max_unroll = 32
             
 class BenchDict32Del(DictBench):
     'del dict["item"] on a 32-entry dictionary.'
     name = 'del d["key"] on a 32 entry dict'
     categories = ["dict"]
-    overheads = ["unrolled32", ("dict32_copy", 1.0 / 32.0)]
-    
-    def run(self, num_ops):
-        src = self.DICT32
-        for i in xrange(0, num_ops, 32):
-            d = src.copy()
-            del d["item 0"];  del d["item 1"];  del d["item 2"]; 
-            del d["item 3"];  del d["item 4"];  del d["item 5"]; 
-            del d["item 6"];  del d["item 7"];  del d["item 8"]; 
-            del d["item 9"];  del d["item 10"]; del d["item 11"];
-            del d["item 12"]; del d["item 13"]; del d["item 14"];
-            del d["item 15"]; del d["item 16"]; del d["item 17"];
-            del d["item 18"]; del d["item 19"]; del d["item 20"];
-            del d["item 21"]; del d["item 22"]; del d["item 23"];
-            del d["item 24"]; del d["item 25"]; del d["item 26"];
-            del d["item 27"]; del d["item 28"]; del d["item 29"];
-            del d["item 30"]; del d["item 31"];
+    setup_code = "src = self.DICT32"
+    loop_setup = "d = src.copy()"
+    loop_overheads = ["dict32_copy"]
+    statement = ['del d["item %d"]' % i for i in xrange(32)]
+    max_unroll = 32
             
 # Built-in functions.
 
-class HasattrBase(Unrolled32):        
-    def run(self, num_ops):
-        f = hasattr
-        o = self.o
-        for i in xrange(0, num_ops, 32):
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
-            f(o, "a"); f(o, "a"); f(o, "a"); f(o, "a");
+class HasattrBase(Unrolled):
+    setup_code = "f = hasattr\no = self.o"
+    statement = 'f(o, "a")'
         
 class BenchHasattr(HasattrBase):
     "hasattr() call for an attribute that exists."
@@ -1247,64 +1258,36 @@ class BenchHasattrMissing(HasattrBase):
             pass
         self.o = C()
         
-class BenchType(Unrolled32):
+class BenchType(Unrolled):
     "A call to type(obj)."
     name = "type(obj)"
     categories = ["builtin", "duck"]
+    setup_code = "f = type\no = self.o"
+    statement = "f(o)"
     
     def prepare(self):
         class C(object):
             pass
         self.o = C()
         
-    def run(self, num_ops):
-        f = type 
-        o = self.o
-        for t in xrange(0, num_ops, 32):
-            f(o); f(o); f(o); f(o); f(o); f(o); f(o); f(o);
-            f(o); f(o); f(o); f(o); f(o); f(o); f(o); f(o);
-            f(o); f(o); f(o); f(o); f(o); f(o); f(o); f(o);
-            f(o); f(o); f(o); f(o); f(o); f(o); f(o); f(o);           
-
-class BenchLen(Unrolled32):
+class BenchLen(Unrolled):
     "len() calls on lists and tuples."
     name = "len()"
     categories = ["builtin"]
+    setup_code = "f = len\na = self.data1\nb = self.data2"
+    statement = ["f(a)", "f(b)"]
     
     def prepare(self):
         self.data1 = [ 1, 2, 3 ]
         self.data2 = (1, 2, 3, 4, 5, 6, 7)
         
-    def run(self, num_ops):
-        f = len
-        a = self.data1
-        b = self.data2
-        for i in xrange(0, num_ops, 32):
-            f(a); f(b); f(a); f(b); f(a); f(b); f(a); f(b);
-            f(a); f(b); f(a); f(b); f(a); f(b); f(a); f(b);
-            f(a); f(b); f(a); f(b); f(a); f(b); f(a); f(b);
-            f(a); f(b); f(a); f(b); f(a); f(b); f(a); f(b);            
-
-class IsInstanceBench(Unrolled32):
+class IsInstanceBench(Unrolled):
     categories = ["builtin", "duck"]
+    setup_code = "o = self.o\nC = self.C\nf = isinstance"
+    statement = "f(o, C)"
     
     class C(object): 
         pass    
-    
-    def run(self, num_ops):
-        o = self.o
-        C = self.C
-        f = isinstance
-        for i in xrange(0, num_ops, 32):
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            f(o, C); f(o, C); f(o, C); f(o, C);
-            
 
 class BenchIsInstanceTrue(IsInstanceBench):
     "isinstance() calls."
@@ -1341,14 +1324,13 @@ class BenchTryRaiseExcept(Straight):
     name = '"try...except" block when an exception is raised and caught'
     categories = ["exceptions"]
     
-    def prepare(self):
-        self.e = Exception()
-        
+    # Raising the same instance repeatedly would grow its traceback under
+    # Python 3, so a new instance is raised each time.
     def run(self, num_ops):
-        e = self.e
+        E = Exception
         for i in xrange(num_ops):
             try:
-                raise e
+                raise E
             except:
                 pass
             
@@ -1360,15 +1342,11 @@ class BenchTryRaiseExceptFilter(Straight):
     class E(Exception):
         pass
     
-    def prepare(self):
-        self.e = self.E()
-        
     def run(self, num_ops):
-        e = self.e
         E = self.E
         for i in xrange(num_ops):
             try:
-                raise e
+                raise E
             except E:
                 pass
 
@@ -1405,124 +1383,3624 @@ class BenchTryExceptAttrTestAttrDoesntExist(TryExceptAttributeTest):
             pass
         self.o = C()
         
-overhead_candidate_classes = [
-    BenchPass,
-    BenchStraight,
-    BenchUnrolled32,
-    BenchUnrolled100,
-    BenchUnrolled1000
-]
+# Threads. Candidates that run code in other threads start them in run(), 
+# and subtract the cost of starting and joining a thread once per sample.
 
-def benchmark(unit="us", candidates=[], categories=[]):
-    MULTIPLIERS = { 
-        "s" : 1e0,
-        "ms": 1e3, 
-        "us": 1e6, 
-        "ns": 1e9 
-    }
-    
-    def pretty(n):
-        if n >= 0.0:    
-            s = "%.0f" % n   
-            return ",".join([s[max(i, 0):i + 3] for i in 
-                xrange(len(s) % -3, len(s), 3)])
-        else:
-            return "-" + pretty(-n)
+# The thread counts that CPU-bound work is spread across.
+THREAD_COUNTS = [2 ** i for i in xrange(5)]
 
-    base = [cls() for cls in overhead_candidate_classes]
-    base += [candidate for candidate in candidates if candidate not in base]
-    candidates = base
+def gil_enabled():
+    """Whether the interpreter runs Python code in one thread at a time. Free
+    threaded builds of CPython 3.13 and later can run without the GIL."""
+    import platform
+    if hasattr(sys, "_is_gil_enabled"):
+        return sys._is_gil_enabled()
+    return platform.python_implementation() not in ("IronPython", "Jython")
 
-    Candidate.setup()
-    
-    # Run the benchmarks. The gc module throws exceptions under IronPython.
-    for ps in xrange(REPETITIONS):
-        for candidate in candidates:
-            candidate.prepare()
-            try:
-                gc.disable()
-            except:
-                pass
-            candidate.time()
-            try:
-                gc.enable()
-            except:
-                pass
-            candidate.cleanup()
+def switch_interval():
+    "How often, in seconds, the GIL is handed to another thread that wants it."
+    try:
+        return sys.getswitchinterval()
+    except AttributeError:
+        return None
+
+class BenchThreadSpawn(Candidate):
+    "Starting a thread that does nothing and joining it."
+    tags = ["thread_spawn"]
+    per_sample = True
+
+    def run(self, num_ops):
+        thread = threading.Thread(target=nop)
+        thread.start()
+        thread.join()
+
+class Threaded(Candidate):
+    categories = ["threads"]
+    overheads = ["thread_spawn"]
+    expected_noise = ["voluntary_switches", "involuntary_switches"]
     
-    # Take the shortest time achieved for each benchmark and normalize per-op.
-    mean = lambda v: sum(v) / len(v)
-    for candidate in candidates:
-        candidate.time_per_op = min(candidate.times) / candidate.num_ops
-        
-    # Resolve overheads.
-    unresolved = candidates
-    overheads = defaultdict(float)
-    while unresolved:
-        work = unresolved
-        unresolved = []
-        for candidate in work:
-            t = candidate.time_per_op
-            for tag, multiplier in candidate.overheads:
-                if tag not in overheads:
-                    unresolved.append(candidate)
-                    break
-                t -= overheads[tag] * multiplier
-            else:
-                candidate.time_per_op = t
-                for tag in candidate.tags:
-                    overheads[tag] = t
-        if len(unresolved) == len(work):
-            raise Exception("Mutually dependent overheads")
-                            
-    # Do unit conversion.
-    multiplier = MULTIPLIERS[unit]
-    for candidate in candidates:
-        candidate.time_per_op *= multiplier
-        
-    # Make a list of categories to print.
-    priority = count()
-    catorder = dict((name, priority.next()) for name, desc in categories)
-    catitems = defaultdict(set)
-    fieldwidth1 = None
-    for candidate in candidates:
-        if not candidate.name:
-            continue
-        fieldwidth1 = max(fieldwidth1, len(pretty(candidate.time_per_op)))
-        for catname in candidate.categories:
-            catitems[catname].add(candidate)
-            if catname not in catorder:
-                catorder[catname] = priority.next()
-    catitems = sorted(catitems.iteritems(), key=lambda item: catorder[item[0]])
+    # Handing off between threads costs microseconds, so the usual op count 
+    # would make samples take seconds.
+    target_time = 0.02
 
-    # Print the list.
-    catdescs = dict(categories) 
-    for name, items in catitems:
-        fieldwidth2 = max(len(candidate.name) for candidate in items)
-        sorted_items = sorted(items, key=operator.attrgetter("time_per_op"), 
-            reverse=True)
-        print "-= %s =-\n" % catdescs.get(name, name)
-        for candidate in sorted_items:
-            print "%*s%s %-*s" % (
-                fieldwidth1 + 4, 
-                pretty(candidate.time_per_op), 
-                unit, fieldwidth2, candidate.name
-                )
-        print ""
+class LockBench(Unrolled):
+    categories = ["threads"]
+    setup_code = "acquire = self.lock.acquire\nrelease = self.lock.release"
+    statement = "acquire(); release()"
 
-if __name__ == '__main__':
-    candidates = [cls() for name, cls in globals().items() if 
-        name.startswith("Bench")]
-    categories = [
-        ("basic", "Basic Operations"),
-        ("function", "Function Overhead"),
-        ("list", "Tuple and List Creation"),
-        ("object_creation", "Object Creation"),
-        ("exceptions", "Exception Handling"),
-        ("builtin", "Built-in Functions"),
-        ("iteration", "Iteration (time per item)"),
-        ("dict", "Dictionaries"),
-        ("zip", "zip() vs. izip()"),
-        ("duck", "Duck Typing Tests")
-    ]    
-    benchmark(unit="ns", candidates=candidates, categories=categories)
+    def prepare(self):
+        self.lock = self.make()
+
+class BenchLockUncontended(LockBench):
+    "acquire() and release() of a Lock no other thread uses."
+    name = "Lock acquire() and release(), uncontended"
+    make = staticmethod(threading.Lock)
+
+class BenchRLockUncontended(LockBench):
+    "acquire() and release() of an RLock no other thread uses."
+    name = "RLock acquire() and release(), uncontended"
+    make = staticmethod(threading.RLock)
+
+class BenchLockWith(LockBench):
+    "A with statement on a Lock no other thread uses."
+    name = "with lock: pass, uncontended"
+    setup_code = "lock = self.lock"
+    statement = "with lock: pass"
+    make = staticmethod(threading.Lock)
+
+class SharedLock(Threaded):
+    """Two threads that acquire() and release() the same lock in a loop. 
+    Under the GIL each runs for a switch interval at a time, so they rarely 
+    find the lock held by the other."""
+    step = 2
+
+    def run(self, num_ops):
+        lock = self.make()
+        def share(n):
+            acquire = lock.acquire
+            release = lock.release
+            for i in xrange(n):
+                acquire()
+                release()
+        thread = threading.Thread(target=share, args=(num_ops // 2,))
+        thread.start()
+        share(num_ops // 2)
+        thread.join()
+
+class BenchLockShared(SharedLock):
+    "acquire() and release() of a Lock by two threads at once."
+    name = "Lock acquire() and release(), shared by two threads"
+    make = staticmethod(threading.Lock)
+
+class BenchRLockShared(SharedLock):
+    "acquire() and release() of an RLock by two threads at once."
+    name = "RLock acquire() and release(), shared by two threads"
+    make = staticmethod(threading.RLock)
+
+class BenchLockContended(Threaded):
+    """Locks handed back and forth between two threads. Each op is a 
+    release() that wakes the other thread from an acquire() it was blocked 
+    in. RLocks can't be handed over this way, since only the thread that
+    acquired one can release it."""
+    name = "Lock handoff, acquire() blocked until another thread's release()"
+    step = 2
+
+    def run(self, num_ops):
+        ping = threading.Lock()
+        pong = threading.Lock()
+        ping.acquire()
+        pong.acquire()
+        def partner():
+            for i in xrange(num_ops // 2):
+                ping.acquire()
+                pong.release()
+        thread = threading.Thread(target=partner)
+        thread.start()
+        for i in xrange(num_ops // 2):
+            ping.release()
+            pong.acquire()
+        thread.join()
+
+class BenchConditionWakeup(Threaded):
+    "Round trips between two threads that take turns to wake each other."
+    name = "Condition notify() and wake-up, there and back"
+
+    def run(self, num_ops):
+        condition = threading.Condition()
+        turn = [0]
+        def partner():
+            with condition:
+                for i in xrange(num_ops):
+                    while turn[0] != 1:
+                        condition.wait()
+                    turn[0] = 0
+                    condition.notify()
+        thread = threading.Thread(target=partner)
+        thread.start()
+        with condition:
+            for i in xrange(num_ops):
+                turn[0] = 1
+                condition.notify()
+                while turn[0] != 0:
+                    condition.wait()
+        thread.join()
+
+class BenchQueuePutGet(Unrolled):
+    "put() and get() on a Queue by the same thread."
+    name = "Queue put() and get(), one thread"
+    categories = ["threads"]
+    setup_code = "put = self.queue.put\nget = self.queue.get"
+    statement = "put(None); get()"
+    target_time = Threaded.target_time
+
+    def prepare(self):
+        self.queue = queue.Queue()
+
+class BenchQueueHandoff(Threaded):
+    "Items put() on a Queue by one thread and taken by get() in another."
+    name = "Queue put() in one thread, get() in another: time per item"
+
+    def run(self, num_ops):
+        q = queue.Queue()
+        def produce():
+            put = q.put
+            for i in xrange(num_ops):
+                put(None)
+        thread = threading.Thread(target=produce)
+        thread.start()
+        get = q.get
+        for i in xrange(num_ops):
+            get()
+        thread.join()
+
+class BenchThreadingLocalWrite(Unrolled):
+    "Write of an attribute of a threading.local object."
+    name = "threading.local attribute write"
+    categories = ["threads"]
+    setup_code = "o = self.o"
+    statement = ["o.a = 1", "o.b = 2", "o.c = 3"]
+
+    def prepare(self):
+        self.o = threading.local()
+
+class BenchThreadScaling(Sized, Threaded):
+    """A CPU-bound loop split evenly across a number of threads. With the GIL
+    the time per iteration stays flat at best, and grows with the cost of 
+    handing the GIL between threads."""
+    name = "CPU-bound loop split across threads: time per iteration"
+    sizes = THREAD_COUNTS
+    target_time = 0.05
+
+    def __init__(self, num_ops=NUM_OPS):
+        self.step = self.size
+        self.overheads = [("thread_spawn", float(self.size))]
+        Candidate.__init__(self, num_ops)
+
+    @classmethod
+    def label(cls, size):
+        return "%d thread%s" % (size, "s" if size > 1 else "")
+    
+    def run(self, num_ops):
+        def work(n):
+            total = 0
+            for i in xrange(n):
+                total += i
+        threads = [threading.Thread(target=work, args=(num_ops // self.size,))
+            for i in xrange(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+# Inter-process communication. Each of these hands a payload of bytes to 
+# another process and waits for the answer, over a range of payload sizes.
+# The partner reads every byte of the payload with scan() and answers with 
+# a small int, so that each candidate moves the payload one way only. The 
+# partner process is started by prepare() and stopped by cleanup().
+
+IPC_SIZES = [8 * 8 ** i for i in xrange(9)]
+
+def process_context():
+    """The multiprocessing context that partner processes are started with: 
+    fork where it's available, since it starts them fastest and lets them 
+    share anonymous mmaps."""
+    try:
+        return multiprocessing.get_context("fork")
+    except (AttributeError, ValueError):
+        return multiprocessing
+
+def scan(data, length=None):
+    """Reads the first 'length' bytes of a payload, or all of them, in place.
+    Returns where the first zero byte is, which is -1 for the payloads sent 
+    here."""
+    return data.find(b"\0", 0, len(data) if length is None else length)
+
+def answer_pipe(conn):
+    "Answers what arrives on a connection with scan() until None arrives."
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        conn.send(scan(message))
+
+def answer_queue(inbox, outbox):
+    """Answers what arrives on one queue with scan() on the other until None
+    arrives."""
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        outbox.put(scan(message))
+
+def read_shared(conn, buffer):
+    """Answers each length that arrives on a connection with scan() of that 
+    many bytes of a shared buffer, until None arrives."""
+    while True:
+        length = conn.recv()
+        if length is None:
+            break
+        conn.send(scan(buffer, length))
+
+class IPCBench(Sized):
+    categories = ["ipc"]
+    sizes = IPC_SIZES
+    target_time = 0.05
+    expected_noise = ["voluntary_switches", "involuntary_switches"]
+    starts_processes = True
+
+    @classmethod
+    def label(cls, size):
+        return "%s payload" % pretty_bytes(size)
+
+class BenchPipeSendAnswer(IPCBench):
+    "A payload sent to another process over a Pipe, which answers with an int."
+    name = "multiprocessing.Pipe send and answer"
+    
+    def prepare(self):
+        self.payload = b"x" * self.size
+        self.conn, child = process_context().Pipe()
+        self.process = process_context().Process(target=answer_pipe, 
+            args=(child,))
+        self.process.start()
+        
+    def cleanup(self):
+        self.conn.send(None)
+        self.process.join()
+        del self.payload
+
+    def run(self, num_ops):
+        send = self.conn.send
+        recv = self.conn.recv
+        payload = self.payload
+        for i in xrange(num_ops):
+            send(payload)
+            recv()
+
+class BenchQueueSendAnswer(IPCBench):
+    """A payload put on a Queue to another process, which answers with an int
+    on another."""
+    name = "multiprocessing.Queue send and answer"
+    
+    def prepare(self):
+        self.payload = b"x" * self.size
+        self.inbox = process_context().Queue()
+        self.outbox = process_context().Queue()
+        self.process = process_context().Process(target=answer_queue, 
+            args=(self.outbox, self.inbox))
+        self.process.start()
+        
+    def cleanup(self):
+        self.outbox.put(None)
+        self.process.join()
+        del self.payload
+
+    def run(self, num_ops):
+        put = self.outbox.put
+        get = self.inbox.get
+        payload = self.payload
+        for i in xrange(num_ops):
+            put(payload)
+            get()
+
+class BenchSharedHandoff(IPCBench):
+    """A payload copied into an mmap shared with another process, which is
+    told its length over a Pipe, reads it in place and answers with an 
+    int. Only forked processes inherit the anonymous mmap, so it isn't run
+    where partners are started otherwise."""
+    name = "Copy into a shared mmap and notify over a Pipe"
+
+    @classmethod
+    def available(cls):
+        context = process_context()
+        if hasattr(context, "get_start_method"):
+            return context.get_start_method() == "fork"
+        return hasattr(os, "fork")
+    
+    def prepare(self):
+        import mmap
+        self.payload = b"x" * self.size
+        self.buffer = mmap.mmap(-1, self.size)
+        self.conn, child = process_context().Pipe()
+        self.process = process_context().Process(target=read_shared, 
+            args=(child, self.buffer))
+        self.process.start()
+        
+    def cleanup(self):
+        self.conn.send(None)
+        self.process.join()
+        self.buffer.close()
+        del self.payload
+
+    def run(self, num_ops):
+        buffer = self.buffer
+        send = self.conn.send
+        recv = self.conn.recv
+        payload = self.payload
+        length = len(payload)
+        for i in xrange(num_ops):
+            buffer[:length] = payload
+            send(length)
+            recv()
+
+class BenchPoolDispatch(IPCBench):
+    """Tasks sent with a payload to a pool of one worker process, pipelined 
+    by Pool.map(). The task is scan() of the payload."""
+    name = "multiprocessing.Pool task dispatch: time per task"
+    
+    def prepare(self):
+        self.payload = b"x" * self.size
+        self.pool = process_context().Pool(1)
+        
+    def cleanup(self):
+        self.pool.close()
+        self.pool.join()
+        del self.payload
+
+    def run(self, num_ops):
+        self.pool.map(scan, repeat(self.payload, num_ops), chunksize=1)
+
+def record(i):
+    "A record of the kind typically sent between processes."
+    return { "id": i, "name": "item %d" % i, "price": i * 0.25, 
+        "tags": ["new", "sale"], "active": True }
+
+class PickleBench(Sized, Straight):
+    """Sized by pickle protocol rather than size, for every protocol this
+    interpreter has."""
+    categories = ["ipc"]
+    sizes = list(xrange(pickle.HIGHEST_PROTOCOL + 1))
+    fit = False
+    resizable = False
+    
+    @classmethod
+    def label(cls, size):
+        return "protocol %d" % size
+    
+    def run(self, num_ops):
+        dumps = pickle.dumps
+        loads = pickle.loads
+        payload = self.payload
+        protocol = self.size
+        for i in xrange(num_ops):
+            loads(dumps(payload, protocol))
+
+class BenchPickleRecord(PickleBench):
+    "pickle.dumps() and loads() of a dict with a few fields."
+    name = "pickle dumps() and loads() of a record"
+    payload = record(1)
+
+class BenchPickleRecords(PickleBench):
+    "pickle.dumps() and loads() of a list of 1000 records."
+    name = "pickle dumps() and loads() of 1000 records"
+    payload = [record(i) for i in xrange(1000)]
+
+# Asyncio. Coroutine syntax doesn't parse under Python 2, so these candidates
+# declare the body of a coroutine as source, like unrolled candidates, and 
+# have it compiled on interpreters that have asyncio. run() drives the 
+# coroutine to completion on an event loop created in prepare(), and the cost
+# of run_until_complete() is subtracted once per sample.
+
+# Helpers the coroutines of candidates can use.
+ASYNC_HELPERS = """
+async def nop_coroutine():
+    pass
+
+async def count_up(n):
+    for i in range(n):
+        yield i
+"""
+
+def event_loops():
+    """Maps the name of each event loop implementation this interpreter has to
+    a function that creates a new loop."""
+    loops = {}
+    if sys.version_info < (3, 6):
+        return loops
+    import asyncio
+    loops["asyncio"] = asyncio.new_event_loop
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        loops["uvloop"] = uvloop.new_event_loop
+    return loops
+
+async_functions = {}
+
+def compile_async(cls):
+    """Generates and compiles the main() coroutine function of an async 
+    candidate class. The generated code sees the globals of the module 
+    defining the class, asyncio and ASYNC_HELPERS."""
+    if cls not in async_functions:
+        lines = ["async def main(self, num_ops):"]
+        lines += ["    " + line for line in cls.setup_code.splitlines()]
+        if cls.loop:
+            lines.append("    " + cls.loop)
+            lines += ["        " + line for line in cls.statement.splitlines()]
+        else:
+            lines += ["    " + line for line in cls.statement.splitlines()]
+        lines += ["    " + line for line in cls.teardown.splitlines()]
+        source = "\n".join(lines) + "\n"
+        namespace = dict(vars(sys.modules[cls.__module__]))
+        exec(compile("import asyncio\n" + ASYNC_HELPERS, "<async helpers>", 
+            "exec"), namespace)
+        exec(compile(source, "<%s>" % cls.__name__, "exec"), namespace)
+        async_functions[cls] = namespace["main"]
+    return async_functions[cls]
+
+class Async(Candidate):
+    """A candidate whose ops are coroutine code. main() runs 'setup_code', 
+    then 'statement' in 'loop', then 'teardown'. The loop header can be 
+    replaced, or left out for candidates that only run 'statement' once."""
+    categories = ["asyncio"]
+    overheads = ["straight", "async_run"]
+    setup_code = ""
+    loop = "for i in range(num_ops):"
+    statement = "pass"
+    teardown = ""
+    
+    # Trips through the event loop cost microseconds, so the usual op count
+    # would make samples take a second or more.
+    target_time = 0.002
+    
+    # The name of the event loop implementation in event_loops() the 
+    # candidates run on.
+    event_loop = "asyncio"
+    
+    def __init__(self, num_ops=NUM_OPS):
+        Candidate.__init__(self, num_ops)
+        self.main = compile_async(type(self)).__get__(self)
+    
+    @classmethod
+    def available(cls):
+        return "asyncio" in event_loops()
+    
+    @classmethod
+    def setup_loop(cls, event_loop="asyncio"):
+        """Chooses the event loop the candidates run on. Any name is accepted
+        by interpreters without asyncio, which have no candidates to run."""
+        loops = event_loops()
+        if loops and event_loop not in loops:
+            raise ValueError("Event loop %r is not available" % event_loop)
+        Async.event_loop = event_loop
+    
+    def prepare(self):
+        self.loop_object = event_loops()[Async.event_loop]()
+        
+    def cleanup(self):
+        self.loop_object.close()
+        
+    def run(self, num_ops):
+        self.loop_object.run_until_complete(self.main(num_ops))
+
+class BenchAsyncRun(Async):
+    "run_until_complete() of a coroutine that returns at once."
+    tags = ["async_run"]
+    overheads = []
+    per_sample = True
+    loop = None
+
+class BenchCoroutineCreate(Async):
+    "Creating a coroutine object and closing it without running it."
+    name = "Create and close a coroutine"
+    statement = "nop_coroutine().close()"
+
+class BenchAwaitCoroutine(Async):
+    "Awaiting a coroutine that returns without suspending."
+    name = "await of a coroutine that returns at once"
+    statement = "await nop_coroutine()"
+
+class BenchAwaitDoneFuture(Async):
+    "Awaiting a Future that already has a result."
+    name = "await of a completed Future"
+    setup_code = ("future = asyncio.get_event_loop().create_future()\n"
+        "future.set_result(None)")
+    statement = "await future"
+
+class BenchFutureResolve(Async):
+    "Creating a Future, setting its result and awaiting it."
+    name = "Future creation, set_result() and await"
+    setup_code = "create_future = asyncio.get_event_loop().create_future"
+    statement = ("future = create_future(); future.set_result(None); "
+        "await future")
+
+class BenchAsyncSwitch(Async):
+    """Yielding to the event loop and being resumed, the least a task switch
+    costs."""
+    name = "await asyncio.sleep(0), a round trip through the loop"
+    setup_code = "sleep = asyncio.sleep"
+    statement = "await sleep(0)"
+
+class BenchTaskCreate(Async):
+    """Wrapping a coroutine in a Task and awaiting it, which switches to the
+    task and back."""
+    name = "create_task() of a coroutine and await of the Task"
+    setup_code = "create_task = asyncio.get_event_loop().create_task"
+    statement = "await create_task(nop_coroutine())"
+
+class BenchCallSoon(Async):
+    """Scheduling a callback with call_soon(). The callbacks all run when the
+    coroutine yields to the loop at the end."""
+    name = "loop.call_soon() of a function, and running it"
+    setup_code = "call_soon = asyncio.get_event_loop().call_soon"
+    statement = "call_soon(nop)"
+    teardown = "await asyncio.sleep(0)"
+
+class BenchAsyncQueue(Async):
+    "put() and get() on an asyncio.Queue, neither of which has to wait."
+    name = "asyncio.Queue await put() and await get()"
+    setup_code = "queue = asyncio.Queue()\nput = queue.put\nget = queue.get"
+    statement = "await put(None); await get()"
+
+class BenchAsyncFor(Async):
+    "async for over an async generator."
+    name = "async for over an async generator (time per item)"
+    overheads = ["async_run"]
+    loop = "async for i in count_up(num_ops):"
+
+# File I/O. Each candidate works on a file of its own in a directory on one of
+# the filesystems in io_directories(), created by prepare() and removed by 
+# cleanup(), moving a block of 'size' bytes per op and starting over at the
+# start of the file when it gets to the end. Reads are served from the page
+# cache on every filesystem, so only fsync() reaches the device.
+
+# The size of the files, unless 4 blocks are more.
+IO_FILE_SIZE = 2 ** 20
+
+IO_SIZES = [2 ** (6 + 3 * i) for i in xrange(6)]
+
+# Filesystems that keep files in memory only.
+MEMORY_FILESYSTEMS = ["tmpfs", "ramfs"]
+
+def filesystem_type(path):
+    """The type of the filesystem a path is on, such as "ext4", from the 
+    longest mount point in /proc/mounts that contains it, or None."""
+    path = os.path.realpath(path)
+    best = None, None
+    try:
+        f = open("/proc/mounts")
+    except IOError:
+        return None
+    try:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            mount = fields[1].replace("\\040", " ")
+            if (path == mount or path.startswith(mount.rstrip("/") + "/")) \
+                and len(mount) > len(best[0] or ""):
+                best = mount, fields[2]
+    finally:
+        f.close()
+    return best[1]
+
+def io_directories():
+    """Maps "tmpfs" and "disk" to a writable temporary directory on a 
+    filesystem in memory and on one that isn't, for those that can be found.
+    The default temporary directory is tried first for either. Files are 
+    never created anywhere else, such as the working directory."""
+    import tempfile
+    directories = {}
+    for path in [tempfile.gettempdir(), "/dev/shm", 
+        os.environ.get("XDG_RUNTIME_DIR"), "/var/tmp"]:
+        if not path or not os.path.isdir(path) or not os.access(path, os.W_OK):
+            continue
+        if filesystem_type(path) in MEMORY_FILESYSTEMS:
+            directories.setdefault("tmpfs", path)
+        else:
+            directories.setdefault("disk", path)
+    return directories
+
+class IOBench(Sized, Straight):
+    """Opens the file with 'mode' and 'buffering' as io.open() takes them. 
+    Generated subclasses set the filesystem."""
+    categories = ["io"]
+    sizes = IO_SIZES
+    complexities = ["n"]
+    item = "byte"
+    filesystem = None
+    mode = "rb"
+    buffering = -1
+    
+    @classmethod
+    def label(cls, size):
+        return "%s blocks" % pretty_bytes(size)
+    
+    @classmethod
+    def available(cls):
+        return cls.filesystem in io_directories()
+    
+    def prepare(self):
+        import io
+        import tempfile
+        self.file_size = max(IO_FILE_SIZE, 4 * self.size)
+        fd, self.path = tempfile.mkstemp(prefix="opcosts-", 
+            dir=io_directories()[self.filesystem])
+        f = io.open(fd, "wb")
+        try:
+            f.write(b"x" * self.file_size)
+        finally:
+            f.close()
+        self.file = io.open(self.path, self.mode, self.buffering)
+        
+    def cleanup(self):
+        self.file.close()
+        os.remove(self.path)
+        
+    def passes(self, num_ops):
+        """Splits num_ops into passes over the file, yielding the offsets of 
+        the blocks of each."""
+        blocks = self.file_size // self.size
+        for done in xrange(0, num_ops, blocks):
+            yield xrange(0, min(blocks, num_ops - done) * self.size, self.size)
+
+def on_filesystem(cls, filesystem):
+    """Creates the candidate class running an I/O class on one of the 
+    filesystems in io_directories(). Its group is that of the class on that
+    filesystem, so that alternatives are only compared on the same one."""
+    return type("Bench%s%s" % (cls.__name__, filesystem.capitalize()), 
+        (cls,), {
+        "__module__": cls.__module__,
+        "__doc__": cls.__doc__,
+        "name": "%s on %s" % (cls.name, filesystem),
+        "group": "%s %s" % (cls.group, filesystem),
+        "filesystem": filesystem
+    })
+
+class FileRead(IOBench):
+    "read() of a block from a file opened unbuffered."
+    name = "read() of a block, unbuffered"
+    group = "read"
+    buffering = 0
+    
+    def run(self, num_ops):
+        read = self.file.read
+        seek = self.file.seek
+        size = self.size
+        for offsets in self.passes(num_ops):
+            seek(0)
+            for offset in offsets:
+                read(size)
+
+class FileReadBuffered(FileRead):
+    "read() of a block from a file opened with the default buffering."
+    name = "read() of a block, buffered"
+    buffering = -1
+
+class FileReadinto(IOBench):
+    "readinto() of a block into a preallocated bytearray, unbuffered."
+    name = "readinto() of a block into a bytearray, unbuffered"
+    group = "read"
+    buffering = 0
+    
+    def prepare(self):
+        IOBench.prepare(self)
+        self.buffer = bytearray(self.size)
+    
+    def run(self, num_ops):
+        readinto = self.file.readinto
+        seek = self.file.seek
+        buffer = self.buffer
+        for offsets in self.passes(num_ops):
+            seek(0)
+            for offset in offsets:
+                readinto(buffer)
+
+class MmapSlice(IOBench):
+    "Slicing a block out of an mmap of the file, which copies it."
+    name = "mmap slice of a block"
+    group = "read"
+    
+    def prepare(self):
+        import mmap
+        IOBench.prepare(self)
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+    def cleanup(self):
+        self.map.close()
+        IOBench.cleanup(self)
+    
+    def run(self, num_ops):
+        m = self.map
+        size = self.size
+        for offsets in self.passes(num_ops):
+            for offset in offsets:
+                m[offset:offset + size]
+
+class Pread(IOBench):
+    "os.pread() of a block at an offset, which doesn't move the file position."
+    name = "os.pread() of a block"
+    group = "read"
+    buffering = 0
+    
+    @classmethod
+    def available(cls):
+        return hasattr(os, "pread") and super(Pread, cls).available()
+    
+    def run(self, num_ops):
+        pread = os.pread
+        fd = self.file.fileno()
+        size = self.size
+        for offsets in self.passes(num_ops):
+            for offset in offsets:
+                pread(fd, size, offset)
+
+class FileWrite(IOBench):
+    """write() of a block over the contents of a file opened unbuffered. The
+    write is done once it's in the page cache."""
+    name = "write() of a block, unbuffered"
+    group = "write"
+    mode = "r+b"
+    buffering = 0
+    
+    def prepare(self):
+        IOBench.prepare(self)
+        self.block = b"x" * self.size
+    
+    def run(self, num_ops):
+        write = self.file.write
+        seek = self.file.seek
+        block = self.block
+        for offsets in self.passes(num_ops):
+            seek(0)
+            for offset in offsets:
+                write(block)
+        self.file.flush()
+
+class FileWriteBuffered(FileWrite):
+    """write() of a block over the contents of a file opened with the 
+    default buffering. The buffer is flushed at the end of the sample."""
+    name = "write() of a block, buffered"
+    buffering = -1
+
+class FileFsync(FileWrite):
+    "write() of a block unbuffered, then os.fsync() of the file."
+    name = "write() and os.fsync() of a block"
+    group = "fsync"
+    expected_noise = ["voluntary_switches"]
+    
+    # A sync to a device takes milliseconds.
+    target_time = 0.05
+    
+    def run(self, num_ops):
+        write = self.file.write
+        seek = self.file.seek
+        fsync = os.fsync
+        fd = self.file.fileno()
+        block = self.block
+        for offsets in self.passes(num_ops):
+            seek(0)
+            for offset in offsets:
+                write(block)
+                fsync(fd)
+
+BenchFileReadTmpfs = on_filesystem(FileRead, "tmpfs")
+BenchFileReadDisk = on_filesystem(FileRead, "disk")
+BenchFileReadBufferedTmpfs = on_filesystem(FileReadBuffered, "tmpfs")
+BenchFileReadBufferedDisk = on_filesystem(FileReadBuffered, "disk")
+BenchFileReadintoTmpfs = on_filesystem(FileReadinto, "tmpfs")
+BenchFileReadintoDisk = on_filesystem(FileReadinto, "disk")
+BenchMmapSliceTmpfs = on_filesystem(MmapSlice, "tmpfs")
+BenchMmapSliceDisk = on_filesystem(MmapSlice, "disk")
+BenchPreadTmpfs = on_filesystem(Pread, "tmpfs")
+BenchPreadDisk = on_filesystem(Pread, "disk")
+BenchFileWriteTmpfs = on_filesystem(FileWrite, "tmpfs")
+BenchFileWriteDisk = on_filesystem(FileWrite, "disk")
+BenchFileWriteBufferedTmpfs = on_filesystem(FileWriteBuffered, "tmpfs")
+BenchFileWriteBufferedDisk = on_filesystem(FileWriteBuffered, "disk")
+BenchFileFsyncTmpfs = on_filesystem(FileFsync, "tmpfs")
+BenchFileFsyncDisk = on_filesystem(FileFsync, "disk")
+
+# Size sweeps.
+
+class SizedZip(Sized, Unrolled):
+    categories = ["sizes"]
+    group = "zip"
+    setup_code = Zip2BenchBase.setup_code
+
+    def prepare(self):
+        self.list_a = list(xrange(self.size))
+        self.list_b = self.list_a[:]
+        
+    def cleanup(self):
+        del self.list_a, self.list_b
+
+class BenchZipSized(SizedZip):
+    "Creation of and iteration over a 'zip' zip of two n-item lists."
+    name = "zip() and iterate over two n-item lists"
+    zipfunc = zip
+    statement = Zip2BenchBase.list_statement
+
+class BenchIzipSized(SizedZip):
+    "Creation of and iteration over an 'izip' zip of two n-item lists."
+    name = "izip() and iterate over two n-item lists"
+    zipfunc = izip
+    statement = Zip2BenchBase.statement
+
+class SizedIn(Sized, Unrolled):
+    categories = ["sizes"]
+    group = "in"
+    setup_code = "c = self.container\nk = self.key"
+    statement = "k in c"
+
+    def prepare(self):
+        self.container = self.make(xrange(self.size))
+        self.key = self.size - 1
+        
+    def cleanup(self):
+        del self.container
+
+class BenchListInSized(SizedIn):
+    '"in" tests that scan an n-item list to its last item.'
+    name = '"in" test for the last item of an n-item list'
+    make = list
+
+class BenchDictInSized(SizedIn):
+    '"in" tests on an n-entry dictionary.'
+    name = '"in" test on an n entry dict'
+    make = dict.fromkeys
+
+class BenchSortedSized(Sized, Unrolled):
+    "sorted() on a list of random floats. Sorting ten million takes seconds."
+    name = "sorted() an n-item list of random floats"
+    categories = ["sizes"]
+    sizes = SIZES[:-1]
+    setup_code = "l = self.items"
+    statement = "sorted(l)"
+    
+    def prepare(self):
+        rng = random.Random(self.size)
+        self.items = [rng.random() for i in xrange(self.size)]
+        
+    def cleanup(self):
+        del self.items
+
+# Strings, by length in characters.
+
+STRING_SIZES = [10 ** i for i in xrange(7)]
+
+def text(n):
+    "An n-character string of words, some with a letter outside ASCII."
+    return (u"caf\xe9 au lait " * (n // 13 + 1))[:n]
+
+# The table BenchStrTranslate maps characters with.
+LEET = dict((ord(a), b) for a, b in izip(u"aeilot", u"431107"))
+
+class StringBuild(Sized, Straight):
+    """Builds an n-character string out of one-character pieces. With +=, 
+    CPython resizes the string in place while nothing else refers to it."""
+    categories = ["strings"]
+    group = "build"
+    sizes = STRING_SIZES
+    complexities = Sized.complexities + ["n^2"]
+    
+    def prepare(self):
+        self.pieces = list(text(self.size))
+        
+    def cleanup(self):
+        del self.pieces
+
+class BenchStrConcat(StringBuild):
+    "Building a string by += of each piece."
+    name = "+= of n characters onto a string"
+    
+    def run(self, num_ops):
+        pieces = self.pieces
+        for i in xrange(num_ops):
+            s = u""
+            for piece in pieces:
+                s += piece
+
+class BenchStrJoin(StringBuild):
+    "Building a string by appending the pieces to a list and joining it."
+    name = "append() of n characters to a list and join()"
+    
+    def run(self, num_ops):
+        pieces = self.pieces
+        join = u"".join
+        for i in xrange(num_ops):
+            parts = []
+            append = parts.append
+            for piece in pieces:
+                append(piece)
+            join(parts)
+
+class BenchStringIO(StringBuild):
+    "Building a string by writing the pieces to an io.StringIO."
+    name = "write() of n characters to a StringIO and getvalue()"
+    
+    def run(self, num_ops):
+        import io
+        StringIO = io.StringIO
+        pieces = self.pieces
+        for i in xrange(num_ops):
+            buf = StringIO()
+            write = buf.write
+            for piece in pieces:
+                write(piece)
+            buf.getvalue()
+
+class StringBench(Sized, Unrolled):
+    categories = ["strings"]
+    sizes = STRING_SIZES
+    setup_code = "s = self.text"
+    
+    def prepare(self):
+        self.text = text(self.size)
+        
+    def cleanup(self):
+        del self.text
+
+class StringFormat(StringBench):
+    group = "format"
+    setup_code = "s = self.text\nn = 42"
+
+class BenchStrPercent(StringFormat):
+    "Formatting an n-character string and an int with %."
+    name = "% formatting of an n-character string"
+    statement = 'u"%s: %d" % (s, n)'
+
+class BenchStrFormat(StringFormat):
+    "Formatting an n-character string and an int with str.format()."
+    name = "str.format() of an n-character string"
+    statement = 'u"{0}: {1}".format(s, n)'
+
+class BenchFString(StringFormat):
+    "Formatting an n-character string and an int with an f-string."
+    name = "f-string of an n-character string"
+    statement = 'f"{s}: {n}"'
+    
+    @classmethod
+    def available(cls):
+        return sys.version_info >= (3, 6)
+
+class BenchEncodeUTF8(StringBench):
+    "encode() of a string as UTF-8, two bytes for each accented letter."
+    name = "encode() as UTF-8 of an n-character string"
+    group = "encode"
+    statement = 's.encode("utf-8")'
+
+class BenchEncodeLatin1(StringBench):
+    "encode() of a string as latin-1, a byte for each character."
+    name = "encode() as latin-1 of an n-character string"
+    group = "encode"
+    statement = 's.encode("latin-1")'
+
+class StringDecode(StringBench):
+    group = "decode"
+    setup_code = "b = self.data"
+    
+    def prepare(self):
+        self.data = text(self.size).encode(self.encoding)
+        
+    def cleanup(self):
+        del self.data
+
+class BenchDecodeUTF8(StringDecode):
+    "decode() of the UTF-8 encoding of a string."
+    name = "decode() as UTF-8 of an n-character string"
+    encoding = "utf-8"
+    statement = 'b.decode("utf-8")'
+
+class BenchDecodeLatin1(StringDecode):
+    "decode() of the latin-1 encoding of a string."
+    name = "decode() as latin-1 of an n-character string"
+    encoding = "latin-1"
+    statement = 'b.decode("latin-1")'
+
+class BenchStrSlice(StringBench):
+    "Slicing off the first character of a string, which copies the rest."
+    name = "s[1:] of an n-character string"
+    statement = "s[1:]"
+
+class BenchStrSplit(StringBench):
+    "split() of a string into its words, one every 4 or 5 characters."
+    name = "split() of an n-character string"
+    statement = "s.split()"
+
+class BenchStrTranslate(StringBench):
+    "translate() of a string with a dict that maps six letters."
+    name = "translate() of an n-character string"
+    setup_code = "s = self.text\ntable = LEET"
+    statement = "s.translate(table)"
+
+class StringPrefix(StringBench):
+    """Tests whether a string starts with an n-character prefix that is equal
+    but not identical to its start."""
+    group = "prefix"
+    setup_code = "s = self.text\nprefix = self.prefix\nk = len(prefix)"
+    
+    def prepare(self):
+        self.text = text(self.size) + u"!"
+        self.prefix = text(self.size)
+        
+    def cleanup(self):
+        del self.text, self.prefix
+
+class BenchStartswith(StringPrefix):
+    "startswith() of an n-character prefix."
+    name = "startswith() of an n-character prefix"
+    statement = "s.startswith(prefix)"
+
+class BenchSliceCompare(StringPrefix):
+    "Comparing a slice of the first n characters with a prefix."
+    name = "s[:n] == prefix of an n-character prefix"
+    statement = "s[:k] == prefix"
+
+# Buffers, by size in bytes. prepare() makes the buffers each candidate works 
+# on out of the same bytes. The parsing and packing candidates work through 
+# the whole records of 8 bytes that the buffer holds, and aren't measured at
+# sizes below one record.
+
+BUFFER_SIZES = [8 * 8 ** i for i in xrange(6)]
+
+# The records: two little-endian unsigned 32-bit ints.
+RECORD = struct.Struct("<II")
+
+class BufferBench(Sized, Unrolled):
+    categories = ["buffers"]
+    sizes = BUFFER_SIZES
+    item = "byte"
+    setup_code = "b = self.data\nk = self.size // 2"
+    
+    @classmethod
+    def label(cls, size):
+        return pretty_bytes(size)
+    
+    def prepare(self):
+        self.data = bytes(bytearray(i % 251 for i in xrange(self.size)))
+        self.buffer = bytearray(self.data)
+        self.array = array.array("B", self.data)
+        self.list = list(self.buffer)
+        
+    def cleanup(self):
+        del self.data, self.buffer, self.array, self.list
+
+class BenchBytesSlice(BufferBench):
+    "Slicing off the first byte of a bytes object, which copies the rest."
+    name = "b[1:] of n bytes"
+    group = "slice"
+    statement = "b[1:]"
+
+class BenchMemoryviewSlice(BufferBench):
+    "Slicing off the first byte of a memoryview, which copies nothing."
+    name = "memoryview m[1:] of n bytes"
+    group = "slice"
+    setup_code = "m = memoryview(self.data)"
+    statement = "m[1:]"
+
+class BenchBytearrayEdit(BufferBench):
+    "Replacing the middle byte of a bytearray in place."
+    name = "bytearray a[k] = x of n bytes"
+    group = "edit"
+    setup_code = "a = self.buffer\nk = self.size // 2"
+    statement = "a[k] = 120"
+
+class BenchBytesEdit(BufferBench):
+    "Replacing the middle byte of a bytes object, which has to be rebuilt."
+    name = "bytes b[:k] + x + b[k + 1:] of n bytes"
+    group = "edit"
+    setup_code = 'b = self.data\nk = self.size // 2\nx = b"x"'
+    statement = "b[:k] + x + b[k + 1:]"
+
+class BenchArrayIndex(BufferBench):
+    "Indexing an array of bytes, which converts the item to an int."
+    name = "array a[k] of n bytes"
+    group = "index"
+    setup_code = "a = self.array\nk = self.size // 2"
+    statement = "a[k]"
+
+class BenchListIndex(BufferBench):
+    "Indexing a list of the same ints, which returns the stored object."
+    name = "list l[k] of n ints"
+    group = "index"
+    setup_code = "l = self.list\nk = self.size // 2"
+    statement = "l[k]"
+
+class BenchArraySum(BufferBench):
+    "sum() of an array of bytes."
+    name = "sum() of an array of n bytes"
+    group = "sum"
+    setup_code = "a = self.array"
+    statement = "sum(a)"
+
+class BenchListSum(BufferBench):
+    "sum() of a list of the same ints."
+    name = "sum() of a list of n ints"
+    group = "sum"
+    setup_code = "l = self.list"
+    statement = "sum(l)"
+
+class RecordBench(BufferBench):
+    min_size = RECORD.size
+    setup_code = ("b = self.data\nm = memoryview(b)\noffsets = self.offsets\n"
+        "unpack = RECORD.unpack\nunpack_from = RECORD.unpack_from\n"
+        "pack = RECORD.pack\npack_into = RECORD.pack_into\n"
+        "a = self.buffer")
+    
+    def prepare(self):
+        BufferBench.prepare(self)
+        self.offsets = list(xrange(0, self.size - RECORD.size + 1, 
+            RECORD.size))
+        
+    def cleanup(self):
+        BufferBench.cleanup(self)
+        del self.offsets
+
+class BenchStructUnpack(RecordBench):
+    "struct unpack() of each record of a bytes object, sliced out."
+    name = "struct unpack() of slices of n bytes"
+    group = "unpack"
+    statement = "[unpack(b[o:o + 8]) for o in offsets]"
+
+class BenchStructUnpackFrom(RecordBench):
+    "struct unpack_from() of each record of a memoryview, in place."
+    name = "struct unpack_from() of a memoryview of n bytes"
+    group = "unpack"
+    statement = "[unpack_from(m, o) for o in offsets]"
+
+class BenchStructPack(RecordBench):
+    "struct pack() of each record, joined into a bytes object."
+    name = "struct pack() and join() of n bytes"
+    group = "pack"
+    statement = 'b"".join([pack(o, o) for o in offsets])'
+
+class BenchStructPackInto(RecordBench):
+    "struct pack_into() of each record, into a preallocated bytearray."
+    name = "struct pack_into() a bytearray of n bytes"
+    group = "pack"
+    statement = "[pack_into(a, o, o, o) for o in offsets]"
+
+class BenchIntFromBytes(BufferBench):
+    "int.from_bytes() of a whole buffer, little-endian."
+    name = "int.from_bytes() of n bytes"
+    group = "int"
+    setup_code = "b = self.data\nfrom_bytes = int.from_bytes"
+    statement = 'from_bytes(b, "little")'
+    
+    @classmethod
+    def available(cls):
+        return hasattr(int, "from_bytes")
+
+# Working set sweeps. These are sized by the bytes of memory they touch, from
+# a few KB to hundreds of MB, so that the cost of each access steps up where 
+# the working set outgrows each level of cache. Each is measured visiting its
+# items in the order they were allocated and in a scattered order.
+
+WORKING_SETS = [2 ** i for i in xrange(12, 30, 2)]
+
+def cache_levels(cpu=0):
+    """The data and unified caches of a CPU, smallest first, as (name, bytes)
+    pairs such as ("L1d", 49152). Empty where sysfs doesn't describe them."""
+    levels = []
+    for index in count():
+        path = os.path.join(SYS_CPU, "cpu%d" % cpu, "cache", "index%d" % index)
+        if not os.path.isdir(path):
+            break
+        kind = read_sysfs(os.path.join(path, "type"))
+        level = read_sysfs(os.path.join(path, "level"))
+        size = read_sysfs(os.path.join(path, "size"))
+        if kind == "Instruction" or not level or not size:
+            continue
+        scale = { "K": 2 ** 10, "M": 2 ** 20, "G": 2 ** 30 }.get(size[-1], 1)
+        levels.append(("L%s%s" % (level, "d" if kind == "Data" else ""), 
+            int(size.rstrip("KMG")) * scale))
+    return sorted(levels, key=operator.itemgetter(1))
+
+def scatter(n):
+    """A permutation of xrange(n) that puts neighbouring items far apart: 
+    i * a % n, for a near n / phi and coprime to n. Building it takes a 
+    fraction of the time random.shuffle() takes, which matters at hundreds 
+    of MB."""
+    def gcd(a, b):
+        while b:
+            a, b = b, a % b
+        return a
+    a = max(int(n * 0.6180339887), 1)
+    while gcd(a, n) != 1:
+        a += 1
+    return [i * a % n for i in xrange(n)]
+
+# The most memory that working set candidates keep built between samples. 
+# Those least recently prepared are freed to stay within it.
+WORKING_SET_MEMORY = 2 ** 31
+
+# Working set candidates visit their items in chunks of this many, carrying
+# on from the last sample's chunk, so that a sample touches fresh data rather
+# than the start of the data over and over.
+WORKING_SET_CHUNK = 1024
+
+class WorkingSet(Sized):
+    """A sized candidate whose size is the bytes its data takes. Each op 
+    accesses one item. build() creates the data and returns its items in 
+    the order they are to be visited, and free() drops it. Data is kept 
+    between samples, since building hundreds of MB takes longer than 
+    measuring it."""
+    categories = ["cache"]
+    sizes = WORKING_SETS
+    overheads = ["pass"]
+    scattered = False
+    
+    # The candidates whose data is built, least recently prepared first.
+    built = []
+    
+    def __init__(self, num_ops=NUM_OPS):
+        items = max(self.size // self.item_bytes(), 1)
+        if items > WORKING_SET_CHUNK:
+            items -= items % WORKING_SET_CHUNK
+        self.items = items
+        self.step = min(items, WORKING_SET_CHUNK)
+        Candidate.__init__(self, num_ops)
+    
+    @classmethod
+    def label(cls, size):
+        return "%s working set" % pretty_bytes(size)
+    
+    def item_bytes(self):
+        """The bytes taken by each item, measured with tracemalloc where it's
+        available and estimated otherwise."""
+        try:
+            import tracemalloc
+        except ImportError:
+            return self.estimate_bytes()
+        self.items = 1024
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            items = self.build(xrange(self.items))
+            size = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        del items
+        self.free()
+        return max(size // self.items, 1)
+
+    def prepare(self):
+        built = WorkingSet.built
+        if self in built:
+            built.remove(self)
+        else:
+            while built and (sum(candidate.size for candidate in built) + 
+                self.size > WORKING_SET_MEMORY):
+                built.pop(0).free()
+            items = self.build(scatter(self.items) if self.scattered else 
+                xrange(self.items))
+            self.chunks = [items[i:i + self.step] 
+                for i in xrange(0, self.items, self.step)]
+            self.position = 0
+        built.append(self)
+        
+    def free(self):
+        self.chunks = None
+
+class WorkingSetList(WorkingSet):
+    group = "list"
+    
+    def estimate_bytes(self):
+        return sys.getsizeof(0.5) + struct.calcsize("P")
+
+    def build(self, order):
+        floats = [float(i) for i in xrange(self.items)]
+        return [floats[i] for i in order]
+        
+    def run(self, num_ops):
+        chunks = self.chunks
+        position = self.position
+        for i in xrange(0, num_ops, self.step):
+            for item in chunks[position]:
+                pass
+            position = (position + 1) % len(chunks)
+        self.position = position
+
+class BenchWorkingSetList(WorkingSetList):
+    "Iteration over a list of floats, in the order they were allocated."
+    name = "Iteration over a list of floats"
+
+class BenchWorkingSetListScattered(WorkingSetList):
+    "Iteration over a list of floats, in a scattered order."
+    name = "Iteration over a list of floats in scattered order"
+    scattered = True
+    
+class WorkingSetDict(WorkingSet):
+    group = "dict"
+    
+    def estimate_bytes(self):
+        return (sys.getsizeof(dict.fromkeys(xrange(1024))) // 1024 + 
+            sys.getsizeof(1 << 20) + struct.calcsize("P"))
+
+    def build(self, order):
+        keys = list(xrange(self.items))
+        self.dict = dict.fromkeys(keys)
+        return [keys[i] for i in order]
+        
+    def free(self):
+        WorkingSet.free(self)
+        self.dict = None
+
+    def run(self, num_ops):
+        d = self.dict
+        chunks = self.chunks
+        position = self.position
+        for i in xrange(0, num_ops, self.step):
+            for k in chunks[position]:
+                d[k]
+            position = (position + 1) % len(chunks)
+        self.position = position
+
+class BenchWorkingSetDict(WorkingSetDict):
+    "Lookups of every key of an int-keyed dict, in the order of insertion."
+    name = "d[k] on an int-keyed dict, keys in order"
+
+class BenchWorkingSetDictScattered(WorkingSetDict):
+    "Lookups of every key of an int-keyed dict, in a scattered order."
+    name = "d[k] on an int-keyed dict, keys in scattered order"
+    scattered = True
+
+class Point(object):
+    def __init__(self, a):
+        self.a = a
+
+class WorkingSetAttr(WorkingSet):
+    group = "attr"
+    
+    def estimate_bytes(self):
+        point = Point(0)
+        return (sys.getsizeof(point) + sys.getsizeof(vars(point)) + 
+            struct.calcsize("P"))
+
+    def build(self, order):
+        points = [Point(None) for i in xrange(self.items)]
+        return [points[i] for i in order]
+
+    def run(self, num_ops):
+        chunks = self.chunks
+        position = self.position
+        for i in xrange(0, num_ops, self.step):
+            for o in chunks[position]:
+                o.a
+            position = (position + 1) % len(chunks)
+        self.position = position
+
+class BenchWorkingSetAttr(WorkingSetAttr):
+    "Reads of an instance attribute of many objects, in allocation order."
+    name = "o.a on many objects, in allocation order"
+
+class BenchWorkingSetAttrScattered(WorkingSetAttr):
+    "Reads of an instance attribute of many objects, in a scattered order."
+    name = "o.a on many objects, in scattered order"
+    scattered = True
+
+overhead_candidate_classes = [
+    BenchPass,
+    BenchStraight
+]
+
+def baseline_classes(candidates):
+    """The overhead candidate classes, plus the unrolled loop baselines that
+    the candidates depend on."""
+    classes = list(overhead_candidate_classes)
+    for candidate in candidates:
+        for tag, multiplier in candidate.overheads:
+            match = re.match(r"unrolled(\d+)$", tag)
+            if match:
+                cls = unrolled_baseline(int(match.group(1)))
+                if cls not in classes:
+                    classes.append(cls)
+    return classes
+
+# Selection.
+
+CATEGORIES = [
+    ("basic", "Basic Operations"),
+    ("function", "Function Overhead"),
+    ("list", "Tuple and List Creation"),
+    ("object_creation", "Object Creation"),
+    ("exceptions", "Exception Handling"),
+    ("builtin", "Built-in Functions"),
+    ("iteration", "Iteration (time per item)"),
+    ("dict", "Dictionaries"),
+    ("zip", "zip() vs. izip()"),
+    ("duck", "Duck Typing Tests"),
+    ("sizes", "Cost by Size (time per op on n items)"),
+    ("cache", "Working Set Size (time per item accessed)"),
+    ("threads", "Threads and Locks"),
+    ("ipc", "Inter-process Communication"),
+    ("asyncio", "Asyncio Event Loop"),
+    ("io", "File I/O (time per block)"),
+    ("strings", "Strings (time per op on n characters)"),
+    ("buffers", "Buffers (time per op on n bytes)")
+]
+
+# Categories that take minutes to measure. Their candidates are only run when
+# categories or a pattern are given.
+SLOW_CATEGORIES = ["sizes", "cache", "ipc", "io", "strings", "buffers"]
+
+# Suites of candidates in other modules. A suite is named either by the module
+# path of a module that registers its candidates when imported, or by the name
+# of an entry point in this group whose value is such a module.
+SUITE_ENTRY_POINTS = "opcosts.suites"
+
+# The module of each suite loaded, by suite name.
+loaded_suites = {}
+
+def installed_suites():
+    "Maps the name of each installed suite entry point to its module."
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return {}
+        return dict((entry.name, entry.module_name) for entry in 
+            pkg_resources.iter_entry_points(SUITE_ENTRY_POINTS))
+    entries = metadata.entry_points()
+    if hasattr(entries, "select"):
+        entries = entries.select(group=SUITE_ENTRY_POINTS)
+    else:
+        entries = entries.get(SUITE_ENTRY_POINTS, [])
+    return dict((entry.name, entry.value.split(":")[0]) for entry in entries)
+
+def load_suite(suite):
+    """Imports the module of a suite if it hasn't been already, and returns its
+    name. Modules are also looked for in the working directory."""
+    import importlib
+    if suite not in loaded_suites:
+        module = installed_suites().get(suite, suite)
+        if os.getcwd() not in sys.path:
+            sys.path.append(os.getcwd())
+        importlib.import_module(module)
+        loaded_suites[suite] = module
+    return loaded_suites[suite]
+
+def candidate_classes(suites=None):
+    """The candidate classes of the suites, sorted by name. "builtin" is the 
+    suite of this module. Other suites are loaded on first use. None means 
+    the builtin suite and every suite loaded so far."""
+    if suites is None:
+        suites = ["builtin"] + sorted(loaded_suites)
+    classes = []
+    for suite in suites:
+        if suite == "builtin":
+            classes += [cls for name, cls in sorted(globals().items()) 
+                if name.startswith("Bench") and isinstance(cls, type) and 
+                issubclass(cls, Candidate)]
+        else:
+            module = load_suite(suite)
+            classes += [cls for name, cls in sorted(registry.items())
+                if cls.__module__ == module or 
+                cls.__module__.startswith(module + ".")]
+    return [cls for cls in classes if cls.available()]
+
+def select_classes(classes, categories=None, pattern=None):
+    """The classes that are in any of the categories and whose class name or
+    description matches the regular expression. None selects everything, 
+    except that if neither is given, the slow categories are left out."""
+    selected = []
+    for cls in classes:
+        if categories and not set(cls.categories) & set(categories):
+            continue
+        if not (categories or pattern) and set(cls.categories) <= set(
+            SLOW_CATEGORIES) and cls.categories:
+            continue
+        if pattern and not (re.search(pattern, cls.__name__) or 
+            re.search(pattern, cls.name or "")):
+            continue
+        selected.append(cls)
+    return selected
+
+def instantiate(classes, unrolls=None, num_ops=NUM_OPS, sizes=None):
+    """Creates the candidates of the classes. Unrolled classes get one for 
+    each distinct factor that the unroll factors in 'unrolls' give them. 
+    Sized classes are instantiated at each of 'sizes', by default their own."""
+    candidates = []
+    for cls in classes:
+        if issubclass(cls, Sized) and cls.family is None:
+            candidates += instantiate([sized_class(cls, size) 
+                for size in (cls.resizable and sizes) or cls.sizes 
+                if size >= cls.min_size], unrolls, num_ops)
+        elif issubclass(cls, Unrolled):
+            factors = set()
+            for unroll in unrolls or [None]:
+                candidate = cls(num_ops=num_ops, unroll=unroll)
+                if candidate.unroll not in factors:
+                    factors.add(candidate.unroll)
+                    candidates.append(candidate)
+        else:
+            candidates.append(cls(num_ops=num_ops))
+    return candidates
+    
+def add_dependencies(candidates, classes, unrolls=None, num_ops=NUM_OPS):
+    """Adds candidates of the classes providing the overhead tags that the
+    candidates need, and of the classes those need in turn. The overhead 
+    candidate classes and unrolled baselines are left to benchmark()."""
+    providers = defaultdict(list)
+    for cls in classes:
+        for tag in cls.tags:
+            providers[tag].append(cls)
+    included = set(map(type, candidates)) | set(overhead_candidate_classes)
+    pending = list(candidates)
+    while pending:
+        candidate = pending.pop()
+        for tag, multiplier in candidate.overheads:
+            needed = [cls for cls in providers.get(tag, []) 
+                if cls not in included]
+            included.update(needed)
+            added = instantiate(needed, unrolls, num_ops)
+            candidates.extend(added)
+            pending.extend(added)
+    return candidates
+
+def drift(candidates, bins=4):
+    """Describes how the times of the baselines moved during the run, before
+    any correction. Returns a (class name, levels) pair for each baseline 
+    with enough samples, where levels are the medians of 'bins' successive 
+    stretches of its samples relative to the median of them all."""
+    result = []
+    for candidate in candidates:
+        times = candidate.raw_times
+        if (not is_baseline(candidate) or candidate.per_sample or 
+            len(times) < 2 * bins):
+            continue
+        samples = [t for s, t in sorted(izip(candidate.stamps, times))]
+        m = median(times)
+        size = float(len(samples)) / bins
+        result.append((type(candidate).__name__, [median(samples[int(i * size):
+            int((i + 1) * size)]) / m for i in xrange(bins)]))
+    return result
+
+def correct_drift(candidates):
+    """Divides each sample by the level of the baselines at the time it was
+    taken: the median, over the baselines, of the time of the sample of each
+    taken nearest to it relative to that baseline's median. The samples as 
+    taken are left in raw_times. The candidates must all have been measured 
+    in the same run."""
+    import bisect
+    references = []
+    for candidate in candidates:
+        if is_baseline(candidate) and not candidate.per_sample:
+            m = median(candidate.times)
+            samples = sorted(izip(candidate.stamps, candidate.times))
+            references.append(([s for s, t in samples], 
+                [t / m for s, t in samples]))
+    if not references:
+        return
+    def level(stamp):
+        nearest = []
+        for stamps, levels in references:
+            i = bisect.bisect(stamps, stamp)
+            if i == len(stamps) or (i > 0 and 
+                stamp - stamps[i - 1] < stamps[i] - stamp):
+                i -= 1
+            nearest.append(levels[i])
+        return median(nearest)
+    for candidate in candidates:
+        candidate.times = [t / level(s) 
+            for t, s in izip(candidate.raw_times, candidate.stamps)]
+
+# Warmup. Under a JIT, or an interpreter that specializes code as it runs, a 
+# candidate's first samples can be slower than the rest. These are detected
+# and left out of the estimates, and more samples are taken in their place.
+
+MAX_WARMUP = 20
+
+# How much slower than the steady state a sample must be to count as warmup,
+# as a proportion and in standard deviations estimated from the MAD.
+WARMUP_TOLERANCE = 0.1
+WARMUP_DEVIATIONS = 3.0
+
+# The fewest samples that must follow warmup for it to be detected. With 
+# fewer, one slow sample among them looks like warmup too often.
+MIN_STEADY = 5
+
+def steady_state_start(times, tolerance=WARMUP_TOLERANCE):
+    """Returns the index of the first sample in the steady state. This is the
+    end of the longest run of samples at the start, no longer than half of 
+    them, that are all slower than the samples after the run by both more 
+    than 'tolerance' of their median and more than WARMUP_DEVIATIONS times 
+    their spread, so that isolated slow samples aren't taken for warmup. At 
+    least MIN_STEADY samples must follow the run."""
+    start = 0
+    for k in xrange(1, min(len(times) // 2, len(times) - MIN_STEADY) + 1):
+        after = times[k:]
+        m = median(after)
+        threshold = m + max(tolerance * m, 
+            WARMUP_DEVIATIONS * 1.4826 * mad(after))
+        if min(times[:k]) > threshold:
+            start = k
+    return start
+
+def take_sample(candidate, max_retries=MAX_RETRIES):
+    """Takes a sample of a candidate. A sample the OS disturbed is taken again,
+    up to max_retries times, after which it is kept. The gc module throws 
+    exceptions under IronPython."""
+    for attempt in xrange(max_retries + 1):
+        if attempt:
+            candidate.reject()
+        candidate.prepare()
+        try:
+            gc.disable()
+        except:
+            pass
+        candidate.time()
+        try:
+            gc.enable()
+        except:
+            pass
+        candidate.cleanup()
+        if not candidate.noisy():
+            break
+
+# Scheduling. Each pass samples the candidates in a new random order, so that
+# drift in the speed of the machine over a run spreads over all candidates 
+# instead of biasing those measured next to each other. The baselines are 
+# sampled again before every BASELINE_INTERVAL other candidates, so that they
+# are measured throughout the run.
+
+BASELINE_INTERVAL = 32
+
+def is_baseline(candidate):
+    "Whether a candidate is an overhead candidate or an unrolled baseline."
+    return (type(candidate) in overhead_candidate_classes or 
+        type(candidate) in unrolled_baselines.values())
+
+def run_serial(candidates, repetitions, max_retries=MAX_RETRIES, 
+    max_warmup=MAX_WARMUP, seed=None):
+    """Run the benchmarks, in an order shuffled by a random number generator 
+    seeded with 'seed'. A candidate whose first samples were taken while it
+    was warming up is sampled again, up to max_warmup more times, until it
+    has 'repetitions' samples in its steady state."""
+    rng = random.Random(seed)
+    baselines = [candidate for candidate in candidates 
+        if is_baseline(candidate)]
+    others = [candidate for candidate in candidates 
+        if not is_baseline(candidate)]
+    for ps in xrange(repetitions):
+        rng.shuffle(others)
+        for i in xrange(0, max(len(others), 1), BASELINE_INTERVAL):
+            rng.shuffle(baselines)
+            for candidate in baselines + others[i:i + BASELINE_INTERVAL]:
+                take_sample(candidate, max_retries)
+    for candidate in candidates:
+        if candidate.per_sample:
+            continue
+        while (len(candidate.times) < repetitions + max_warmup and 
+            len(candidate.times) - steady_state_start(candidate.times) < 
+            repetitions):
+            take_sample(candidate, max_retries)
+
+def available_cpus():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        pass
+    try:
+        import psutil
+        return sorted(psutil.Process().cpu_affinity())
+    except (ImportError, AttributeError, OSError):
+        return range(multiprocessing.cpu_count())
+
+def pin(cpu):
+    """Binds this process to a CPU, and returns whether it could. It can't if
+    the CPU is outside the set this process may run on, as in a container
+    limited by cgroups. os.sched_setaffinity() is new in Python 3.3, so older
+    interpreters use psutil or the taskset command instead, if they have 
+    either."""
+    try:
+        os.sched_setaffinity(0, [cpu])
+        return True
+    except AttributeError:
+        pass
+    except (OSError, ValueError):
+        return False
+    try:
+        import psutil
+        psutil.Process().cpu_affinity([cpu])
+        return True
+    except (ImportError, AttributeError):
+        pass
+    except (OSError, ValueError):
+        return False
+    import subprocess
+    devnull = open(os.devnull, "w")
+    try:
+        return subprocess.call(["taskset", "-p", "-c", str(cpu), 
+            str(os.getpid())], stdout=devnull, stderr=devnull) == 0
+    except OSError:
+        return False
+    finally:
+        devnull.close()
+
+def calibrate(candidates, target=None):
+    """Calibrates the op counts of the candidates to 'target' seconds per 
+    sample, or of those with a target time of their own to that."""
+    for candidate in candidates:
+        if target or candidate.target_time:
+            candidate.calibrate(target or candidate.target_time)
+
+def pin_worker(cpus, counter, timer, suites=[], event_loop="asyncio"):
+    """Pool initializer. Binds each worker process to a core of its own, and
+    loads the suites whose candidates it may be given."""
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    cpu = cpus[index % len(cpus)]
+    if not pin(cpu):
+        print("warning: worker %d could not be pinned to cpu %d and runs "
+            "unpinned" % (index, cpu), file=sys.stderr)
+    for suite in suites:
+        load_suite(suite)
+    Candidate.setup(timer)
+    Async.setup_loop(event_loop)
+    
+def run_job(job):
+    "Runs all repetitions of one candidate inside a worker process."
+    (class_name, arguments, repetitions, target_time, max_retries, 
+        max_warmup) = job
+    candidate = candidate_class(class_name)(**arguments)
+    calibrate([candidate], target_time)
+    freeze_gc()
+    run_serial([candidate], repetitions, max_retries, max_warmup)
+    return candidate.num_ops, candidate.times, candidate.stamps, \
+        candidate.noise, candidate.rejected
+
+def run_shard(job):
+    """Runs all repetitions of a shard of candidates inside a worker process,
+    together with its own copies of the baselines. The baselines come already
+    calibrated, so that every shard measures them with the same op counts."""
+    (work, baselines, repetitions, target_time, max_retries, max_warmup, 
+        seed) = job
+    base = [candidate_class(class_name)(**arguments) 
+        for class_name, arguments in baselines]
+    candidates = [candidate_class(class_name)(**arguments) 
+        for class_name, arguments in work]
+    calibrate(candidates, target_time)
+    freeze_gc()
+    run_serial(base + candidates, repetitions, max_retries, max_warmup, seed)
+    return [(candidate.num_ops, candidate.times, candidate.stamps, 
+        candidate.noise, candidate.rejected) 
+        for candidate in base + candidates]
+
+def shard_level(baselines, results, pooled):
+    """The level of the baselines measured in one shard relative to those of
+    all shards: the median, over the baselines, of the median of a shard's 
+    samples of each divided by the median of all its samples."""
+    levels = [median(times) / pooled[cls] 
+        for cls, (num_ops, times, stamps, noise, rejected) in izip(baselines, 
+        results) if not cls.per_sample and pooled[cls] > 0.0]
+    return median(levels) if levels else 1.0
+
+def run_parallel(candidates, repetitions, jobs, target_time=None, 
+    timer="default", max_retries=MAX_RETRIES, max_warmup=MAX_WARMUP, 
+    seed=None, event_loop="asyncio"):
+    """Spreads candidates over a pool of worker processes. The candidates are
+    dealt, in an order shuffled with 'seed', into a shard per worker, and 
+    each shard is measured in one worker along with its own copies of the 
+    baselines, so that a candidate's samples and the baselines subtracted
+    from them come from the same core. Since the overhead model fits one cost
+    per baseline, the samples of each shard are then divided by the level of
+    its baselines relative to those of all shards, as correct_drift() does 
+    over time, and the baselines among the candidates get the samples of 
+    every shard."""
+    if not candidates:
+        return
+    rng = random.Random(seed)
+    classes = baseline_classes(candidates)
+    baselines = dict((type(candidate), candidate) 
+        for candidate in candidates if type(candidate) in classes)
+    for cls in classes:
+        baselines.setdefault(cls, cls())
+    calibrate(baselines.values(), target_time)
+    others = [candidate for candidate in candidates 
+        if type(candidate) not in classes]
+    rng.shuffle(others)
+    cpus = available_cpus()
+    jobs = max(min(jobs, len(cpus), len(others)), 1)
+    shards = [others[i::jobs] for i in xrange(jobs)]
+    counter = multiprocessing.Value("i", 0)
+    pool = multiprocessing.Pool(jobs, pin_worker, (cpus, counter, timer, 
+        sorted(loaded_suites), event_loop))
+    try:
+        base = [(cls.__name__, baselines[cls].arguments()) for cls in classes]
+        results = pool.map(run_shard, [([(type(candidate).__name__, 
+            candidate.arguments()) for candidate in shard], base, 
+            repetitions, target_time, max_retries, max_warmup, 
+            rng.randrange(2 ** 31)) for shard in shards], chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    pooled = dict((cls, median(list(chain.from_iterable(
+        result[i][1] for result in results)))) 
+        for i, cls in enumerate(classes))
+    for shard, result in izip(shards, results):
+        level = shard_level(classes, result, pooled)
+        measured = [baselines[cls] if baselines[cls] in candidates else None
+            for cls in classes] + shard
+        for candidate, (num_ops, times, stamps, noise, rejected) in izip(
+            measured, result):
+            if candidate is None:
+                continue
+            candidate.num_ops = num_ops
+            candidate.times.extend(t / level for t in times)
+            candidate.stamps.extend(stamps)
+            candidate.noise.extend(noise)
+            candidate.rejected += rejected
+
+def freeze_gc():
+    """Collects garbage, then moves every object that survives into a 
+    generation the collector no longer looks at, so that collections between
+    samples don't depend on what the process created before. gc.freeze() is 
+    new in Python 3.7."""
+    try:
+        gc.collect()
+        gc.freeze()
+    except AttributeError:
+        pass
+
+# Isolation. Candidates measured in the same interpreter inherit the heap, 
+# method caches and interned objects left behind by those measured before 
+# them. In isolated runs each candidate instead runs in a fresh interpreter of
+# its own, pinned to a CPU the kernel keeps other tasks off if there is one.
+
+SYS_CPU = "/sys/devices/system/cpu"
+
+def read_sysfs(path):
+    "Returns the contents of a sysfs file, stripped, or None."
+    try:
+        f = open(path)
+    except IOError:
+        return None
+    try:
+        return f.read().strip()
+    finally:
+        f.close()
+
+def parse_cpu_list(text):
+    "Parses a kernel CPU list such as '0-3,8' into a list of CPU numbers."
+    cpus = []
+    for field in (text or "").split(","):
+        first, sep, last = field.strip().partition("-")
+        if first:
+            cpus += range(int(first), int(last or first) + 1)
+    return cpus
+
+def isolated_cpu():
+    """The CPU isolated runs are pinned to: the last of the CPUs available to
+    this process that the kernel isolates (isolcpus=), or failing that, the
+    last available CPU, which is the least likely to handle interrupts."""
+    cpus = available_cpus()
+    isolated = [cpu for cpu in parse_cpu_list(read_sysfs(
+        os.path.join(SYS_CPU, "isolated"))) if cpu in cpus]
+    return (isolated or cpus)[-1]
+
+def cpu_warnings(cpu):
+    """Returns the ways a CPU is unsuited to timing: not being isolated, 
+    sharing its core with another hardware thread, a frequency governor that
+    changes its clock with load, and turbo boost."""
+    warnings = []
+    if cpu not in parse_cpu_list(read_sysfs(os.path.join(SYS_CPU, 
+        "isolated"))):
+        warnings.append("cpu %d is not isolated from other tasks (boot with "
+            "isolcpus=%d)" % (cpu, cpu))
+    siblings = [sibling for sibling in parse_cpu_list(read_sysfs(
+        os.path.join(SYS_CPU, "cpu%d" % cpu, "topology", 
+        "thread_siblings_list"))) if sibling != cpu]
+    if siblings:
+        warnings.append("cpu %d shares its core with cpu %s (SMT); take %s "
+            "offline" % (cpu, ",".join(map(str, siblings)), 
+            "it" if len(siblings) == 1 else "them"))
+    governor = read_sysfs(os.path.join(SYS_CPU, "cpu%d" % cpu, "cpufreq", 
+        "scaling_governor"))
+    if governor is not None and governor != "performance":
+        warnings.append("cpu %d uses the %s frequency governor rather than "
+            "performance" % (cpu, governor))
+    if read_sysfs(os.path.join(SYS_CPU, "intel_pstate", "no_turbo")) == "0":
+        warnings.append("turbo boost is enabled")
+    return warnings
+
+def run_isolated(candidates, repetitions, target_time=None, timer="default",
+    max_retries=MAX_RETRIES, max_warmup=MAX_WARMUP, seed=None, 
+    event_loop="asyncio"):
+    """Runs each candidate in a fresh interpreter of its own, one at a time,
+    pinned to isolated_cpu(). The candidates are run in an order shuffled 
+    with 'seed'."""
+    import json
+    import subprocess
+    cpu = isolated_cpu()
+    for warning in cpu_warnings(cpu):
+        print("warning: %s" % warning, file=sys.stderr)
+    order = list(candidates)
+    random.Random(seed).shuffle(order)
+    for candidate in order:
+        job = { 
+            "job": (type(candidate).__name__, candidate.arguments(), 
+                repetitions, target_time, max_retries, max_warmup),
+            "cpu": cpu, 
+            "timer": timer, 
+            "event_loop": event_loop,
+            "suites": sorted(loaded_suites)
+        }
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+            "--isolated-worker"], stdin=subprocess.PIPE, 
+            stdout=subprocess.PIPE)
+        output = process.communicate(json.dumps(job).encode("utf-8"))[0]
+        if process.returncode != 0:
+            raise RuntimeError("isolated run of %s exited with status %d" % (
+                type(candidate).__name__, process.returncode))
+        num_ops, times, stamps, noise, rejected = json.loads(
+            output.decode("utf-8"))
+        candidate.num_ops = num_ops
+        candidate.times.extend(times)
+        candidate.stamps.extend(stamps)
+        candidate.noise.extend(noise)
+        candidate.rejected += rejected
+
+def isolated_worker():
+    """Runs the job run_isolated() writes to stdin and writes its result to 
+    stdout."""
+    import json
+    job = json.loads(sys.stdin.read())
+    if not pin(job["cpu"]):
+        print("warning: could not pin to cpu %d; running unpinned" % 
+            job["cpu"], file=sys.stderr)
+    for suite in job["suites"]:
+        load_suite(suite)
+    Candidate.setup(job["timer"])
+    Async.setup_loop(job["event_loop"])
+    class_name, arguments, repetitions, target_time, max_retries, \
+        max_warmup = job["job"]
+    arguments = dict((str(key), value) for key, value in arguments.items())
+    sys.stdout.write(json.dumps(run_job((class_name, arguments, repetitions, 
+        target_time, max_retries, max_warmup))))
+
+# Result cache. The samples of each candidate are stored under a hash of the
+# source of its class and its bases, of the functions that generate and run
+# candidates, of the top-level classes, functions and assignments that any of
+# these refer to, the settings they were taken with and the interpreter and 
+# machine that took them, so that a run only measures the candidates that may
+# have changed since. Edits elsewhere in a module leave the keys alone.
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or 
+    os.path.join(os.path.expanduser("~"), ".cache"), "opcosts")
+
+# The environment fields that identify an interpreter build and a machine.
+CACHE_ENVIRONMENT = ["python_version", "python_implementation", 
+    "python_build", "python_compiler", "python_executable", "config_args", 
+    "cflags", "cpu_model", "cpu_count", "machine", "kernel", "hostname"]
+
+module_texts = {}
+
+def module_source(module_name):
+    "The whole source of a module as text, read once."
+    import inspect
+    if module_name not in module_texts:
+        source = ""
+        try:
+            if module_name == __name__:
+                f = open(os.path.splitext(__file__)[0] + ".py", "rb")
+                try:
+                    source = f.read().decode("utf-8")
+                finally:
+                    f.close()
+            else:
+                source = inspect.getsource(sys.modules[module_name])
+        except (KeyError, TypeError, IOError, OSError):
+            pass
+        module_texts[module_name] = source
+    return module_texts[module_name]
+
+module_sources = {}
+
+def top_level_sources(module_name):
+    """Maps the name of each class, function and variable defined at the top
+    level of a module to the source that defines it. inspect.getsource() 
+    parses the whole module on every call, which is too slow to do for every
+    candidate."""
+    if module_name not in module_sources:
+        sources = module_sources[module_name] = {}
+        name = None
+        for line in module_source(module_name).splitlines(True):
+            match = re.match(r"(?:class|def)\s+(\w+)|(\w+)\s*=(?!=)", line)
+            if match:
+                name = match.group(1) or match.group(2)
+                sources.setdefault(name, "")
+            elif line.strip() and not line[0].isspace():
+                name = None
+            if name:
+                sources[name] += line
+    return module_sources[module_name]
+
+def global_names(code):
+    "The names a code object and the code objects nested in it refer to."
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, "co_names"):
+            names |= global_names(const)
+    return names
+
+def function_codes(value):
+    """The code objects of a function or method, or of the methods of a class,
+    including properties, classmethods and staticmethods."""
+    if isinstance(value, type):
+        codes = []
+        for item in vars(value).values():
+            codes += function_codes(item)
+        return codes
+    if isinstance(value, property):
+        return [code for item in (value.fget, value.fset, value.fdel) 
+            if item for code in function_codes(item)]
+    value = getattr(value, "__func__", value)
+    return [value.__code__] if hasattr(value, "__code__") else []
+
+def candidate_source(candidate):
+    """The source of the class of a candidate and each of its bases, of the
+    functions that generate and run candidates, and of the top-level 
+    definitions of their modules that any of these refer to, directly or 
+    through each other. The references are the global names in their code and
+    in the code generated for the candidate. Names without a source, such as
+    those of generated classes and imports, contribute the name."""
+    import inspect
+    cls = type(candidate)
+    pending = [(item.__module__, item.__name__, item) 
+        for item in inspect.getmro(cls) + (compile_unrolled, compile_async,
+        unrolled_baseline, sized_class, on_filesystem, run_serial) 
+        if item is not object]
+    generated = [code for value in vars(candidate).values() 
+        for code in function_codes(value)]
+    pending += [(cls.__module__, name, None) for code in generated 
+        for name in global_names(code)]
+    sources = {}
+    while pending:
+        module_name, name, value = pending.pop()
+        namespace = getattr(sys.modules.get(module_name), "__dict__", {})
+        if (module_name, name) in sources or not (value or name in namespace):
+            continue
+        value = value or namespace[name]
+        sources[module_name, name] = (top_level_sources(module_name).get(name)
+            or name)
+        for base in getattr(value, "__bases__", ()):
+            if base is not object:
+                pending.append((base.__module__, base.__name__, base))
+        for code in function_codes(value):
+            pending += [(module_name, item, None) 
+                for item in global_names(code)]
+    return "\n".join(sources[key] for key in sorted(sources))
+
+def cache_key(candidate, settings, env):
+    "A hash of everything that determines the samples of a candidate."
+    import hashlib
+    import json
+    key = {
+        "schema": EXPORT_SCHEMA,
+        "class": type(candidate).__name__,
+        "source": candidate_source(candidate),
+        "arguments": candidate.arguments(),
+        "settings": settings,
+        "environment": dict((field, env.get(field)) 
+            for field in CACHE_ENVIRONMENT)
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+def load_cached(path, candidate):
+    "Restores the samples of a candidate from a cache file, if there is one."
+    import json
+    try:
+        f = open(path)
+    except IOError:
+        return False
+    try:
+        entry = json.load(f)
+    except ValueError:
+        return False
+    finally:
+        f.close()
+    candidate.num_ops = entry["num_ops"]
+    candidate.times.extend(entry["times"])
+    candidate.stamps.extend(entry["stamps"])
+    candidate.noise.extend(entry["noise"])
+    candidate.rejected += entry["rejected"]
+    return True
+    
+def store_cached(path, candidate):
+    """Writes the samples of a candidate to a cache file. The file is renamed
+    into place so that concurrent runs never see it half written."""
+    import json
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    entry = {
+        "class": type(candidate).__name__,
+        "num_ops": candidate.num_ops,
+        "times": candidate.times,
+        "stamps": candidate.stamps,
+        "noise": candidate.noise,
+        "rejected": candidate.rejected
+    }
+    temporary = "%s.%d" % (path, os.getpid())
+    f = open(temporary, "w")
+    try:
+        json.dump(entry, f)
+    finally:
+        f.close()
+    os.rename(temporary, path)
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return 0.5 * (values[middle - 1] + values[middle])
+    
+def mean(values):
+    return sum(values) / len(values)
+
+def trimmed_mean(values, proportion=0.1):
+    "The mean of the values left after discarding the extremes at each end."
+    values = sorted(values)
+    k = int(len(values) * proportion)
+    return mean(values[k:len(values) - k])
+    
+def mad(values):
+    "The median absolute deviation from the median."
+    m = median(values)
+    return median([abs(v - m) for v in values])
+
+def percentile(values, p):
+    "Linearly interpolated percentile of a sorted list."
+    position = (len(values) - 1) * p / 100.0
+    i = int(position)
+    if i + 1 >= len(values):
+        return values[-1]
+    return values[i] + (values[i + 1] - values[i]) * (position - i)
+    
+estimators = {
+    "min": min,
+    "median": median,
+    "trimmed": trimmed_mean,
+    "mean": mean
+}
+    
+class OverheadModel(object):
+    """Resolves overheads by fitting the true cost of every candidate class
+    jointly. Each measured candidate contributes one equation:
+
+        raw time per op = own cost + sum of (multiplier * overhead cost)
+
+    where an overhead's cost is that of the class providing its tag (the 
+    average, if there are several). The system is solved by non-negative
+    least squares, weighting each equation by the inverse of its raw time so 
+    that residuals are relative. Measuring a class more than once, such as at
+    several unroll factors, adds redundant equations, and overheads may depend
+    on each other in cycles."""
+    
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.classes = []
+        index = {}
+        providers = defaultdict(list)
+        for candidate in candidates:
+            cls = type(candidate)
+            if cls not in index:
+                index[cls] = len(self.classes)
+                self.classes.append(cls)
+                for tag in candidate.tags:
+                    providers[tag].append(cls)
+        self.index = index
+        
+        # The coefficients of each equation, and of each unknown by equation.
+        # Classes with per-sample costs are solved for their cost per sample.
+        self.rows = []
+        self.columns = [[] for cls in self.classes]
+        for i, candidate in enumerate(candidates):
+            row = defaultdict(float)
+            if candidate.per_sample:
+                row[index[type(candidate)]] += 1.0 / candidate.num_ops
+            else:
+                row[index[type(candidate)]] += 1.0
+            for tag, multiplier in candidate.overheads:
+                if tag not in providers:
+                    raise ValueError("No candidate provides the %r overhead "
+                        "of %s" % (tag, type(candidate).__name__))
+                for cls in providers[tag]:
+                    coefficient = multiplier / len(providers[tag])
+                    if cls.per_sample:
+                        coefficient /= candidate.num_ops
+                    row[index[cls]] += coefficient
+            self.rows.append(row.items())
+            for j, coefficient in row.items():
+                self.columns[j].append((i, coefficient))
+                
+    def solve(self, values, x=None, tolerance=1e-7, max_sweeps=10000):
+        """Fits the model to raw times per op, given as a dict mapping each
+        candidate to its time. Returns the costs of the classes, which can be
+        passed back in as 'x' to warm-start a fit to similar values, and dicts
+        mapping each candidate to its resolved time per op and to the residual
+        of its equation."""
+        b = [values[candidate] for candidate in self.candidates]
+        w = [1.0 / max(abs(value), 1e-12) for value in b]
+        if x is None:
+            x = [0.0] * len(self.classes)
+        else:
+            x = list(x)
+            
+        # Projected coordinate descent on the weighted residuals r.
+        r = [w[i] * (sum(a * x[j] for j, a in row) - b[i])
+            for i, row in enumerate(self.rows)]
+        curvature = [sum((w[i] * a) ** 2 for i, a in column) 
+            for column in self.columns]
+        for sweep in xrange(max_sweeps):
+            converged = True
+            for j, column in enumerate(self.columns):
+                gradient = sum(w[i] * a * r[i] for i, a in column)
+                new = max(0.0, x[j] - gradient / curvature[j])
+                delta = new - x[j]
+                if delta:
+                    x[j] = new
+                    for i, a in column:
+                        r[i] += w[i] * a * delta
+                    if abs(delta) > tolerance * max(new, 1e-12):
+                        converged = False
+            if converged:
+                break
+        
+        resolved = {}
+        residuals = {}
+        for i, candidate in enumerate(self.candidates):
+            cost = x[self.index[type(candidate)]]
+            if candidate.per_sample:
+                cost /= candidate.num_ops
+            resolved[candidate] = cost
+            residuals[candidate] = r[i] / w[i]
+        return x, resolved, residuals
+    
+# Bootstrap replicates are fitted starting from the fit to the samples, to a
+# looser tolerance and with fewer sweeps than it, since they only set the
+# bounds of confidence intervals.
+BOOTSTRAP_TOLERANCE = 1e-4
+BOOTSTRAP_SWEEPS = 100
+
+def analyze(candidates, estimator="min", bootstrap=1000, seed=None):
+    """Sets time_per_op, ci, residual, stats, warmup, cold and time_to_steady
+    on each candidate. time_per_op is the chosen estimator applied to the
+    steady state samples with overheads subtracted, and ci is a bootstrap 95% 
+    confidence interval for it. residual is the error of the overhead model's
+    fit to the candidate's raw time. stats holds the min, median and trimmed
+    mean with overheads subtracted, and the MAD, all per op. warmup is the
+    number of samples taken before the steady state, time_to_steady the time
+    they took in seconds, and cold the time per op of the first sample with
+    the same overheads subtracted as from time_per_op."""
+    model = OverheadModel(candidates)
+    for candidate in candidates:
+        candidate.stats = {}
+        candidate.warmup = 0
+        if not candidate.per_sample:
+            candidate.warmup = steady_state_start(candidate.times)
+    for key in set(["min", "median", "trimmed", estimator]):
+        estimate = estimators[key]
+        raw = dict((candidate, 
+            estimate(candidate.steady_times()) / candidate.num_ops) 
+            for candidate in candidates)
+        x, resolved, residuals = model.solve(raw)
+        for candidate, t in resolved.items():
+            if key == estimator:
+                candidate.time_per_op = t
+                candidate.raw_time_per_op = raw[candidate]
+                candidate.residual = residuals[candidate]
+                fit = x
+            candidate.stats[key] = t
+    for candidate in candidates:
+        candidate.stats["mad"] = mad(candidate.steady_times()) / \
+            candidate.num_ops
+    
+    # Resample every candidate's times, including the overheads, and resolve 
+    # each set of resamples as a whole so that the uncertainty in overheads
+    # shows up in the intervals of the candidates that subtract them.
+    rng = random.Random(seed)
+    estimate = estimators[estimator]
+    replicates = defaultdict(list)
+    for i in xrange(bootstrap):
+        raw = {}
+        for candidate in candidates:
+            times = candidate.steady_times()
+            resample = [times[int(rng.random() * len(times))] for t in times]
+            raw[candidate] = estimate(resample) / candidate.num_ops
+        for candidate, t in model.solve(raw, fit, BOOTSTRAP_TOLERANCE, 
+            BOOTSTRAP_SWEEPS)[1].items():
+            replicates[candidate].append(t)
+    for candidate in candidates:
+        if bootstrap:
+            values = sorted(replicates[candidate])
+            candidate.ci = (percentile(values, 2.5), percentile(values, 97.5))
+        else:
+            candidate.ci = (candidate.time_per_op, candidate.time_per_op)
+        candidate.cold = candidate.time_per_op + (candidate.times[0] - 
+            estimate(candidate.steady_times())) / candidate.num_ops
+        candidate.time_to_steady = sum(candidate.times[:candidate.warmup])
+
+# Scaling. The costs of a sized candidate at each of its sizes are fitted to 
+# each of these functions f of the size n that its class allows, as cost = 
+# a + b * f(n).
+
+COMPLEXITIES = [
+    ("1", lambda n: 0.0),
+    ("log n", lambda n: math.log(n)),
+    ("n", lambda n: float(n)),
+    ("n log n", lambda n: n * math.log(n)),
+    ("n^2", lambda n: float(n) * n)
+]
+
+# The simplest model whose RMS relative error is within this of the best 
+# model's is chosen.
+FIT_TOLERANCE = 0.05
+
+def fit_complexity(sizes, times, f):
+    """Fits times = a + b * f(size) by least squares on the relative error, 
+    with a and b non-negative. Returns a, b and the RMS relative error."""
+    u = [1.0 / max(t, 1e-12) for t in times]
+    g = [f(n) for n in sizes]
+    saa = sum(ui * ui for ui in u)
+    sab = sum(ui * ui * gi for ui, gi in izip(u, g))
+    sbb = sum((ui * gi) ** 2 for ui, gi in izip(u, g))
+    sa = sum(u)
+    sb = sum(ui * gi for ui, gi in izip(u, g))
+    fits = [(sa / saa, 0.0)]
+    if sbb > 0.0:
+        fits.append((0.0, sb / sbb))
+    det = saa * sbb - sab * sab
+    if det > 1e-12 * saa * sbb:
+        a = (sa * sbb - sb * sab) / det
+        b = (saa * sb - sab * sa) / det
+        if a >= 0.0 and b >= 0.0:
+            fits.append((a, b))
+    def rms(a, b):
+        return math.sqrt(mean([((a + b * gi) * ui - 1.0) ** 2 
+            for ui, gi in izip(u, g)]))
+    error, a, b = min((rms(a, b), a, b) for a, b in fits)
+    return a, b, error
+
+def complexity(sizes, times, labels=None):
+    """Chooses the model in COMPLEXITIES, or in those of them with the given
+    labels, that best describes how times grow with size. Returns its label,
+    a, b and RMS relative error."""
+    fits = [(label,) + fit_complexity(sizes, times, f) 
+        for label, f in COMPLEXITIES if labels is None or label in labels]
+    best = min(error for label, a, b, error in fits)
+    for fit in fits:
+        if fit[3] <= best + FIT_TOLERANCE:
+            return fit
+
+def crossovers(sizes, a, b):
+    """The sizes at which the costs of two sized candidates measured at the 
+    same sizes cross, given lists of their candidates in order of size. Sizes 
+    where their confidence intervals overlap are skipped, and the crossing is 
+    interpolated geometrically between the sizes either side of it. Returns
+    a (size, faster above) pair for each crossing, where faster above is 0 if
+    a is faster above it and 1 if b is."""
+    decided = []
+    for n, x, y in izip(sizes, a, b):
+        if x.ci[1] < y.ci[0] or y.ci[1] < x.ci[0]:
+            if x.time_per_op > 0.0 and y.time_per_op > 0.0:
+                decided.append((n, math.log(x.time_per_op / y.time_per_op)))
+    points = []
+    for (n0, d0), (n1, d1) in izip(decided, decided[1:]):
+        if (d0 < 0.0) != (d1 < 0.0):
+            x = math.log(n0) + (math.log(n1) - math.log(n0)) * d0 / (d0 - d1)
+            points.append((math.exp(x), 0 if d1 < 0.0 else 1))
+    return points
+
+MULTIPLIERS = { 
+    "s" : 1e0,
+    "ms": 1e3, 
+    "us": 1e6, 
+    "ns": 1e9 
+}
+
+# Decimal places shown for each unit, so that times are always shown to the
+# nanosecond.
+DECIMALS = {
+    "s" : 9,
+    "ms": 6,
+    "us": 3,
+    "ns": 0
+}
+
+def pretty(n, decimals=0):
+    if n >= 0.0:    
+        s, point, fraction = ("%.*f" % (decimals, n)).partition(".")
+        return ",".join([s[max(i, 0):i + 3] for i in 
+            xrange(len(s) % -3, len(s), 3)]) + point + fraction
+    else:
+        return "-" + pretty(-n, decimals)
+
+def pretty_bytes(n):
+    "Formats a byte count in the largest binary unit that divides it."
+    for unit, scale in (("GiB", 2 ** 30), ("MiB", 2 ** 20), ("KiB", 2 ** 10)):
+        if n >= scale and n % scale == 0:
+            return "%s%s" % (pretty(n // scale), unit)
+    return "%sB" % pretty(n)
+
+def benchmark(candidates=[], jobs=1, target_time=None, timer="default", 
+    estimator="min", bootstrap=1000, seed=None, max_retries=MAX_RETRIES,
+    cache=None, refresh=False, num_ops=NUM_OPS, max_warmup=MAX_WARMUP,
+    drift_correct=False, isolate=False, event_loop="asyncio"):
+    """Measures and analyzes the candidates along with the overhead 
+    candidates, returning the whole list. Times are in seconds. If cache is
+    a directory, candidates found in it aren't measured again unless refresh
+    is set, and the samples of those that are measured are stored in it.
+    The seed, chosen at random if not given, sets the order candidates are 
+    measured in and the bootstrap resamples. If drift_correct is set, the
+    samples measured in this run are corrected for drift in the baselines
+    before analysis. If isolate is set, each candidate runs in a fresh 
+    interpreter of its own. Asyncio candidates run on the event loop named 
+    by event_loop."""
+    classes = baseline_classes(candidates)
+    base = [cls(num_ops=num_ops) for cls in classes]
+    base += [candidate for candidate in candidates 
+        if type(candidate) not in classes]
+    candidates = base
+
+    # The parent measures the timer too, for the report.
+    Candidate.setup(timer)
+    Async.setup_loop(event_loop)
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    Candidate.seed = seed
+    
+    measured = candidates
+    if cache:
+        env = environment()
+        settings = { "timer": timer, "target_time": target_time,
+            "repetitions": REPETITIONS, "max_retries": max_retries,
+            "max_warmup": max_warmup }
+        if isolate:
+            settings["isolate"] = True
+        if event_loop != "asyncio":
+            settings["event_loop"] = event_loop
+        paths = dict((candidate, os.path.join(cache, 
+            cache_key(candidate, settings, env) + ".json"))
+            for candidate in candidates)
+        measured = [candidate for candidate in candidates 
+            if refresh or not load_cached(paths[candidate], candidate)]
+        print("Cache: %d candidates reused, %d measured" % (
+            len(candidates) - len(measured), len(measured)), file=sys.stderr)
+    
+    if not measured:
+        pass
+    elif isolate:
+        run_isolated(measured, REPETITIONS, target_time, timer, max_retries,
+            max_warmup, seed, event_loop)
+    elif jobs > 1:
+        # Pool workers can't start processes, so the parent measures the 
+        # candidates that do.
+        local = [candidate for candidate in measured 
+            if candidate.starts_processes]
+        run_parallel([candidate for candidate in measured 
+            if not candidate.starts_processes], REPETITIONS, jobs, 
+            target_time, timer, max_retries, max_warmup, seed, event_loop)
+        calibrate(local, target_time)
+        run_serial(local, REPETITIONS, max_retries, max_warmup, seed)
+    else:
+        calibrate(measured, target_time)
+        run_serial(measured, REPETITIONS, max_retries, max_warmup, seed)
+    if cache:
+        for candidate in measured:
+            store_cached(paths[candidate], candidate)
+    
+    # Reduce each benchmark's samples to a time per op, with and without the
+    # overheads subtracted.
+    imprecise = set()
+    for candidate in candidates:
+        if (not candidate.per_sample and 
+            min(candidate.times) < Candidate.timer_resolution * 100):
+            imprecise.add(type(candidate).__name__)
+    for class_name in sorted(imprecise):
+        print("warning: samples of %s are within 100x of the "
+            "timer resolution" % class_name, file=sys.stderr)
+    if drift_correct:
+        # Samples from the cache were taken in other runs, at other levels of
+        # the baselines, so only those taken in this run are corrected.
+        if len(measured) < len(candidates):
+            print("warning: --drift-correct leaves the %d candidates reused "
+                "from the cache uncorrected" % (len(candidates) - 
+                len(measured)), file=sys.stderr)
+        correct_drift(measured)
+    analyze(candidates, estimator, bootstrap, seed)
+    return candidates
+    
+def report(candidates, categories=[], unit="us", stats=False, shown=None):
+    """Prints a table of results for each category. Only the candidates in
+    'shown' are listed, if it is given."""
+    multiplier = MULTIPLIERS[unit]
+    decimals = DECIMALS[unit]
+    print("Timer %s: resolution %s%s, call overhead %s%s, seed %d" % (
+        Candidate.timer_name,
+        pretty(Candidate.timer_resolution * multiplier, decimals), unit,
+        pretty(Candidate.timer_overhead * multiplier, decimals), unit,
+        Candidate.seed))
+    errors = [candidate.residual / candidate.raw_time_per_op
+        for candidate in candidates if candidate.raw_time_per_op > 0]
+    print("Overhead model: %d measurements of %d classes, RMS residual "
+        "%.2f%%\n" % (len(candidates), len(set(map(type, candidates))),
+        100.0 * math.sqrt(mean([e * e for e in errors] or [0.0]))))
+        
+    # Show how much the baselines moved during the run.
+    baselines = drift(candidates)
+    if baselines:
+        print("Drift: baseline medians by quarter of the run, relative to "
+            "the whole")
+        for class_name, levels in baselines:
+            print("%-20s%s %+6.1f%%" % (class_name, 
+                "".join("%6.2f" % level for level in levels), 
+                100.0 * (levels[-1] - levels[0])))
+        print("")
+    
+    # Count the samples that were disturbed, by class.
+    rejected = defaultdict(int)
+    noisy = defaultdict(int)
+    for candidate in candidates:
+        rejected[type(candidate)] += candidate.rejected
+        noisy[type(candidate)] += sum(1 for i in xrange(len(candidate.noise))
+            if candidate.noisy(i))
+    if sum(rejected.values()):
+        print("Noise: %d disturbed samples taken again, %d kept after "
+            "retrying\n" % (sum(rejected.values()), sum(noisy.values())))
+        
+    # Make a list of categories to print. Candidates measured more than once
+    # share a result, so only the first of each class is shown.
+    priority = count()
+    catorder = dict((name, next(priority)) for name, desc in categories)
+    catitems = defaultdict(set)
+    fieldwidth1 = 0
+    labels = {}
+    for candidate in candidates if shown is None else shown:
+        if not candidate.name or type(candidate) in labels:
+            continue
+        labels[type(candidate)] = candidate.name
+        if rejected[type(candidate)]:
+            labels[type(candidate)] += " (%d rejected)" % \
+                rejected[type(candidate)]
+        fieldwidth1 = max(fieldwidth1, 
+            len(pretty(candidate.time_per_op * multiplier, decimals)))
+        for catname in candidate.categories:
+            catitems[catname].add(candidate)
+            if catname not in catorder:
+                catorder[catname] = next(priority)
+    catitems = sorted(catitems.items(), key=lambda item: catorder[item[0]])
+
+    # Print the list.
+    catdescs = dict(categories) 
+    for name, items in catitems:
+        fieldwidth2 = max(len(labels[type(candidate)]) for candidate in items)
+        sorted_items = sorted(items, key=operator.attrgetter("time_per_op"), 
+            reverse=True)
+        print("-= %s =-\n" % catdescs.get(name, name))
+        if name == "io":
+            directories = io_directories()
+            print("Files in: %s\n" % ", ".join("%s (%s)" % (
+                directories[filesystem], filesystem) for filesystem in 
+                sorted(set(candidate.filesystem for candidate in items))))
+        if stats:
+            # Each column is as wide as its label or widest value, plus two.
+            fields = dict((candidate, ["%s%s" % (pretty(value * multiplier, 
+                decimals), unit) for value in [candidate.stats[key] 
+                for key in ("min", "median", "trimmed", "mad")] + 
+                [candidate.residual]]) for candidate in sorted_items)
+            headings = ["min", "median", "trimmed", "MAD", "resid"]
+            widths = [2 + max([len(heading)] + [len(fields[candidate][i]) 
+                for candidate in sorted_items]) 
+                for i, heading in enumerate(headings)]
+            print("%*s%s\n" % (2 * fieldwidth1 + len(unit) + 9, "", 
+                "".join("%*s" % (width, heading) 
+                for width, heading in izip(widths, headings))))
+        for candidate in sorted_items:
+            low, high = candidate.ci
+            error = max(high - candidate.time_per_op, 
+                candidate.time_per_op - low)
+            columns = ""
+            if stats:
+                columns = "".join("%*s" % (width, field) for width, field in 
+                    izip(widths, fields[candidate])) + " "
+            print("%*s%s +/-%*s %s%-*s" % (
+                fieldwidth1 + 4, 
+                pretty(candidate.time_per_op * multiplier, decimals), 
+                unit, fieldwidth1, pretty(error * multiplier, decimals), 
+                columns, fieldwidth2, labels[type(candidate)]
+                ))
+        print("")
+        
+    # List the candidates that were slower while they warmed up, with the 
+    # time per op of their first sample.
+    warming = []
+    seen = set()
+    for candidate in candidates:
+        if (candidate.warmup and candidate.name and 
+            type(candidate) not in seen):
+            seen.add(type(candidate))
+            warming.append(candidate)
+    if warming:
+        print("-= Warmup =-\n")
+        print("%*s%*s%9s%12s" % (fieldwidth1 + len(unit) + 4, "cold", 
+            fieldwidth1 + len(unit) + 4, "steady", "samples", "to steady"))
+        for candidate in sorted(warming, 
+            key=operator.attrgetter("time_to_steady"), reverse=True):
+            print("%*s%s%*s%s%9d%10.1fms %s" % (
+                fieldwidth1 + 4, pretty(candidate.cold * multiplier, decimals),
+                unit, fieldwidth1 + 4, 
+                pretty(candidate.time_per_op * multiplier, decimals), unit, 
+                candidate.warmup, candidate.time_to_steady * 1e3, 
+                candidate.name))
+        print("")
+    
+    # Fit the costs of each sized class to a function of size, and show where
+    # the alternatives in each group overtake each other.
+    families = defaultdict(dict)
+    sweeps = defaultdict(dict)
+    scaling = defaultdict(dict)
+    for candidate in candidates if shown is None else shown:
+        family = getattr(type(candidate), "family", None)
+        if family is None:
+            continue
+        if issubclass(family, WorkingSet):
+            sweeps[family.group].setdefault(family, {}).setdefault(
+                candidate.size, candidate)
+        elif issubclass(family, Threaded):
+            scaling[family].setdefault(candidate.size, candidate)
+        else:
+            families[family].setdefault(candidate.size, candidate)
+    dispatch = families.get(BenchPoolDispatch)
+    families = dict((family, items) for family, items in families.items()
+        if family.fit)
+    if families:
+        print("-= Scaling =-\n")
+        columns = dict((family, [items[size] for size in sorted(items)]) 
+            for family, items in families.items())
+        fieldwidth = 2 + max(len(pretty(candidate.time_per_op * multiplier, 
+            decimals) + unit) for items in columns.values() 
+            for candidate in items)
+        fieldwidth = max([fieldwidth] + [2 + len(family.label(size)) 
+            for family, items in families.items() for size in items])
+        order = sorted(columns, key=lambda family: (family.group or "", 
+            family.name))
+        for family in order:
+            items = columns[family]
+            sizes = [candidate.size for candidate in items]
+            label, a, b, error = complexity(sizes, 
+                [candidate.time_per_op for candidate in items], 
+                family.complexities)
+            print(family.name)
+            print("".join("%*s" % (fieldwidth, family.label(n)) 
+                for n in sizes))
+            print("".join("%*s%s" % (fieldwidth - len(unit), 
+                pretty(candidate.time_per_op * multiplier, decimals), unit)
+                for candidate in items))
+            fit = "%s%s" % (pretty(a * multiplier, decimals), unit)
+            if label == "n" and family.item:
+                fit += " per call + %.3g%s per %s" % (b * multiplier, unit, 
+                    family.item)
+            elif label != "1":
+                fit += " + %.3g%s * %s" % (b * multiplier, unit, label)
+            print("  O(%s): %s, RMS error %.1f%%\n" % (label, fit, 
+                100.0 * error))
+        for i, family in enumerate(order):
+            for other in order[i + 1:]:
+                if family.group is None or other.group != family.group:
+                    continue
+                sizes = sorted(set(families[family]) & set(families[other]))
+                pair = (family, other)
+                for n, faster in crossovers(sizes, 
+                    [families[family][size] for size in sizes],
+                    [families[other][size] for size in sizes]):
+                    print("%s overtakes %s at %s" % (
+                        pair[faster].name, pair[1 - faster].name, 
+                        family.label(int(round(n)))))
+        print("")
+    
+    # Show the cost of an access against the level of cache that the working
+    # set fits in, with the items in order and scattered side by side.
+    if sweeps:
+        levels = cache_levels()
+        print("-= Working Set =-\n")
+        print("Caches: %s\n" % (", ".join("%s %s" % (name, pretty_bytes(size))
+            for name, size in levels) or "unknown"))
+        for group, members in sorted(sweeps.items()):
+            members = sorted(members.items(), 
+                key=lambda item: item[0].scattered)
+            sizes = sorted(set(size for family, items in members 
+                for size in items))
+            print(members[0][0].name)
+            fieldwidth = max(fieldwidth1 + len(unit) + 4, 12)
+            print("%12s%6s%s" % ("working set", "fits", "".join(
+                "%*s" % (fieldwidth, 
+                "scattered" if family.scattered else "in order") 
+                for family, items in members)))
+            for size in sizes:
+                fits = [name for name, level in levels if level >= size]
+                print("%12s%6s%s" % (pretty_bytes(size), 
+                    (fits or ["DRAM"])[0], "".join(
+                    "%*s%s" % (fieldwidth - len(unit), pretty(
+                    items[size].time_per_op * multiplier, decimals), unit)
+                    if size in items else " " * fieldwidth
+                    for family, items in members)))
+            print("")
+    
+    # A process pool pays for a task once it takes longer than dispatching 
+    # it, as long as there are idle CPUs to run it.
+    if dispatch:
+        print("-= Process Pool Break-even =-\n")
+        print("Tasks that take longer than their dispatch cost run faster in "
+            "a process pool,\ngiven idle CPUs to run them (%d available "
+            "here).\n" % len(available_cpus()))
+        print("%12s%*s" % ("payload", fieldwidth1 + len(unit) + 14, 
+            "break-even task"))
+        for size in sorted(dispatch):
+            print("%12s%*s%s" % (pretty_bytes(size), fieldwidth1 + 14,
+                pretty(dispatch[size].time_per_op * multiplier, decimals), 
+                unit))
+        print("")
+    
+    # Show how the time per op of work split across threads changes with the 
+    # number of threads, and the speedup over a single thread.
+    if scaling:
+        interval = switch_interval()
+        print("-= Thread Scaling =-\n")
+        print("GIL %s%s\n" % ("enabled" if gil_enabled() else "disabled",
+            ", switch interval %gms" % (interval * 1e3) if interval else ""))
+        for family, items in sorted(scaling.items(), 
+            key=lambda item: item[0].name):
+            counts = sorted(items)
+            single = items[counts[0]].time_per_op * counts[0]
+            print(family.name)
+            print("%8s%*s%10s" % ("threads", fieldwidth1 + len(unit) + 4, 
+                "time", "speedup"))
+            for n in counts:
+                t = items[n].time_per_op
+                print("%8d%*s%s%9.2fx" % (n, fieldwidth1 + 4, 
+                    pretty(t * multiplier, decimals), unit, 
+                    single / (t * counts[0]) if t > 0.0 else 0.0))
+            print("")
+
+# Memory. This is measured in a separate pass from time, since tracing 
+# allocations slows the interpreter down several times over. It needs the
+# tracemalloc module of Python 3.4 and later.
+
+# The traced runs of a candidate whose least allocation is taken.
+MEMORY_TRIES = 3
+
+traced_functions = {}
+
+def compile_traced(cls):
+    """Generates and compiles a function that runs 'setup_code' and 
+    'loop_setup' of an unrolled candidate class, then each of its statements
+    twice, calling mark() before and done() after each run of one."""
+    if cls not in traced_functions:
+        statements = getattr(cls, "statement", "pass")
+        unroll = 1 if isinstance(statements, string_types) else len(statements)
+        lines = ["def traced(self, num_ops, mark, done):", "    i = 0"]
+        lines += ["    " + line for line in cls.setup_code.splitlines()]
+        lines += ["    " + line for line in cls.loop_setup.splitlines()]
+        for line in cls.body(unroll):
+            lines += ["    mark()", "    " + line, "    done()"] * 2
+        source = "\n".join(lines) + "\n"
+        code = compile(source, "<%s traced>" % cls.__name__, "exec")
+        namespace = {}
+        if cls.__module__ == __name__:
+            exec(code, globals(), namespace)
+        else:
+            exec(code, vars(sys.modules[cls.__module__]), namespace)
+        traced_functions[cls] = namespace["traced"]
+    return traced_functions[cls]
+
+def traced_statements(candidate):
+    """The mean, over the statements of an unrolled candidate, of the peak 
+    bytes traced above the starting level while each runs, the least of 
+    MEMORY_TRIES runs. Each statement is run twice and the lesser of the two
+    taken, since the first can allocate caches. Needs 
+    tracemalloc.reset_peak(), which is new in Python 3.9."""
+    import tracemalloc
+    traced = compile_traced(type(candidate))
+    level = array.array("d", [0.0])
+    sizes = []
+    def mark():
+        level[0] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    def done():
+        sizes.append(tracemalloc.get_traced_memory()[1] - level[0])
+    candidate.prepare()
+    traced(candidate, 1, mark, done)
+    means = []
+    for i in xrange(MEMORY_TRIES):
+        del sizes[:]
+        tracemalloc.start()
+        try:
+            traced(candidate, 1, mark, done)
+        finally:
+            tracemalloc.stop()
+        means.append(mean([min(first, second) 
+            for first, second in izip(sizes[0::2], sizes[1::2])]))
+    candidate.cleanup()
+    return min(means)
+
+def traced_peak(candidate, num_ops):
+    """The peak bytes tracemalloc traces above the starting level while a 
+    candidate runs num_ops ops, the least of MEMORY_TRIES runs. An untraced
+    run first makes one-off allocations, such as of caches, beforehand."""
+    import tracemalloc
+    candidate.prepare()
+    candidate.run(num_ops)
+    peaks = []
+    for i in xrange(MEMORY_TRIES):
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            candidate.run(num_ops)
+            peaks.append(tracemalloc.get_traced_memory()[1] - start)
+        finally:
+            tracemalloc.stop()
+    candidate.cleanup()
+    return min(peaks)
+
+def memory_baseline(candidate):
+    """The empty candidate class whose allocations are subtracted from those 
+    of a candidate: the unrolled baseline or overhead candidate class among
+    its overheads, or BenchPass."""
+    for tag, multiplier in candidate.overheads:
+        match = re.match(r"unrolled(\d+)$", tag)
+        if match:
+            return unrolled_baseline(int(match.group(1)))
+        for cls in overhead_candidate_classes:
+            if tag in cls.tags:
+                return cls
+    return BenchPass
+
+def allocated_per_op(candidate):
+    """The bytes a candidate allocates per op, less those its empty baseline
+    allocates. Objects an op allocates and drops don't add up over a run, so 
+    this is measured over single ops. Each statement of an unrolled candidate
+    is traced on its own, where tracemalloc can reset its peak. Otherwise the
+    peak of one iteration of the candidate's loop is divided by the ops in 
+    it, which misses allocations smaller than those of the loop itself."""
+    import tracemalloc
+    if (isinstance(candidate, Unrolled) and 
+        hasattr(tracemalloc, "reset_peak")):
+        single = type(candidate)(**dict(candidate.arguments(), unroll=1))
+        allocated = traced_statements(single) - traced_statements(
+            unrolled_baseline(1)(num_ops=1))
+    else:
+        baseline = memory_baseline(candidate)(num_ops=candidate.step)
+        allocated = float(traced_peak(candidate, candidate.step) - 
+            traced_peak(baseline, candidate.step)) / candidate.step
+    return max(allocated, 0.0)
+
+def measure_memory(candidate):
+    """Measures the memory a candidate uses, setting its memory attribute to a
+    dict of the bytes allocated per op, from allocated_per_op(), and the 
+    bytes still retained per op after a sample and the number of collections
+    of each gc generation during it, with gc enabled."""
+    allocated = allocated_per_op(candidate)
+    import tracemalloc
+    candidate.prepare()
+    gc.collect()
+    before = [generation["collections"] for generation in gc.get_stats()]
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        candidate.run(candidate.num_ops)
+        current = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    after = [generation["collections"] for generation in gc.get_stats()]
+    candidate.cleanup()
+    candidate.memory = {
+        "allocated": allocated,
+        "retained": float(current - start) / candidate.num_ops,
+        "collections": [n1 - n0 for n0, n1 in izip(before, after)]
+    }
+    
+def measure_size(factory, count=1000):
+    """Returns the bytes retained per object by 'count' objects returned by 
+    factory, and the sys.getsizeof() of one of them."""
+    import tracemalloc
+    objects = [None] * count
+    factory()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for i in xrange(count):
+            objects[i] = factory()
+        size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return float(size) / count, sys.getsizeof(objects[0])
+
+class Abc(object):
+    def __init__(self):
+        self.a, self.b, self.c = 1, 2, 3
+        
+class AbcWithSlots(object):
+    __slots__ = ("a", "b", "c")
+    
+    def __init__(self):
+        self.a, self.b, self.c = 1, 2, 3
+
+# (name, factory) pairs for the objects whose size is reported. The container
+# entries are small ints, which are shared, so only the container is counted.
+SIZE_PROBE_ENTRIES = [0, 1, 4, 8, 32, 100]
+size_probes = [
+    ("Instance with 3 attributes in a __dict__", Abc),
+    ("Instance with 3 attributes in __slots__", AbcWithSlots)
+] + [
+    ("%s of %d %s" % (kind, n, "entry" if n == 1 else "entries"), 
+        functools.partial(lambda make, n: make(xrange(n)), make, n))
+    for kind, make in [("tuple", tuple), ("list", list), ("set", set), 
+        ("dict", dict.fromkeys)]
+    for n in SIZE_PROBE_ENTRIES
+]
+
+def report_memory(candidates, categories=[]):
+    """Prints the memory measurements of each category, followed by the size
+    of each of the size_probes objects."""
+    priority = count()
+    catorder = dict((name, next(priority)) for name, desc in categories)
+    catitems = defaultdict(list)
+    shown = set()
+    for candidate in candidates:
+        if (not candidate.name or type(candidate) in shown or 
+            getattr(candidate, "memory", None) is None):
+            continue
+        shown.add(type(candidate))
+        for catname in candidate.categories:
+            catitems[catname].append(candidate)
+            if catname not in catorder:
+                catorder[catname] = next(priority)
+    
+    catdescs = dict(categories)
+    for catname, items in sorted(catitems.items(), 
+        key=lambda item: catorder[item[0]]):
+        print("-= %s: memory =-\n" % catdescs.get(catname, catname))
+        print("%14s%14s%16s" % ("allocated/op", "retained/op", 
+            "collections"))
+        for candidate in sorted(items, 
+            key=lambda candidate: candidate.memory["allocated"], 
+            reverse=True):
+            memory = candidate.memory
+            print("%13sB%13sB%16s %s" % (pretty(memory["allocated"]), 
+                pretty(memory["retained"]), 
+                "/".join(str(n) for n in memory["collections"]), 
+                candidate.name))
+        print("")
+        
+    print("-= Object Sizes =-\n")
+    print("%12s%12s" % ("resident", "getsizeof"))
+    for name, factory in size_probes:
+        resident, shallow = measure_size(factory)
+        print("%11sB%11sB %s" % (pretty(resident), pretty(shallow), name))
+    print("")
+
+# Export. Records carry the version of their format, EXPORT_SCHEMA, which is
+# bumped whenever a field is added or changes meaning. The fields each version
+# added:
+#
+#   1  environment: python_version, python_implementation, python_build,
+#      python_compiler, python_executable, config_args, cflags, cpu_model,
+#      cpu_count, machine, kernel, hostname, timer, timer_resolution,
+#      timer_overhead, repetitions and timestamp. candidate: class, name,
+#      categories, tags, overheads, num_ops, times, time_per_op, ci_low,
+#      ci_high, min, median, trimmed and mad.
+#   2  residual, the error of the overhead model's fit to the candidate.
+#   3  rejected, the samples taken again because the OS disturbed them, and
+#      noisy, those kept though disturbed.
+#   4  peak_bytes, retained_per_op and collections, set by --memory.
+#   5  warmup, the samples before the steady state, cold, the time per op of
+#      the first sample, and time_to_steady.
+#   6  seed, of the measurement order.
+#   7  size, of a sized candidate, or null.
+#   8  caches, the name and size in bytes of each CPU cache level.
+#   9  gil, whether the interpreter has a global interpreter lock.
+#   10 event_loop, the asyncio event loop used, if any.
+#   11 filesystems, the name, directory and filesystem type of each directory
+#      the I/O candidates use.
+#   12 allocated_per_op, the bytes allocated per op above those of the empty
+#      baseline, in place of peak_bytes.
+
+EXPORT_SCHEMA = 12
+
+def read_first_line(path, prefix):
+    "Returns the value of the first 'prefix: value' line of a file, or None."
+    try:
+        f = open(path)
+    except IOError:
+        return None
+    try:
+        for line in f:
+            if line.startswith(prefix):
+                return line.split(":", 1)[1].strip()
+    finally:
+        f.close()
+    return None
+
+def environment():
+    "Describes the interpreter, machine and timer used for a run."
+    import platform
+    import sysconfig
+    return {
+        "python_version": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "python_build": " ".join(platform.python_build()),
+        "python_compiler": platform.python_compiler(),
+        "python_executable": sys.executable,
+        "config_args": sysconfig.get_config_var("CONFIG_ARGS") or "",
+        "cflags": sysconfig.get_config_var("CFLAGS") or "",
+        "cpu_model": read_first_line("/proc/cpuinfo", "model name") or 
+            platform.processor(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "machine": platform.machine(),
+        "kernel": "%s %s" % (platform.system(), platform.release()),
+        "hostname": platform.node(),
+        "timer": Candidate.timer_name,
+        "timer_resolution": Candidate.timer_resolution,
+        "timer_overhead": Candidate.timer_overhead,
+        "seed": getattr(Candidate, "seed", None),
+        "repetitions": REPETITIONS,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+        "caches": [[name, size] for name, size in cache_levels()],
+        "gil": gil_enabled(),
+        "event_loop": Async.event_loop if event_loops() else None,
+        "filesystems": [[name, path, filesystem_type(path)] 
+            for name, path in sorted(io_directories().items())]
+    }
+    
+def candidate_record(candidate):
+    "A flat description of a candidate and its results, with times in seconds."
+    memory = getattr(candidate, "memory", None) or {}
+    return {
+        "class": type(candidate).__name__,
+        "name": candidate.name,
+        "categories": list(candidate.categories),
+        "tags": list(candidate.tags),
+        "overheads": [[tag, multiplier] 
+            for tag, multiplier in candidate.overheads],
+        "num_ops": candidate.num_ops,
+        "times": list(candidate.times),
+        "time_per_op": candidate.time_per_op,
+        "ci_low": candidate.ci[0],
+        "ci_high": candidate.ci[1],
+        "min": candidate.stats["min"],
+        "median": candidate.stats["median"],
+        "trimmed": candidate.stats["trimmed"],
+        "mad": candidate.stats["mad"],
+        "residual": candidate.residual,
+        "rejected": candidate.rejected,
+        "noisy": sum(1 for i in xrange(len(candidate.noise)) 
+            if candidate.noisy(i)),
+        "warmup": candidate.warmup,
+        "cold": candidate.cold,
+        "time_to_steady": candidate.time_to_steady,
+        "size": getattr(candidate, "size", None),
+        "allocated_per_op": memory.get("allocated"),
+        "retained_per_op": memory.get("retained"),
+        "collections": memory.get("collections")
+    }
+
+# Column order of the CSV export. List-valued fields are joined with spaces.
+CSV_FIELDS = ["class", "name", "categories", "tags", "overheads", "num_ops",
+    "time_per_op", "ci_low", "ci_high", "min", "median", "trimmed", "mad", 
+    "times", "python_version", "python_implementation", "python_build", 
+    "python_compiler", "python_executable", "config_args", "cflags", 
+    "cpu_model", "cpu_count", "machine", "kernel", "hostname", "timer", 
+    "timer_resolution", "timer_overhead", "repetitions", "timestamp", 
+    "residual", "rejected", "noisy", "allocated_per_op", "retained_per_op", 
+    "collections", "warmup", "cold", "time_to_steady", "seed", "size", 
+    "caches", "gil", "event_loop", "filesystems"]
+
+def export_jsonl(f, candidates, env):
+    """Writes one JSON object per line: an environment record followed by a
+    record for each candidate."""
+    import json
+    env = dict(env, record="environment", schema=EXPORT_SCHEMA)
+    f.write(json.dumps(env, sort_keys=True) + "\n")
+    for candidate in candidates:
+        record = dict(candidate_record(candidate), record="candidate")
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+        
+def export_csv(f, candidates, env):
+    "Writes a row per candidate, each repeating the environment fields."
+    import csv
+    def flatten(value):
+        if isinstance(value, list):
+            return " ".join(flatten(item) for item in value)
+        if isinstance(value, float):
+            return repr(value)
+        if value is None:
+            return ""
+        return str(value)
+    writer = csv.writer(f)
+    writer.writerow(CSV_FIELDS)
+    for candidate in candidates:
+        record = dict(env, **candidate_record(candidate))
+        writer.writerow([flatten(record[field]) for field in CSV_FIELDS])
+
+exporters = {
+    "jsonl": export_jsonl,
+    "csv": export_csv
+}
+
+def export(path, candidates, format=None):
+    """Writes results to a file, or to stdout if path is "-". The format is
+    guessed from the extension if not given."""
+    if format is None:
+        format = "csv" if path.endswith(".csv") else "jsonl"
+    env = environment()
+    if path == "-":
+        exporters[format](sys.stdout, candidates, env)
+    else:
+        f = open_text(path)
+        try:
+            exporters[format](f, candidates, env)
+        finally:
+            f.close()
+
+# Baselines.
+
+def save_baseline(path, candidates, name=None):
+    "Saves a run as a single JSON document for later comparison."
+    import json
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+    doc = {
+        "schema": EXPORT_SCHEMA,
+        "name": name,
+        "environment": environment(),
+        "candidates": [candidate_record(candidate) 
+            for candidate in candidates]
+    }
+    f = open(path, "w")
+    try:
+        json.dump(doc, f, indent=1, sort_keys=True)
+    finally:
+        f.close()
+
+def load_baseline(path):
+    """Reads a saved baseline or a JSON Lines export. Returns the name, the
+    environment and a dict mapping class names to candidate records."""
+    f = open(path)
+    try:
+        text = f.read()
+    finally:
+        f.close()
+    return parse_results(text, os.path.splitext(os.path.basename(path))[0])
+
+def parse_results(text, name=None):
+    """Parses the text of a saved baseline or a JSON Lines export, as for 
+    load_baseline(). The name is used if the text doesn't record one."""
+    import json
+    try:
+        doc = json.loads(text)
+    except ValueError:
+        doc = None
+    if isinstance(doc, dict) and "candidates" in doc:
+        name, env, records = doc["name"], doc["environment"], doc["candidates"]
+    else:
+        env, records = {}, []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("record") == "environment":
+                env = record
+            else:
+                records.append(record)
+    return name, env, dict((record["class"], record) for record in records)
+    
+def compare(path, candidates, categories=[], unit="us", threshold=5.0):
+    """Prints the change in each candidate's time relative to a baseline, by
+    category. A change is flagged when the confidence intervals of the two 
+    runs don't overlap and it is at least 'threshold' percent. Returns the
+    list of candidates that got slower."""
+    name, env, records = load_baseline(path)
+    multiplier = MULTIPLIERS[unit]
+    decimals = DECIMALS[unit]
+    print("Baseline %s: Python %s (%s) on %s, %s\n" % (name, 
+        env.get("python_version"), env.get("python_implementation"), 
+        env.get("cpu_model"), env.get("timestamp")))
+    
+    priority = count()
+    catorder = dict((catname, next(priority)) for catname, desc in categories)
+    catitems = defaultdict(list)
+    regressions = []
+    changes = {}
+    shown = set()
+    for candidate in candidates:
+        record = records.get(type(candidate).__name__)
+        if not candidate.name or record is None or type(candidate) in shown:
+            continue
+        shown.add(type(candidate))
+        old, new = record["time_per_op"], candidate.time_per_op
+        change = 100.0 * (new - old) / old if old > 0 else 0.0
+        significant = (candidate.ci[0] > record["ci_high"] or 
+            candidate.ci[1] < record["ci_low"])
+        flag = ""
+        if significant and abs(change) >= threshold:
+            flag = "slower" if change > 0 else "faster"
+            if change > 0:
+                regressions.append(candidate)
+        changes[candidate] = (old, new, change, flag)
+        for catname in candidate.categories:
+            catitems[catname].append(candidate)
+            if catname not in catorder:
+                catorder[catname] = next(priority)
+                
+    fieldwidth1 = max([len(pretty(t * multiplier, decimals)) 
+        for old, new, change, flag in changes.values()
+        for t in (old, new)] or [0]) + len(unit) + 4
+    catdescs = dict(categories)
+    for catname, items in sorted(catitems.items(), 
+        key=lambda item: catorder[item[0]]):
+        print("-= %s =-\n" % catdescs.get(catname, catname))
+        print("%*s%*s%9s" % (fieldwidth1, "baseline", fieldwidth1, "now", 
+            "change"))
+        for candidate in sorted(items, key=operator.attrgetter("time_per_op"),
+            reverse=True):
+            old, new, change, flag = changes[candidate]
+            print("%*s%*s%+8.1f%% %-6s %s" % (
+                fieldwidth1, pretty(old * multiplier, decimals) + unit,
+                fieldwidth1, pretty(new * multiplier, decimals) + unit, 
+                change, flag, candidate.name))
+        print("")
+    
+    # Baselines saved with the overhead candidates still list them.
+    current = set(type(candidate).__name__ for candidate in candidates)
+    missing = sorted(class_name for class_name, record in records.items() 
+        if class_name not in current and record.get("name"))
+    added = sorted(current - set(records))
+    if missing:
+        print("Not measured in this run: %s" % ", ".join(missing))
+    if added:
+        print("Not in the baseline: %s" % ", ".join(added))
+    return regressions
+
+# Interpreter matrix.
+
+def run_interpreter(interpreter, arguments=[]):
+    """Runs the suite under another interpreter in a subprocess. Returns the
+    environment and candidate records it exports, or None if it fails."""
+    import subprocess
+    command = [interpreter, os.path.abspath(__file__), "--export", "-", 
+        "--format", "jsonl"] + arguments
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE)
+    except OSError as e:
+        print("warning: can't run %s: %s" % (interpreter, e), file=sys.stderr)
+        return None
+    output = process.communicate()[0]
+    if process.returncode != 0:
+        print("warning: %s exited with status %d" % (interpreter, 
+            process.returncode), file=sys.stderr)
+        return None
+    if not isinstance(output, str):
+        output = output.decode("utf-8")
+    name, env, records = parse_results(output, interpreter)
+    return env, records
+
+def matrix(interpreters, arguments=[], categories=[], unit="us"):
+    """Runs the suite under each interpreter in turn and prints a table per
+    category with a column for each. The last row of each table is the
+    geometric mean of each column's times relative to the first column."""
+    results = []
+    for interpreter in interpreters:
+        result = run_interpreter(interpreter, arguments)
+        if result is not None:
+            results.append((interpreter,) + result)
+    if not results:
+        return
+    multiplier = MULTIPLIERS[unit]
+    decimals = DECIMALS[unit]
+    for i, (interpreter, env, records) in enumerate(results):
+        print("[%d] %s: %s %s (%s)" % (i + 1, interpreter, 
+            env.get("python_implementation"), env.get("python_version"),
+            env.get("config_args") or "default configuration"))
+    print("")
+    
+    # Group the classes measured by any interpreter by category.
+    priority = count()
+    catorder = dict((catname, next(priority)) for catname, desc in categories)
+    catitems = defaultdict(set)
+    names = {}
+    fieldwidth1 = len("[%d]" % len(results))
+    for interpreter, env, records in results:
+        for class_name, record in records.items():
+            if not record["name"]:
+                continue
+            names[class_name] = record["name"]
+            fieldwidth1 = max(fieldwidth1, len(pretty(
+                record["time_per_op"] * multiplier, decimals) + unit))
+            for catname in record["categories"]:
+                catitems[catname].add(class_name)
+                if catname not in catorder:
+                    catorder[catname] = next(priority)
+    fieldwidth1 += 2
+    
+    def time_per_op(class_name):
+        for interpreter, env, records in results:
+            if class_name in records:
+                return records[class_name]["time_per_op"]
+        return 0.0
+    
+    catdescs = dict(categories)
+    for catname, items in sorted(catitems.items(), 
+        key=lambda item: catorder[item[0]]):
+        print("-= %s =-\n" % catdescs.get(catname, catname))
+        print("".join("%*s" % (fieldwidth1, "[%d]" % (i + 1)) 
+            for i in xrange(len(results))))
+        for class_name in sorted(items, key=time_per_op, reverse=True):
+            columns = []
+            for interpreter, env, records in results:
+                record = records.get(class_name)
+                if record is None:
+                    columns.append("%*s" % (fieldwidth1, "-"))
+                else:
+                    columns.append("%*s" % (fieldwidth1, pretty(
+                        record["time_per_op"] * multiplier, decimals) + unit))
+            print("%s  %s" % ("".join(columns), names[class_name]))
+        columns = []
+        for interpreter, env, records in results:
+            logs = [math.log(records[class_name]["time_per_op"] / 
+                results[0][2][class_name]["time_per_op"]) 
+                for class_name in items
+                if class_name in records and class_name in results[0][2] and
+                records[class_name]["time_per_op"] > 0 and 
+                results[0][2][class_name]["time_per_op"] > 0]
+            columns.append("%*s" % (fieldwidth1, 
+                "%.2fx" % math.exp(mean(logs)) if logs else "-"))
+        print("%s  %s\n" % ("".join(columns), "Relative to [1]"))
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Estimates the cost of "
+        "common operations under the running interpreter.")
+    parser.add_argument("-c", "--category", action="append", metavar="NAME",
+        help="run only the candidates in category NAME. Can be given more "
+        "than once")
+    parser.add_argument("-k", "--match", metavar="REGEX",
+        help="run only the candidates whose class name or description "
+        "matches REGEX")
+    parser.add_argument("-l", "--list", action="store_true",
+        help="list the selected candidates without running them")
+    parser.add_argument("-s", "--suite", action="append", metavar="SUITE",
+        help="run the candidates of SUITE, which is the name of an installed "
+        "suite, a module path, or builtin for the candidates of this module. "
+        "Can be given more than once (default: builtin)")
+    parser.add_argument("--list-suites", action="store_true",
+        help="list the installed suites without loading them and exit")
+    parser.add_argument("--unit", default="ns", choices=sorted(MULTIPLIERS),
+        help="unit of the reported times (default: %(default)s)")
+    parser.add_argument("-r", "--repetitions", type=int, default=REPETITIONS,
+        metavar="N", help="samples taken of each candidate (default: "
+        "%(default)s)")
+    parser.add_argument("-n", "--ops", type=int, default=NUM_OPS, metavar="N",
+        help="ops per sample, unless calibrated with --target-time "
+        "(default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+        help="run candidates in N worker processes, each pinned to a "
+        "separate core")
+    parser.add_argument("-t", "--target-time", type=float, metavar="MS",
+        help="calibrate the op count of each candidate so that a sample "
+        "takes about MS milliseconds instead of using a fixed count")
+    parser.add_argument("--timer", default="default", 
+        choices=[name for name, desc, factory in timers],
+        help="the clock used to time samples (default: %(default)s)")
+    parser.add_argument("--event-loop", default="asyncio", metavar="NAME",
+        help="the event loop implementation asyncio candidates run on: %s "
+        "(default: %%(default)s)" % (", ".join(sorted(event_loops())) or 
+        "none under this interpreter"))
+    parser.add_argument("--list-timers", action="store_true",
+        help="show the resolution and overhead of the available timers and "
+        "exit")
+    parser.add_argument("--estimator", default="min", 
+        choices=sorted(estimators),
+        help="how samples are reduced to a single time (default: "
+        "%(default)s)")
+    parser.add_argument("--bootstrap", type=int, default=1000, metavar="N",
+        help="number of bootstrap resamples used for the 95%% confidence "
+        "intervals (default: %(default)s)")
+    parser.add_argument("--seed", type=int, 
+        help="seed for the order candidates are measured in and the "
+        "bootstrap (default: chosen at random and reported)")
+    parser.add_argument("--drift-correct", action="store_true",
+        help="divide each sample by the relative time of the baselines "
+        "measured nearest to it, to correct for the machine speeding up or "
+        "slowing down during the run")
+    parser.add_argument("--isolate", action="store_true",
+        help="run each candidate in a fresh interpreter pinned to an "
+        "isolated CPU, so that its results don't depend on the candidates "
+        "run before it, and warn about CPU settings that add noise")
+    parser.add_argument("--isolated-worker", action="store_true",
+        help=argparse.SUPPRESS)
+    parser.add_argument("--stats", action="store_true",
+        help="also show the min, median, trimmed mean and MAD of each "
+        "candidate")
+    parser.add_argument("-o", "--export", metavar="FILE",
+        help="write the results of every candidate to FILE, or to stdout "
+        "instead of the table if FILE is -")
+    parser.add_argument("--format", choices=sorted(exporters),
+        help="format of the exported results (default: csv if FILE ends in "
+        ".csv, otherwise jsonl)")
+    parser.add_argument("--save-baseline", metavar="FILE",
+        help="save the results to FILE for use with --compare")
+    parser.add_argument("--baseline-name", metavar="NAME",
+        help="name recorded in a saved baseline (default: the file name)")
+    parser.add_argument("--compare", metavar="FILE",
+        help="show changes relative to a saved baseline or a JSON Lines "
+        "export instead of the usual table")
+    parser.add_argument("--threshold", type=float, default=5.0, metavar="PCT",
+        help="smallest significant change flagged by --compare (default: "
+        "%(default)s%%)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+        help="exit with status 1 if --compare flags anything as slower")
+    parser.add_argument("-u", "--unroll", metavar="N[,N...]", 
+        type=lambda s: [int(n) for n in s.split(",")],
+        help="unroll factor for candidates that repeat a statement (default: "
+        "%d, or the candidate's own). Giving several measures each such "
+        "candidate at every factor and fits its cost to all of them" % UNROLL)
+    parser.add_argument("--sizes", metavar="N[,N...]", 
+        type=lambda s: [int(n) for n in s.split(",")],
+        help="sizes to measure sized candidates at, in items or for working "
+        "set candidates in bytes (default: each candidate's own, powers of "
+        "ten from 1 up to 10,000,000 items or of four from 4KiB to 256MiB)")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, 
+        metavar="N", help="take a sample again up to N times when the OS "
+        "preempts the process, faults in a page or migrates it to another "
+        "CPU while it runs (default: %(default)s)")
+    parser.add_argument("--max-warmup", type=int, default=MAX_WARMUP, 
+        metavar="N", help="take up to N extra samples of a candidate whose "
+        "first samples were slower while it warmed up, so that the "
+        "estimates use only samples from its steady state (default: "
+        "%(default)s)")
+    parser.add_argument("--memory", action="store_true",
+        help="also measure the memory allocated and retained per op and the "
+        "gc collections of each candidate, and the size of common objects "
+        "(needs Python 3.4 or later)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, metavar="DIR",
+        help="where samples are cached for reuse by later runs of unchanged "
+        "candidates (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+        help="measure every candidate and don't cache the samples")
+    parser.add_argument("--refresh", action="store_true",
+        help="measure every candidate and replace its cached samples")
+    parser.add_argument("--interpreters", metavar="PATH[,PATH...]",
+        type=lambda s: s.split(","),
+        help="run the suite under each of these interpreters in turn and "
+        "show their results side by side")
+    options = parser.parse_args()
+    if options.isolate and options.jobs > 1:
+        parser.error("--isolate runs one candidate at a time")
+    if event_loops() and options.event_loop not in event_loops():
+        parser.error("event loop %r is not available" % options.event_loop)
+    if options.memory:
+        try:
+            import tracemalloc
+        except ImportError:
+            parser.error("--memory needs the tracemalloc module")
+    
+    if options.list_timers:
+        for name, desc, func, scale in available_timers():
+            resolution, overhead = measure_timer(func, scale)
+            print("%-14s %8.0fns resolution %8.0fns overhead  %s" % (name, 
+                resolution * 1e9, overhead * 1e9, desc))
+        sys.exit(0)
+    
+    if options.list_suites:
+        print("%-24s %s" % ("builtin", __file__))
+        for name, module in sorted(installed_suites().items()):
+            print("%-24s %s" % (name, module))
+        sys.exit(0)
+    
+    # Suites import this module as opcosts, which must not load it twice.
+    sys.modules.setdefault("opcosts", sys.modules[__name__])
+    if options.isolated_worker:
+        isolated_worker()
+        sys.exit(0)
+    selected = select_classes(candidate_classes(options.suite or ["builtin"]),
+        options.category, options.match)
+    classes = candidate_classes()
+    if options.list:
+        for cls in selected:
+            print("%-40s %-16s %s" % (cls.__name__, ",".join(cls.categories),
+                cls.name or ""))
+        sys.exit(0)
+    if not selected:
+        parser.error("no candidates selected")
+    REPETITIONS = options.repetitions
+    
+    if options.interpreters:
+        arguments = ["--jobs", str(options.jobs), "--timer", options.timer,
+            "--estimator", options.estimator, 
+            "--bootstrap", str(options.bootstrap), 
+            "--max-retries", str(options.max_retries),
+            "--max-warmup", str(options.max_warmup), 
+            "--repetitions", str(options.repetitions), 
+            "--ops", str(options.ops)]
+        for category in options.category or []:
+            arguments += ["--category", category]
+        for suite in options.suite or []:
+            arguments += ["--suite", suite]
+        if options.match:
+            arguments += ["--match", options.match]
+        if options.target_time:
+            arguments += ["--target-time", repr(options.target_time)]
+        if options.seed is not None:
+            arguments += ["--seed", str(options.seed)]
+        if options.drift_correct:
+            arguments.append("--drift-correct")
+        if options.isolate:
+            arguments.append("--isolate")
+        if options.event_loop != "asyncio":
+            arguments += ["--event-loop", options.event_loop]
+        if options.unroll:
+            arguments += ["--unroll", ",".join(map(str, options.unroll))]
+        if options.sizes:
+            arguments += ["--sizes", ",".join(map(str, options.sizes))]
+        arguments += ["--cache-dir", options.cache_dir]
+        if options.no_cache:
+            arguments.append("--no-cache")
+        if options.refresh:
+            arguments.append("--refresh")
+        matrix(options.interpreters, arguments, CATEGORIES, options.unit)
+        sys.exit(0)
+        
+    # Only the selected candidates and those they take overheads from are
+    # created, and only those are shown.
+    candidates = add_dependencies(instantiate(selected, options.unroll, 
+        options.ops, options.sizes), classes, options.unroll, options.ops)
+    target_time = options.target_time and options.target_time * 1e-3
+    candidates = benchmark(candidates=candidates, jobs=options.jobs, 
+        target_time=target_time, timer=options.timer,
+        estimator=options.estimator, bootstrap=options.bootstrap, 
+        seed=options.seed, max_retries=options.max_retries,
+        cache=None if options.no_cache else options.cache_dir, 
+        refresh=options.refresh, num_ops=options.ops, 
+        max_warmup=options.max_warmup, drift_correct=options.drift_correct,
+        isolate=options.isolate, event_loop=options.event_loop)
+    shown = [candidate for candidate in candidates 
+        if type(candidate) in selected or 
+        getattr(type(candidate), "family", None) in selected]
+    if options.memory:
+        for candidate in shown:
+            if candidate.name:
+                measure_memory(candidate)
+    regressions = []
+    if options.compare:
+        regressions = compare(options.compare, shown, CATEGORIES, 
+            unit=options.unit, threshold=options.threshold)
+    elif options.export != "-":
+        report(candidates, CATEGORIES, unit=options.unit, stats=options.stats,
+            shown=shown)
+        if options.memory:
+            report_memory(shown, CATEGORIES)
+    if options.export:
+        export(options.export, candidates, options.format)
+    if options.save_baseline:
+        save_baseline(options.save_baseline, shown, options.baseline_name)
+    if regressions and options.fail_on_regression:
+        sys.exit(1)
@@ -0,0 +1,656 @@
+"""Tests of opcosts.py. Run with python -m unittest or pytest."""
+
+from __future__ import print_function
+
+import os
+import sys
+import csv
+import itertools
+import shutil
+import tempfile
+import unittest
+
+import opcosts
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+class Provider(opcosts.Candidate):
+    tags = ["provided"]
+
+class User(opcosts.Candidate):
+    overheads = ["provided"]
+
+class DoubleUser(opcosts.Candidate):
+    overheads = [("provided", 2.0)]
+
+class SampleOverhead(opcosts.Candidate):
+    tags = ["per_sample"]
+    per_sample = True
+
+class SampleUser(opcosts.Candidate):
+    overheads = ["per_sample"]
+
+class Named(User):
+    name = "A user of the provided overhead"
+    categories = ["tests"]
+
+class Slow(opcosts.Candidate):
+    categories = ["sizes"]
+
+class Traced(opcosts.Unrolled):
+    setup_code = "trace = self.trace"
+    loop_setup = "trace.append(0)"
+    statement = ["trace.append(1)", "trace.append(2)"]
+    unroll = 3
+    trace = None
+
+class Empty(opcosts.Unrolled):
+    statement = "pass"
+
+class Orphan(opcosts.Candidate):
+    overheads = ["missing"]
+
+class CycleA(opcosts.Candidate):
+    tags = ["a"]
+    overheads = [("b", 0.5)]
+
+class CycleB(opcosts.Candidate):
+    tags = ["b"]
+    overheads = [("a", 0.5)]
+
+izip = opcosts.izip
+if not opcosts.PY2:
+    xrange = range
+
+def solve(candidates, values):
+    "Fits the overhead model, returning the resolved time of each candidate."
+    model = opcosts.OverheadModel(candidates)
+    x, resolved, residuals = model.solve(dict(izip(candidates, values)))
+    return [resolved[candidate] for candidate in candidates], \
+        [residuals[candidate] for candidate in candidates]
+
+def sample_once(test, candidates):
+    "Takes a sample of each candidate, with as few ops as it allows."
+    opcosts.Candidate.setup("default")
+    test.assertTrue(candidates)
+    for candidate in candidates:
+        candidate.num_ops = candidate.step
+        opcosts.take_sample(candidate, 0)
+        test.assertEqual(len(candidate.times), 1, type(candidate).__name__)
+
+def add_subtract(self, num_ops):
+    n = 0
+    for i in xrange(0, num_ops, 4):
+        n += 1
+        n -= 1
+        n += 1
+        n -= 1
+
+class UnrolledTest(unittest.TestCase):
+
+    def test_body(self):
+        self.assertEqual(opcosts.BenchAddSubtract.body(3), 
+            ["n += 1", "n -= 1", "n += 1"])
+
+    def test_same_code_as_written_out(self):
+        run = opcosts.compile_unrolled(opcosts.BenchAddSubtract, 4)
+        self.assertEqual(run.__code__.co_code, add_subtract.__code__.co_code)
+        self.assertEqual(run.__code__.co_consts, 
+            add_subtract.__code__.co_consts)
+
+    def test_order(self):
+        candidate = Traced(num_ops=6)
+        candidate.trace = []
+        candidate.run(6)
+        self.assertEqual(candidate.trace, [0, 1, 2, 1] * 2)
+
+    def test_unroll_factors(self):
+        for unroll in [1, 7, 1000]:
+            candidate = opcosts.BenchAddSubtract(unroll=unroll)
+            self.assertEqual(candidate.step, unroll)
+            self.assertTrue(("unrolled%d" % unroll, 1.0) in 
+                candidate.overheads)
+        self.assertEqual(opcosts.BenchLoadLocal(unroll=1000).unroll, 
+            opcosts.LoadBench.max_unroll)
+
+    def test_every_class_runs(self):
+        sample_once(self, [cls(unroll=unroll) 
+            for cls in opcosts.candidate_classes(["builtin"]) 
+            if issubclass(cls, opcosts.Unrolled) and 
+            not issubclass(cls, opcosts.Sized) for unroll in [1, None]])
+
+class MemoryTest(unittest.TestCase):
+
+    @unittest.skipUnless(hasattr(tracemalloc, "reset_peak"), 
+        "needs tracemalloc.reset_peak()")
+    def test_list_literal_allocates(self):
+        # A list of 4 items has an array of 4 pointers beside the list.
+        allocated = opcosts.allocated_per_op(opcosts.BenchCreateList4())
+        self.assertTrue(allocated >= 4 * opcosts.struct.calcsize("P"))
+        self.assertTrue(allocated > opcosts.allocated_per_op(Empty()))
+        self.assertEqual(opcosts.allocated_per_op(Empty()), 0.0)
+
+    @unittest.skipUnless(tracemalloc, "needs tracemalloc")
+    def test_measure_memory(self):
+        opcosts.Candidate.setup("default")
+        candidate = opcosts.BenchCreateListAppend4(num_ops=100)
+        opcosts.measure_memory(candidate)
+        self.assertEqual(sorted(candidate.memory), 
+            ["allocated", "collections", "retained"])
+        self.assertEqual(len(candidate.memory["collections"]), 3)
+
+class OverheadModelTest(unittest.TestCase):
+
+    def test_subtracts_overhead(self):
+        candidates = [Provider(), User()]
+        resolved, residuals = solve(candidates, [10e-9, 25e-9])
+        self.assertAlmostEqual(resolved[0] / 10e-9, 1.0, places=5)
+        self.assertAlmostEqual(resolved[1] / 15e-9, 1.0, places=5)
+
+    def test_multiplier(self):
+        candidates = [Provider(), DoubleUser()]
+        resolved, residuals = solve(candidates, [10e-9, 25e-9])
+        self.assertAlmostEqual(resolved[1] / 5e-9, 1.0, places=5)
+
+    def test_cost_is_never_negative(self):
+        # The user measured faster than its overhead alone.
+        candidates = [Provider(), User()]
+        resolved, residuals = solve(candidates, [10e-9, 8e-9])
+        self.assertEqual(min(resolved), 0.0)
+        self.assertTrue(all(r >= 0.0 for r in resolved))
+
+    def test_per_sample_overhead(self):
+        # A 1000ns per-sample cost spread over 100 ops is 10ns per op.
+        overhead = SampleOverhead(num_ops=1)
+        user = SampleUser(num_ops=100)
+        resolved, residuals = solve([overhead, user], [1000e-9, 30e-9])
+        self.assertAlmostEqual(resolved[0] / 1000e-9, 1.0, places=5)
+        self.assertAlmostEqual(resolved[1] / 20e-9, 1.0, places=5)
+
+    def test_redundant_measurements(self):
+        # Two measurements of a class that disagree are fitted between them.
+        candidates = [Provider(), User(), User()]
+        resolved, residuals = solve(candidates, [10e-9, 20e-9, 30e-9])
+        self.assertTrue(10e-9 < resolved[1] < 20e-9)
+        self.assertEqual(resolved[1], resolved[2])
+        self.assertTrue(residuals[1] > 0.0 > residuals[2])
+
+    def test_cycle(self):
+        # Each pays half the other's cost: 10 + 20 / 2 and 20 + 10 / 2.
+        candidates = [CycleA(), CycleB()]
+        resolved, residuals = solve(candidates, [20e-9, 25e-9])
+        self.assertAlmostEqual(resolved[0] / 10e-9, 1.0, places=4)
+        self.assertAlmostEqual(resolved[1] / 20e-9, 1.0, places=4)
+
+    def test_missing_provider(self):
+        self.assertRaises(ValueError, opcosts.OverheadModel, [Orphan()])
+
+    def test_warm_start(self):
+        candidates = [Provider(), User()]
+        model = opcosts.OverheadModel(candidates)
+        values = dict(izip(candidates, [10e-9, 25e-9]))
+        x = model.solve(values)[0]
+        resolved = model.solve(values, x, max_sweeps=1)[1]
+        self.assertAlmostEqual(resolved[candidates[1]] / 15e-9, 1.0, places=5)
+
+class TimerTest(unittest.TestCase):
+
+    def tearDown(self):
+        opcosts.Candidate.setup("default")
+
+    def test_available(self):
+        timers = opcosts.available_timers()
+        self.assertTrue("default" in [name for name, desc, func, scale 
+            in timers])
+        for name, desc, func, scale in timers:
+            self.assertTrue(scale > 0.0)
+            self.assertTrue(func() <= func())
+
+    def test_setup(self):
+        opcosts.Candidate.setup("monotonic")
+        self.assertEqual(opcosts.Candidate.timer_name, "monotonic")
+        self.assertTrue(0.0 < opcosts.Candidate.timer_overhead <= 
+            opcosts.Candidate.timer_resolution)
+        self.assertRaises(ValueError, opcosts.Candidate.setup, "sundial")
+
+    def test_measure(self):
+        # A clock that advances 5 ticks per reading.
+        ticks = itertools.count(0, 5)
+        resolution, overhead = opcosts.measure_timer(lambda: next(ticks), 
+            1e-9, samples=10)
+        self.assertAlmostEqual(resolution, 5e-9)
+        self.assertAlmostEqual(overhead, 5e-9)
+
+def analyzed():
+    "A Provider and a Named candidate with fixed samples, analyzed."
+    opcosts.Candidate.setup("default")
+    candidates = [Provider(num_ops=10), Named(num_ops=10)]
+    for candidate, t in izip(candidates, [1e-7, 3e-7]):
+        candidate.times.extend([t * 1.1, t, t * 1.05, t * 1.2, t, t * 1.1])
+        candidate.stamps.extend(range(6))
+    opcosts.analyze(candidates, bootstrap=20, seed=1)
+    return candidates
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.candidates = analyzed()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_jsonl(self):
+        path = os.path.join(self.directory, "run.jsonl")
+        opcosts.export(path, self.candidates)
+        name, env, records = opcosts.load_baseline(path)
+        self.assertEqual(env["schema"], opcosts.EXPORT_SCHEMA)
+        self.assertEqual(sorted(records), ["Named", "Provider"])
+        candidate = self.candidates[1]
+        self.assertEqual(records["Named"]["time_per_op"], 
+            candidate.time_per_op)
+        self.assertEqual(records["Named"]["times"], candidate.times)
+
+    def test_csv(self):
+        path = os.path.join(self.directory, "run.csv")
+        opcosts.export(path, self.candidates)
+        f = open(path)
+        try:
+            rows = list(csv.reader(f))
+        finally:
+            f.close()
+        self.assertEqual(rows[0], opcosts.CSV_FIELDS)
+        self.assertEqual(len(rows), 3)
+        row = dict(izip(rows[0], rows[2]))
+        self.assertEqual(row["class"], "Named")
+        self.assertEqual(float(row["time_per_op"]), 
+            self.candidates[1].time_per_op)
+        self.assertEqual(len(row["times"].split()), 6)
+
+    def test_csv_has_every_field(self):
+        fields = set(opcosts.environment()) | set(opcosts.candidate_record(
+            self.candidates[0]))
+        self.assertEqual(sorted(opcosts.CSV_FIELDS), sorted(fields))
+
+def quietly(function, *args, **kwargs):
+    "Calls a function with its standard output discarded."
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        return function(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+class BaselineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "before.json")
+        self.candidates = analyzed()
+        opcosts.save_baseline(self.path, self.candidates)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        name, env, records = opcosts.load_baseline(self.path)
+        self.assertEqual(name, "before")
+        self.assertEqual(env["python_version"], 
+            opcosts.environment()["python_version"])
+        for candidate in self.candidates:
+            record = records[type(candidate).__name__]
+            self.assertEqual(record["time_per_op"], candidate.time_per_op)
+            self.assertEqual((record["ci_low"], record["ci_high"]), 
+                candidate.ci)
+
+    def test_unchanged(self):
+        self.assertEqual(quietly(opcosts.compare, self.path, self.candidates),
+            [])
+
+    def test_regression(self):
+        candidate = self.candidates[1]
+        candidate.time_per_op *= 2
+        candidate.ci = (candidate.ci[0] * 2, candidate.ci[1] * 2)
+        self.assertEqual(quietly(opcosts.compare, self.path, self.candidates),
+            [candidate])
+        self.assertEqual(quietly(opcosts.compare, self.path, self.candidates,
+            threshold=200.0), [])
+
+class SelectionTest(unittest.TestCase):
+
+    classes = [Named, Provider, Slow]
+
+    def test_category(self):
+        self.assertEqual(opcosts.select_classes(self.classes, ["tests"]), 
+            [Named])
+        self.assertEqual(opcosts.select_classes(self.classes, 
+            ["sizes", "tests"]), [Named, Slow])
+
+    def test_pattern(self):
+        self.assertEqual(opcosts.select_classes(self.classes, 
+            pattern="^Prov"), [Provider])
+        self.assertEqual(opcosts.select_classes(self.classes, 
+            pattern="provided overhead"), [Named])
+        self.assertEqual(opcosts.select_classes(self.classes, ["tests"], 
+            "^Prov"), [])
+
+    def test_slow_categories(self):
+        self.assertEqual(opcosts.select_classes(self.classes), 
+            [Named, Provider])
+        self.assertEqual(opcosts.select_classes(self.classes, pattern="Slow"),
+            [Slow])
+
+    def test_baselines(self):
+        classes = opcosts.baseline_classes([opcosts.BenchLoadLocal(unroll=8),
+            opcosts.BenchAddSubtract(unroll=8)])
+        self.assertEqual(classes, opcosts.overhead_candidate_classes + 
+            [opcosts.unrolled_baseline(8)])
+
+    def test_builtin_classes(self):
+        names = [cls.__name__ 
+            for cls in opcosts.candidate_classes(["builtin"])]
+        self.assertEqual(names, sorted(names))
+        self.assertTrue("BenchLoadLocal" in names)
+        self.assertFalse([name for name in names 
+            if not name.startswith("Bench")])
+
+class Registered(opcosts.Candidate):
+    categories = ["tests"]
+
+class RegistryTest(unittest.TestCase):
+
+    def tearDown(self):
+        opcosts.registry.pop("Registered", None)
+        opcosts.loaded_suites.pop(__name__, None)
+
+    def test_register(self):
+        self.assertTrue(opcosts.register(Registered) is Registered)
+        self.assertTrue(opcosts.register(Registered) is Registered)
+        self.assertTrue(opcosts.candidate_class("Registered") is Registered)
+        self.assertEqual(opcosts.candidate_classes([__name__]), [Registered])
+        self.assertTrue(Registered in opcosts.candidate_classes())
+        self.assertFalse(Registered in opcosts.candidate_classes(["builtin"]))
+
+    def test_name_clash(self):
+        # Another class with the name of a builtin candidate.
+        cls = type("BenchLoadLocal", (opcosts.Candidate,), {})
+        self.assertRaises(ValueError, opcosts.register, cls)
+
+    def test_generated_classes(self):
+        self.assertTrue(opcosts.candidate_class("BenchUnrolled16") is 
+            opcosts.unrolled_baseline(16))
+        cls = opcosts.candidate_class("BenchZipSized_100")
+        self.assertTrue(cls is opcosts.sized_class(opcosts.BenchZipSized, 100))
+        self.assertEqual(cls.size, 100)
+        self.assertRaises(KeyError, opcosts.candidate_class, 
+            "BenchLoadLocal_5")
+        self.assertRaises(KeyError, opcosts.candidate_class, "BenchMissing")
+
+class CacheTest(unittest.TestCase):
+
+    def tearDown(self):
+        opcosts.module_texts.clear()
+        opcosts.module_sources.clear()
+
+    def key_after(self, old, new):
+        "The cache key of BenchLoadLocal with an edit made to opcosts.py."
+        source = opcosts.module_source(opcosts.__name__)
+        self.assertTrue(old in source)
+        opcosts.module_texts[opcosts.__name__] = source.replace(old, new)
+        opcosts.module_sources.clear()
+        return opcosts.cache_key(opcosts.BenchLoadLocal(num_ops=100), {}, {})
+
+    def test_unrelated_edit(self):
+        key = self.key_after("", "")
+        self.assertEqual(self.key_after("\ndef matrix(",
+            "\nclass BenchNew(Unrolled):\n    pass\n\ndef matrix("), key)
+        self.assertEqual(self.key_after("SIZES = ", "SIZES = [] or "), key)
+
+    def test_class_edit(self):
+        key = self.key_after("", "")
+        self.assertNotEqual(self.key_after("class BenchLoadLocal(LoadBench):",
+            "class BenchLoadLocal(LoadBench):\n    pass"), key)
+        self.assertNotEqual(self.key_after("\ndef take_sample(",
+            "\ndef take_sample(*edited):\n    pass\n\ndef unused("), key)
+
+class ParallelTest(unittest.TestCase):
+
+    def test_pin_to_unavailable_cpu(self):
+        self.assertFalse(opcosts.pin(10 ** 6))
+
+    def test_shard_level(self):
+        # A shard whose baseline ran at twice the pooled median is at level 2.
+        # Per-sample baselines are left out.
+        classes = [opcosts.BenchPass, opcosts.BenchStraight]
+        result = [(1, [9.0, 9.0], [], [], 0), (1, [2.0, 2.0, 2.0], [], [], 0)]
+        pooled = { opcosts.BenchPass: 1.0, opcosts.BenchStraight: 1.0 }
+        self.assertEqual(opcosts.shard_level(classes, result, pooled), 2.0)
+        self.assertEqual(opcosts.shard_level(classes[:1], result[:1], 
+            pooled), 1.0)
+
+    def test_merge(self):
+        # Two shards even on one CPU, so that baselines come from both.
+        cpus = opcosts.available_cpus
+        opcosts.available_cpus = lambda: list(cpus()) * 2
+        try:
+            baseline = opcosts.BenchStraight(num_ops=100)
+            candidates = [baseline, opcosts.BenchCreateEmptyTuple(num_ops=100),
+                opcosts.BenchCreateTuple4(num_ops=100)]
+            opcosts.run_parallel(candidates, 3, 2, seed=1)
+        finally:
+            opcosts.available_cpus = cpus
+        for candidate in candidates:
+            self.assertEqual(candidate.num_ops, 100)
+            self.assertEqual(len(candidate.times), len(candidate.stamps))
+            self.assertTrue(len(candidate.times) >= 3)
+        self.assertTrue(len(baseline.times) >= 6)
+
+class SteadyStateTest(unittest.TestCase):
+
+    def test_no_warmup(self):
+        self.assertEqual(opcosts.steady_state_start([1.0] * 10), 0)
+
+    def test_warmup(self):
+        times = [5.0, 3.0] + [1.0, 1.01, 0.99, 1.0, 1.02, 1.0, 0.98, 1.0]
+        self.assertEqual(opcosts.steady_state_start(times), 2)
+
+    def test_few_samples(self):
+        # A slow first sample needs MIN_STEADY samples after it to count.
+        times = [5.0] + [1.0] * (opcosts.MIN_STEADY - 1)
+        self.assertEqual(opcosts.steady_state_start(times), 0)
+        times.append(1.0)
+        self.assertEqual(opcosts.steady_state_start(times), 1)
+
+    def test_empty_and_single(self):
+        self.assertEqual(opcosts.steady_state_start([]), 0)
+        self.assertEqual(opcosts.steady_state_start([1.0]), 0)
+
+    def test_isolated_slow_sample(self):
+        times = [1.0, 1.0, 5.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+        self.assertEqual(opcosts.steady_state_start(times), 0)
+
+    def test_within_tolerance(self):
+        times = [1.05] + [1.0] * 9
+        self.assertEqual(opcosts.steady_state_start(times), 0)
+
+    def test_at_most_half(self):
+        times = [5.0] * 8 + [1.0] * 8
+        self.assertEqual(opcosts.steady_state_start(times), 8)
+        times = [5.0] * 10 + [1.0] * 6
+        self.assertEqual(opcosts.steady_state_start(times), 8)
+
+class DriftTest(unittest.TestCase):
+
+    def make(self, cls, times, stamps):
+        candidate = cls(num_ops=1)
+        candidate.times.extend(times)
+        candidate.stamps.extend(stamps)
+        return candidate
+
+    def test_steady_machine(self):
+        baseline = self.make(opcosts.BenchStraight, [2.0] * 4, [0, 1, 2, 3])
+        candidate = self.make(User, [5.0, 6.0], [0.5, 2.5])
+        opcosts.correct_drift([baseline, candidate])
+        self.assertEqual(candidate.times, [5.0, 6.0])
+        self.assertEqual(baseline.times, [2.0] * 4)
+
+    def test_slowdown(self):
+        # The machine runs at half speed for the second half of the run.
+        baseline = self.make(opcosts.BenchStraight, [1.0, 1.0, 2.0, 2.0],
+            [0, 1, 2, 3])
+        candidate = self.make(User, [3.0, 6.0], [0.9, 2.9])
+        opcosts.correct_drift([baseline, candidate])
+        self.assertAlmostEqual(candidate.times[0], 4.5)
+        self.assertAlmostEqual(candidate.times[1], 4.5)
+        self.assertEqual(candidate.raw_times, [3.0, 6.0])
+
+    def test_tie_takes_later_sample(self):
+        baseline = self.make(opcosts.BenchStraight, [1.0, 1.0, 2.0, 2.0],
+            [0, 1, 2, 3])
+        candidate = self.make(User, [4.0], [1.5])
+        opcosts.correct_drift([baseline, candidate])
+        self.assertAlmostEqual(candidate.times[0], 3.0)
+
+    def test_median_of_baselines(self):
+        # One baseline slowing down is outvoted by two that don't.
+        baselines = [self.make(opcosts.BenchStraight, [1.0, 1.0, 4.0, 4.0],
+            [0, 1, 2, 3])] + [self.make(opcosts.BenchStraight, [2.0] * 4, 
+            [0, 1, 2, 3]) for i in range(2)]
+        candidate = self.make(User, [3.0], [3])
+        opcosts.correct_drift(baselines + [candidate])
+        self.assertEqual(candidate.times, [3.0])
+
+    def test_per_sample_baselines_ignored(self):
+        baseline = self.make(opcosts.BenchPass, [1.0, 1.0, 2.0, 2.0],
+            [0, 1, 2, 3])
+        candidate = self.make(User, [3.0], [3])
+        opcosts.correct_drift([baseline, candidate])
+        self.assertEqual(candidate.times, [3.0])
+
+    def test_no_baselines(self):
+        candidate = self.make(User, [3.0, 4.0], [0, 1])
+        opcosts.correct_drift([candidate])
+        self.assertEqual(candidate.times, [3.0, 4.0])
+
+class ComplexityTest(unittest.TestCase):
+    sizes = [1, 10, 100, 1000, 10000]
+
+    def fit(self, f, labels=None):
+        return opcosts.complexity(self.sizes, [f(n) for n in self.sizes],
+            labels)
+
+    def test_constant(self):
+        label, a, b, error = self.fit(lambda n: 5e-9)
+        self.assertEqual(label, "1")
+        self.assertAlmostEqual(a / 5e-9, 1.0)
+        self.assertAlmostEqual(error, 0.0)
+
+    def test_linear(self):
+        label, a, b, error = self.fit(lambda n: 100e-9 + 2e-9 * n)
+        self.assertEqual(label, "n")
+        self.assertAlmostEqual(a / 100e-9, 1.0, places=5)
+        self.assertAlmostEqual(b / 2e-9, 1.0, places=5)
+
+    def test_n_log_n(self):
+        label, a, b, error = self.fit(lambda n: 1e-9 + 1e-9 * n *
+            opcosts.math.log(n))
+        self.assertEqual(label, "n log n")
+
+    def test_forced_model(self):
+        label, a, b, error = self.fit(lambda n: 5e-9, ["n"])
+        self.assertEqual(label, "n")
+        self.assertAlmostEqual(a / 5e-9, 1.0)
+
+    def test_one_size(self):
+        # Every model fits a single point, so the simplest is chosen.
+        label, a, b, error = opcosts.complexity([100], [7e-9])
+        self.assertEqual(label, "1")
+        self.assertAlmostEqual(error, 0.0)
+
+    def test_ties_choose_simplest(self):
+        # With two sizes, log n, n and n log n all fit exactly.
+        label, a, b, error = opcosts.complexity([10, 100], [1e-9, 2e-9])
+        self.assertEqual(label, "log n")
+
+    def test_non_negative(self):
+        # Times that fall with size can't be fitted with a negative slope.
+        label, a, b, error = self.fit(lambda n: 1e-6 / n)
+        self.assertTrue(a >= 0.0 and b >= 0.0)
+
+    def test_quadratic_only_when_allowed(self):
+        f = lambda n: 1e-9 * n * n
+        self.assertNotEqual(self.fit(f, opcosts.Sized.complexities)[0], "n^2")
+        self.assertEqual(self.fit(f, opcosts.StringBuild.complexities)[0],
+            "n^2")
+
+class ScatterTest(unittest.TestCase):
+
+    def test_permutation(self):
+        for n in [1, 2, 3, 10, 64, 1000, 4096]:
+            self.assertEqual(sorted(opcosts.scatter(n)), list(range(n)))
+
+    def test_spreads_neighbours(self):
+        n = 1000
+        order = opcosts.scatter(n)
+        gaps = [abs(a - b) for a, b in izip(order, order[1:])]
+        self.assertTrue(min(min(gap, n - gap) for gap in gaps) > n // 10)
+
+class CategoryTest(unittest.TestCase):
+    "Samples each candidate of the slower categories once, at small sizes."
+
+    def sample_category(self, category, sizes=None):
+        classes = opcosts.select_classes(opcosts.candidate_classes(
+            ["builtin"]), [category])
+        candidates = opcosts.instantiate(classes, sizes=sizes)
+        sample_once(self, candidates)
+        return candidates
+
+    def test_sizes(self):
+        self.sample_category("sizes", [1, 10])
+
+    def test_cache(self):
+        try:
+            self.sample_category("cache", [2 ** 12, 2 ** 14])
+        finally:
+            for candidate in opcosts.WorkingSet.built:
+                candidate.free()
+            del opcosts.WorkingSet.built[:]
+
+    def test_threads(self):
+        self.sample_category("threads", [1, 2])
+
+    def test_ipc(self):
+        names = [type(candidate).__name__ 
+            for candidate in self.sample_category("ipc", [8, 4096])]
+        self.assertTrue("BenchPipeSendAnswer_4096" in names)
+
+    @unittest.skipUnless("asyncio" in opcosts.event_loops(), "needs asyncio")
+    def test_asyncio(self):
+        self.sample_category("asyncio")
+
+    @unittest.skipUnless(opcosts.io_directories(), "needs a temp directory")
+    def test_io(self):
+        self.sample_category("io", [64, 4096])
+
+    def test_strings(self):
+        self.sample_category("strings", [1, 100])
+
+    def test_buffers(self):
+        # Record candidates skip sizes below one record, and work on the
+        # whole records of the others.
+        candidates = self.sample_category("buffers", [4, 10, 100, 1000])
+        sizes = dict((type(candidate).__name__, candidate.size) 
+            for candidate in candidates)
+        self.assertEqual(sizes["BenchBytesSlice_4"], 4)
+        self.assertFalse("BenchStructPackInto_4" in sizes)
+        candidate = opcosts.sized_class(opcosts.BenchStructUnpack, 10)()
+        candidate.prepare()
+        self.assertEqual(candidate.offsets, [0])
+        candidate.cleanup()
+
+if __name__ == "__main__":
+    unittest.main()